@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cafe_order_system.settings')
 
 application = get_asgi_application()
+
+# В режиме разработки статику отдает само приложение, как runserver
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
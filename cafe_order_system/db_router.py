@@ -0,0 +1,128 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Any, Callable, Iterator, Optional, Type
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Model
+
+# Псевдоним базы-реплики в DATABASES
+REPLICA_DB_ALIAS = 'replica'
+
+# Cookie, которой клиент после записи закрепляется за основной базой
+PRIMARY_PIN_COOKIE = 'db_primary'
+
+
+class PrimaryPin:
+    """
+    Состояние запроса для маршрутизатора: закреплен ли клиент за основной базой
+    и была ли в запросе запись.
+    """
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# Чтения, которые можно отдать реплике (отчеты, списки, выгрузки), помечаются явно
+_replica_reads: ContextVar[bool] = ContextVar('replica_reads', default=False)
+
+# Состояние текущего запроса (ReadReplicaMiddleware); вне запроса — None
+_primary_pin: ContextVar[Optional[PrimaryPin]] = ContextVar('primary_pin', default=None)
+
+
+@contextmanager
+def replica_reads() -> Iterator[None]:
+    """
+    Разрешает чтение с реплики внутри блока.
+
+    Чтение все равно идет в основную базу, если реплика выключена
+    (READ_REPLICA_ENABLED), клиент недавно писал или открыта транзакция.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def reads_from_replica(view: Callable) -> Callable:
+    """
+    Декоратор представления (синхронного или асинхронного): чтения внутри него
+    могут идти на реплику (см. replica_reads()).
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            with replica_reads():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary_pin(pinned: bool) -> Iterator[PrimaryPin]:
+    """
+    Задает состояние маршрутизации на время обработки запроса.
+
+    :param pinned: Клиент закреплен за основной базой (недавно писал).
+    """
+    state = PrimaryPin(pinned)
+    token = _primary_pin.set(state)
+    try:
+        yield state
+    finally:
+        _primary_pin.reset(token)
+
+
+def use_replica() -> bool:
+    """
+    Возвращает True, если текущее чтение можно отдать реплике.
+    """
+    if not settings.READ_REPLICA_ENABLED or not _replica_reads.get():
+        return False
+    state = _primary_pin.get()
+    if state is not None and state.pinned:
+        return False
+    # Внутри транзакции чтение должно видеть ее же незафиксированные изменения.
+    # Транзакция, в которую TestCase оборачивает тест, не в счет (как в transaction.atomic).
+    return not any(
+        not block._from_testcase for block in connections[DEFAULT_DB_ALIAS].atomic_blocks
+    )
+
+
+class PrimaryReplicaRouter:
+    """
+    Маршрутизатор основной базы и реплики.
+
+    Запись всегда идет в основную базу. Чтение — тоже, кроме помеченного
+    replica_reads() / reads_from_replica: такие чтения уходят на реплику,
+    если клиент не закреплен за основной базой после своей записи
+    (ReadReplicaMiddleware) и нет открытой транзакции.
+    """
+
+    def db_for_read(self, model: Type[Model], **hints: Any) -> Optional[str]:
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Связанные объекты читаются из той же базы, что и сам объект
+            return instance._state.db
+        return REPLICA_DB_ALIAS if use_replica() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model: Type[Model], **hints: Any) -> str:
+        state = _primary_pin.get()
+        if state is not None:
+            # До конца запроса и в течение READ_REPLICA_PIN_SECONDS после него — только основная база
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints: Any) -> bool:
+        # Реплика — копия основной базы, объекты из них можно связывать
+        return True
@@ -0,0 +1,178 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F, Model
+
+
+def increment_or_create(model: Type[Model], lookup: Dict[str, Any], deltas: Dict[str, Any]) -> None:
+    """
+    Атомарно прибавляет значения к полям записи, создавая ее при отсутствии.
+
+    Сначала выполняется UPDATE с F-выражениями (обычный случай — один запрос).
+    Если записи нет, она создается в точке сохранения; если ее успела создать
+    параллельная транзакция (IntegrityError), UPDATE повторяется — он дождется
+    фиксации той транзакции и прибавит значения к уже созданной записи.
+
+    Пример:
+        increment_or_create(RevenueLedger, {'date': day}, {'total_revenue': delta})
+
+    :param model: Модель.
+    :param lookup: Поля уникального ключа записи.
+    :param deltas: Прибавляемые значения по полям (могут быть отрицательными);
+        у новой записи поля получают эти значения.
+    """
+    rows = model.objects.filter(**lookup)
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic(using=rows.db):
+            model.objects.using(rows.db).create(**lookup, **deltas)
+    except IntegrityError:
+        rows.update(**updates)
+
+
+class RunningTotalService:
+    """
+    Базовый сервис для таблицы итогов, которая ведется по изменениям заказов
+    (сигнал order_state_changed) и сверяется с самими заказами.
+
+    Наследник задает model, key_field и value_fields и реализует get_contribution()
+    (вклад заказа в итоги) и calculate() (итоги, рассчитанные напрямую по заказам).
+    """
+    # Модель таблицы итогов
+    model: Type[Model]
+    # Уникальное поле записи итогов (день, номер стола и т.п.)
+    key_field: str
+    # Поля итогов, к которым прибавляются вклады заказов
+    value_fields: Tuple[str, ...]
+
+    @staticmethod
+    def get_contribution(state: Optional[Any]) -> Optional[Tuple[Any, Tuple]]:
+        """
+        Возвращает вклад заказа в данном состоянии в итоги.
+
+        :param state: Состояние заказа (OrderState) или None, если заказа нет.
+        :return: Кортеж (ключ записи, значения по value_fields) или None, если заказ не учитывается.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def calculate() -> Dict[Any, Tuple]:
+        """
+        Рассчитывает итоги напрямую по заказам.
+
+        :return: Словарь {ключ записи: значения по value_fields}.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def apply_changes(cls, changes: Iterable[Any]) -> None:
+        """
+        Применяет изменения заказов к итогам: по одному UPDATE на затронутую запись.
+
+        :param changes: Изменения заказов (OrderStateChange).
+        """
+        deltas: Dict[Any, List] = defaultdict(lambda: [0] * len(cls.value_fields))
+        for change in changes:
+            for state, sign in ((change.before, -1), (change.after, 1)):
+                contribution = cls.get_contribution(state)
+                if contribution:
+                    key, values = contribution
+                    deltas[key] = [total + sign * value for total, value in zip(deltas[key], values)]
+
+        # Записи блокируются в одном порядке, чтобы параллельные транзакции не взаимоблокировались
+        for key, values in sorted(deltas.items()):
+            if any(values):
+                increment_or_create(cls.model, {cls.key_field: key}, dict(zip(cls.value_fields, values)))
+
+    @classmethod
+    def rebuild(cls, fix: bool = True) -> List[Tuple[Any, Tuple, Tuple]]:
+        """
+        Сверяет итоги с заказами и при необходимости перестраивает их.
+
+        Сначала таблица итогов блокируется (SHARE ROW EXCLUSIVE): блокировка дожидается
+        транзакций, уже изменивших итоги, и не дает изменять их до конца сверки.
+        Итоги по заказам считаются уже после блокировки, поэтому зафиксированные
+        изменения в них учтены, а более поздние прибавятся к перестроенным итогам.
+
+        :param fix: Исправить расхождения (иначе только отчет).
+        :return: Список расхождений (ключ, значения в таблице итогов, фактические значения).
+        """
+        using = router.db_for_write(cls.model)
+        connection = connections[using]
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'LOCK TABLE {connection.ops.quote_name(cls.model._meta.db_table)} IN SHARE ROW EXCLUSIVE MODE'
+                )
+            actual = cls.calculate()
+            stored = {
+                key: tuple(values)
+                for key, *values in cls.model.objects.using(using).values_list(cls.key_field, *cls.value_fields)
+            }
+
+            empty = (0,) * len(cls.value_fields)
+            drift = [
+                (key, stored.get(key, empty), actual.get(key, empty))
+                for key in sorted(actual.keys() | stored.keys())
+                if stored.get(key, empty) != actual.get(key, empty)
+            ]
+
+            if fix and drift:
+                cls.model.objects.using(using).bulk_create(
+                    [
+                        cls.model(**{cls.key_field: key}, **dict(zip(cls.value_fields, values)))
+                        for key, _, values in drift
+                    ],
+                    update_conflicts=True,
+                    unique_fields=[cls.key_field],
+                    update_fields=list(cls.value_fields),
+                )
+        return drift
+
+    @classmethod
+    def format_drift(cls, key: Any, stored: Tuple, actual: Tuple) -> str:
+        """
+        Возвращает строку отчета о расхождении.
+
+        :param key: Ключ записи.
+        :param stored: Значения в таблице итогов.
+        :param actual: Фактические значения по заказам.
+        """
+        def format_values(values: Tuple) -> str:
+            return ', '.join(f'{field}={value}' for field, value in zip(cls.value_fields, values))
+
+        return f"{key}: в {cls.model.__name__} {format_values(stored)}, по заказам {format_values(actual)}"
+
+
+class ReconcileCommand(BaseCommand):
+    """
+    Базовая команда сверки таблицы итогов (service — наследник RunningTotalService)
+    с заказами.
+    """
+    service: Type[RunningTotalService]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        drift = self.service.rebuild(fix=not options['dry_run'])
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+
+        for key, stored, actual in drift:
+            self.stdout.write(self.service.format_drift(key, stored, actual))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Найдено расхождений: {len(drift)}.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено расхождений: {len(drift)}.'))
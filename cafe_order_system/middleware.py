@@ -0,0 +1,61 @@
+from typing import Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.middleware.gzip import GZipMiddleware
+
+from cafe_order_system.db_router import PRIMARY_PIN_COOKIE, PrimaryPin, primary_pin
+
+
+class ApiGZipMiddleware(GZipMiddleware):
+    """
+    Сжимает gzip только ответы в JSON (API и AJAX-фрагменты).
+
+    HTML-страницы не сжимаются: в них есть CSRF-токен, а сжатие вместе с секретом
+    в ответе открывает атаку BREACH. Потоки событий (text/event-stream) тоже не
+    сжимаются, иначе события копились бы в буфере компрессора. Ответы короче
+    200 байт GZipMiddleware не сжимает сам.
+    """
+
+    def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if not response.get('Content-Type', '').startswith('application/json'):
+            return response
+        return super().process_response(request, response)
+
+
+class ReadReplicaMiddleware:
+    """
+    Закрепляет клиента за основной базой после записи (read-your-writes).
+
+    Если в запросе была запись, ответ ставит cookie на READ_REPLICA_PIN_SECONDS:
+    пока она есть, чтения этого клиента не уходят на реплику, которая могла еще
+    не получить изменения. Работает и под WSGI, и под ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with primary_pin(PRIMARY_PIN_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self.process_response(response, state)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        with primary_pin(PRIMARY_PIN_COOKIE in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self.process_response(response, state)
+
+    @staticmethod
+    def process_response(response: HttpResponse, state: PrimaryPin) -> HttpResponse:
+        if state.wrote and settings.READ_REPLICA_PIN_SECONDS:
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE, '1', max_age=settings.READ_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
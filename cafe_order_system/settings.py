@@ -1,3 +1,4 @@
+import copy
 from pathlib import Path
 import environ
 
@@ -30,6 +31,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Сжатие должно идти после остальных middleware, меняющих ответ, поэтому стоит выше них
+    'cafe_order_system.middleware.ApiGZipMiddleware',
+    # Закрепление клиента за основной базой после записи (до любых запросов к БД)
+    'cafe_order_system.middleware.ReadReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,16 +63,102 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'cafe_order_system.wsgi.application'
 
+# Подключение к PostgreSQL (те же переменные, что у контейнера БД и entrypoint.sh)
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'mydatabase',
-        'USER': 'myuser',
-        'PASSWORD': 'mypassword',
-        'HOST': 'db',
-        'PORT': 5432,
+        'NAME': env.str('POSTGRES_DB', default='mydatabase'),
+        'USER': env.str('POSTGRES_USER', default='myuser'),
+        'PASSWORD': env.str('POSTGRES_PASSWORD', default='mypassword'),
+        'HOST': env.str('POSTGRES_HOST', default='db'),
+        'PORT': env.int('POSTGRES_PORT', default=5432),
+        # Проверка соединения перед использованием: с пулом — при выдаче из пула,
+        # без пула — перед повторным использованием постоянного соединения
+        'CONN_HEALTH_CHECKS': env.bool('DB_HEALTH_CHECKS', default=True),
+        'OPTIONS': {
+            # Время ожидания установки соединения с сервером (сек.)
+            'connect_timeout': env.int('DB_CONNECT_TIMEOUT', default=5),
+        },
+    }
+}
+
+# Пул соединений (psycopg_pool): соединения не открываются заново на каждый запрос.
+# Работает и под WSGI, и под ASGI; без пула (DB_POOL=false) соединения живут
+# DB_CONN_MAX_AGE секунд в потоке, который их открыл (под ASGI — только 0).
+if env.bool('DB_POOL', default=True):
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+        'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+        # Сколько ждать свободного соединения, прежде чем запрос завершится ошибкой (сек.)
+        'timeout': env.float('DB_POOL_TIMEOUT', default=10),
+        # Лишние (сверх min_size) соединения закрываются после простоя (сек.)
+        'max_idle': env.float('DB_POOL_MAX_IDLE', default=300),
+        # Соединения пересоздаются не реже, чем раз в max_lifetime (сек.)
+        'max_lifetime': env.float('DB_POOL_MAX_LIFETIME', default=1800),
     }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=0)
+
+# Реплика для тяжелых чтений (списки заказов, выручка, отчеты, выгрузки); включается,
+# если задан POSTGRES_REPLICA_HOST. Учетные данные и параметры пула — как у основной базы.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': env.str('POSTGRES_REPLICA_HOST', default=DATABASES['default']['HOST']),
+    'PORT': env.int('POSTGRES_REPLICA_PORT', default=DATABASES['default']['PORT']),
+    'OPTIONS': copy.deepcopy(DATABASES['default']['OPTIONS']),
+    # В тестах реплика — отдельная база без репликации: видно, какие чтения на нее ушли
+    'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_replica"},
 }
+READ_REPLICA_ENABLED = env.bool('READ_REPLICA_ENABLED', default=bool(env.str('POSTGRES_REPLICA_HOST', default='')))
+# Сколько секунд после записи клиент читает только из основной базы (реплика может отставать)
+READ_REPLICA_PIN_SECONDS = env.int('READ_REPLICA_PIN_SECONDS', default=10)
+
+DATABASE_ROUTERS = ['cafe_order_system.db_router.PrimaryReplicaRouter']
+
+# Кэш (меню и т.п.). Для нескольких процессов нужен общий кэш, например
+# CACHE_URL=rediscache://redis:6379/1 или pymemcache://memcached:11211
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Время жизни закэшированных ответов меню (сек.); при изменении блюд они сбрасываются сразу
+MENU_CACHE_TIMEOUT = env.int('MENU_CACHE_TIMEOUT', default=60 * 60 * 24)
+# Время жизни копии версии меню в кэше (сек.). Сама версия хранится в БД (order.MenuVersion),
+# истечение копии ее не меняет. Локальный кэш (по умолчанию) у каждого процесса свой: изменение
+# блюда обновляет копию только в обработавшем его процессе, остальные перечитают версию из БД
+# по истечении этого срока. С общим кэшем копия обновляется сразу для всех процессов и хранится бессрочно.
+MENU_VERSION_TIMEOUT = env.int(
+    'MENU_VERSION_TIMEOUT',
+    default=5 if CACHES['default']['BACKEND'].endswith('.LocMemCache') else None,
+)
+
+# Вывод списка и деталей заказов в API без создания экземпляров моделей
+# (order.api.serializers.OrderValuesSerializer). Выключен по умолчанию: поля этого
+# сериализатора задаются вручную и должны совпадать с OrderSerializer
+ORDER_VALUES_SERIALIZER = env.bool('ORDER_VALUES_SERIALIZER', default=False)
+
+# Асинхронные представления для чтения (список и детали заказов, блюда, выручка за смену).
+# Имеет смысл только под ASGI-сервером; читается при загрузке URLconf.
+ASYNC_API_VIEWS = env.bool('ASYNC_API_VIEWS', default=False)
+
+# Поток событий заказов (SSE, /order/events/). Рассыльщик по умолчанию работает
+# в пределах одного процесса; для нескольких процессов нужен наследник
+# order.events.OrderEventBroadcaster с общим каналом.
+ORDER_EVENTS_BROADCASTER = env.str('ORDER_EVENTS_BROADCASTER', default='order.events.OrderEventBroadcaster')
+# Интервал пингов в открытом потоке (сек.)
+ORDER_EVENTS_HEARTBEAT = env.int('ORDER_EVENTS_HEARTBEAT', default=15)
+# Задержка переподключения клиента после обрыва (мс)
+ORDER_EVENTS_RETRY = env.int('ORDER_EVENTS_RETRY', default=3000)
+# Размер очереди одного подписчика; при переполнении клиент получает событие resync
+ORDER_EVENTS_QUEUE_SIZE = env.int('ORDER_EVENTS_QUEUE_SIZE', default=100)
+# Сколько последних событий хранится для клиентов, переподключившихся с Last-Event-ID
+ORDER_EVENTS_HISTORY_SIZE = env.int('ORDER_EVENTS_HISTORY_SIZE', default=1000)
+
+# Оплаченные заказы старше этого числа дней переносятся в архив (команда archive_orders)
+ORDER_ARCHIVE_AFTER_DAYS = env.int('ORDER_ARCHIVE_AFTER_DAYS', default=90)
+
+# На сколько месяцев вперед создаются секции таблицы заказов (команда partition_orders)
+ORDER_PARTITION_MONTHS_AHEAD = env.int('ORDER_PARTITION_MONTHS_AHEAD', default=3)
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -33,9 +33,10 @@ echo "Применение миграций..."
 python manage.py makemigrations
 python manage.py migrate
 
-# Загрузка фикстур
+# Загрузка фикстур (пакетно, без сигналов по каждой записи; повторный запуск обновляет записи)
 echo "Загрузка фикстур..."
-python manage.py loaddata dishes.json orders.json order_dishes.json revenue.json
+python manage.py import_data order/fixtures/dishes.json order/fixtures/orders.json \
+    order/fixtures/order_dishes.json finance/fixtures/revenue.json
 
 # Запуск сервера
 echo "Запуск сервера Django..."
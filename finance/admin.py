@@ -1,9 +1,15 @@
 from django.contrib import admin
 
-from finance.models import Revenue
+from finance.models import Revenue, RevenueLedger
 
 
 @admin.register(Revenue)
 class RevenueAdmin(admin.ModelAdmin):
     """Административный интерфейс для модели Revenue (Выручка)."""
     pass
+
+
+@admin.register(RevenueLedger)
+class RevenueLedgerAdmin(admin.ModelAdmin):
+    """Административный интерфейс для модели RevenueLedger (Текущая выручка)."""
+    list_display = ['date', 'total_revenue']
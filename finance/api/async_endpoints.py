@@ -0,0 +1,25 @@
+from django.http import HttpRequest, HttpResponse
+
+from cafe_order_system.db_router import reads_from_replica
+from finance.services import RevenueService
+from order.api.async_views import AsyncAPIView
+
+
+class AsyncCalculateRevenueAPI(AsyncAPIView):
+    """
+    Асинхронный вариант CalculateRevenueAPI: выручка за сегодняшнюю смену.
+
+    Включается настройкой ASYNC_API_VIEWS.
+    """
+
+    @reads_from_replica
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        try:
+            total_revenue = await RevenueService.acalculate_total_revenue()
+            return self.render({'total_revenue': total_revenue})
+
+        except Exception as e:
+            return self.render({
+                'error': 'Внутренняя ошибка сервера',
+                'details': str(e)
+            }, status=500)
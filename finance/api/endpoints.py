@@ -1,15 +1,18 @@
+from django.utils.decorators import method_decorator
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from cafe_order_system.db_router import reads_from_replica
 from finance.api.pagination import RevenuePagination
-from finance.api.serializers import RevenueSerializer
+from finance.api.serializers import RevenueSerializer, RevenueReportQuerySerializer, RevenueReportSerializer
 from finance.models import Revenue
 from finance.services import RevenueService
 
 
+@method_decorator(reads_from_replica, name='get')
 class ApiRevenueList(ListAPIView):
     """
        API для получения списка записей о выручке.
@@ -49,6 +52,53 @@ class ApiRevenueList(ListAPIView):
     pagination_class = RevenuePagination
 
 
+@method_decorator(reads_from_replica, name='get')
+class ApiRevenueReport(APIView):
+    """
+    API для отчета о выручке за произвольный диапазон дат.
+
+    Выручка группируется по дням, неделям или месяцам одним запросом к БД;
+    периоды без заказов возвращаются с нулевой выручкой.
+
+    Параметры:
+    - `date_from` (date): Первый день диапазона.
+    - `date_to` (date): Последний день диапазона (включительно).
+    - `period` (str): day (по умолчанию), week или month.
+
+    Пример запроса:
+    GET /finance/api_revenue_report/?date_from=2025-01-01&date_to=2025-03-31&period=month
+
+    Пример ответа:
+    {
+        "period": "month",
+        "date_from": "2025-01-01",
+        "date_to": "2025-03-31",
+        "total_revenue": "1500.00",
+        "results": [
+            {"period_start": "2025-01-01", "total_revenue": "1000.00", "orders_count": 12},
+            {"period_start": "2025-02-01", "total_revenue": "500.00", "orders_count": 7},
+            {"period_start": "2025-03-01", "total_revenue": "0.00", "orders_count": 0}
+        ]
+    }
+    """
+
+    def get(self, request):
+        query = RevenueReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        report = RevenueService.calculate_revenue_report(params['date_from'], params['date_to'], params['period'])
+        results = RevenueReportSerializer(report, many=True).data
+        return Response({
+            'period': params['period'],
+            'date_from': params['date_from'],
+            'date_to': params['date_to'],
+            'total_revenue': f"{sum(row['total_revenue'] for row in report):.2f}",
+            'results': results,
+        }, status=status.HTTP_200_OK)
+
+
+@method_decorator(reads_from_replica, name='get')
 class CalculateRevenueAPI(APIView):
     """
     API-метод для расчета выручки за сегодняшнюю смену.
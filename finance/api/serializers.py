@@ -1,6 +1,8 @@
+from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
 from finance.models import Revenue
+from finance.services import REVENUE_PERIODS
 
 
 class RevenueSerializer(ModelSerializer):
@@ -9,3 +11,30 @@ class RevenueSerializer(ModelSerializer):
     class Meta:
         model = Revenue
         fields = '__all__'
+
+
+class RevenueReportQuerySerializer(serializers.Serializer):
+    """Сериализатор параметров отчета о выручке: диапазон дат и период группировки."""
+
+    # Ограничение диапазона, чтобы отчет по дням не разрастался до бесконечности
+    max_days = 366 * 5
+
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    period = serializers.ChoiceField(choices=REVENUE_PERIODS, default='day')
+
+    def validate(self, attrs: dict) -> dict:
+        """Проверяет, что диапазон дат задан корректно и не слишком велик."""
+        if attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from не может быть позже date_to.")
+        if (attrs['date_to'] - attrs['date_from']).days >= self.max_days:
+            raise serializers.ValidationError(f"Диапазон не может превышать {self.max_days} дней.")
+        return attrs
+
+
+class RevenueReportSerializer(serializers.Serializer):
+    """Сериализатор строки отчета о выручке за период."""
+
+    period_start = serializers.DateField()
+    total_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    orders_count = serializers.IntegerField()
@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from finance.services import RevenueService
+
+
+class Command(BaseCommand):
+    """
+    Заполняет или исправляет записи Revenue за диапазон дат по заказам.
+
+    Пример:
+        python manage.py backfill_revenue --from 2025-01-01 --to 2025-01-31
+        python manage.py backfill_revenue --from 2025-01-01 --dry-run
+    """
+    help = 'Заполняет или исправляет выручку по дням (Revenue) за диапазон дат.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, required=True,
+                            help='Первый день диапазона (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help='Последний день диапазона (YYYY-MM-DD), по умолчанию вчера.')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать число изменений.')
+
+    def handle(self, *args, **options):
+        date_from = options['date_from']
+        # Сегодняшняя выручка фиксируется при закрытии смены
+        date_to = options['date_to'] or timezone.localdate() - timedelta(days=1)
+        if date_from > date_to:
+            raise CommandError('Дата --from не может быть позже --to.')
+
+        created, updated = RevenueService.backfill_revenue(date_from, date_to, dry_run=options['dry_run'])
+
+        message = f'{date_from} — {date_to}: создано записей {created}, исправлено {updated}.'
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'[dry-run] {message}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,14 @@
+from cafe_order_system.db_utils import ReconcileCommand
+from finance.services import RevenueLedgerService
+
+
+class Command(ReconcileCommand):
+    """
+    Сверяет текущую выручку (RevenueLedger) с заказами и перестраивает ее.
+
+    Пример:
+        python manage.py reconcile_revenue_ledger
+        python manage.py reconcile_revenue_ledger --dry-run
+    """
+    help = 'Сверяет текущую выручку по дням с заказами и исправляет расхождения.'
+    service = RevenueLedgerService
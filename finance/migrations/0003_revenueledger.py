@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:04
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_revenue_ledger(apps, schema_editor):
+    """Заполняет текущую выручку по уже существующим заказам."""
+    Order = apps.get_model('order', 'Order')
+    RevenueLedger = apps.get_model('finance', 'RevenueLedger')
+    rows = (
+        Order.objects.filter(status__in=['paid', 'ready'])
+        .annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values('day')
+        .annotate(total=Sum('total_price'))
+    )
+    RevenueLedger.objects.bulk_create(
+        RevenueLedger(date=row['day'], total_revenue=row['total']) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_alter_revenue_options'),
+        ('order', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueLedger',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+            ],
+            options={
+                'verbose_name': 'Текущая выручка',
+                'verbose_name_plural': 'Текущая выручка',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(fill_revenue_ledger, migrations.RunPython.noop),
+    ]
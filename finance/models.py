@@ -29,3 +29,29 @@ class Revenue(models.Model):
     def __str__(self):
         """ Возвращает строковое представление записи."""
         return f"Выручка за {self.date}: {self.total_revenue:.2f}"
+
+
+class RevenueLedger(models.Model):
+    """
+        Текущая (нарастающая) выручка за день.
+
+        В отличие от Revenue, которая фиксируется при закрытии смены, запись
+        обновляется при каждом изменении заказа, влияющем на выручку: смене статуса,
+        изменении общей стоимости, удалении. Чтение выручки за день — поиск по
+        первичному ключу.
+
+        Атрибуты:
+            date (DateField): День (первичный ключ).
+            total_revenue (DecimalField): Выручка за день по оплаченным и готовым заказам.
+    """
+    date = models.DateField(primary_key=True)
+    total_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Текущая выручка"
+        verbose_name_plural = "Текущая выручка"
+        ordering = ['-date']
+
+    def __str__(self):
+        """ Возвращает строковое представление записи."""
+        return f"Текущая выручка за {self.date}: {self.total_revenue:.2f}"
@@ -1,8 +1,54 @@
-from finance.models import Revenue
-from order.models import Order
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from cafe_order_system.db_utils import RunningTotalService
+from finance.models import Revenue, RevenueLedger
+from order.models import ArchivedOrder, Order
+from order.signals import OrderState
 
 from django.utils import timezone
-from django.db.models import Sum, Q
+from django.db import transaction
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Trunc, TruncDate
+
+# Статусы заказов, которые учитываются в выручке
+REVENUE_STATUSES = (Order.StatusChoices.PAID, Order.StatusChoices.READY)
+
+# Таблицы заказов, по которым считается выручка: рабочая и архив оплаченных заказов
+REVENUE_MODELS = (Order, ArchivedOrder)
+
+# Периоды группировки отчета о выручке
+REVENUE_PERIODS = ('day', 'week', 'month')
+
+
+def get_period_start(day: date, period: str) -> date:
+    """Возвращает первый день периода (дня, недели с понедельника или месяца), в который входит day."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def iter_periods(date_from: date, date_to: date, period: str) -> Iterator[date]:
+    """Перебирает начала периодов, пересекающихся с диапазоном [date_from, date_to]."""
+    current = get_period_start(date_from, period)
+    while current <= date_to:
+        yield current
+        if period == 'month':
+            current = (current + timedelta(days=32)).replace(day=1)
+        else:
+            current += timedelta(days=7 if period == 'week' else 1)
+
+
+def get_day_bounds(date_from: date, date_to: date) -> Tuple[datetime, datetime]:
+    """Возвращает границы диапазона дней [начало date_from, начало дня после date_to) в текущем часовом поясе."""
+    return (
+        timezone.make_aware(datetime.combine(date_from, time.min)),
+        timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)),
+    )
 
 
 class RevenueService:
@@ -15,35 +61,167 @@ class RevenueService:
         """
         Рассчитывает общую выручку за оплаченные заказы за сегодня.
 
+        Выручка читается из RevenueLedger по первичному ключу, без агрегации заказов.
+
         :return: Общая выручка за сегодня.
         """
-        today = timezone.now().date()
-        total_revenue = Order.objects.filter(
-            Q(status='paid') | Q(status='ready'),  # Только оплаченные заказы
-            created_at__date=today  # Заказы, созданные сегодня
-        ).aggregate(total=Sum('total_price'))['total']
+        today = timezone.localdate()
+        total_revenue = RevenueLedger.objects.filter(date=today).values_list(
+            'total_revenue', flat=True
+        ).first()
 
         return total_revenue or 0  # Если выручки нет, возвращаем 0
 
+    @staticmethod
+    async def acalculate_total_revenue() -> float:
+        """
+        Асинхронный вариант calculate_total_revenue().
+
+        :return: Общая выручка за сегодня.
+        """
+        today = timezone.localdate()
+        total_revenue = await RevenueLedger.objects.filter(date=today).values_list(
+            'total_revenue', flat=True
+        ).afirst()
+
+        return total_revenue or 0
+
     @staticmethod
     def close_shift_and_save_revenue() -> Revenue:
         """
         Закрытие смены: расчет и сохранение выручки за сегодня.
 
+        Запись сохраняется одним INSERT ... ON CONFLICT (date) DO UPDATE, поэтому
+        одновременные закрытия смены не конфликтуют по уникальной дате,
+        а повторное закрытие просто обновляет сумму.
+
         :return: Запись о выручке за сегодня.
         """
-        today = timezone.now().date()
+        today = timezone.localdate()
         total_revenue = RevenueService.calculate_total_revenue()
 
-        # Создается запись о выручке за сегодня
-        revenue_record, created = Revenue.objects.get_or_create(
-            date=today,
-            defaults={'total_revenue': total_revenue},
+        revenue_record, = Revenue.objects.bulk_create(
+            [Revenue(date=today, total_revenue=total_revenue)],
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['total_revenue'],
         )
+        return revenue_record
+
+    @staticmethod
+    def calculate_revenue_report(date_from: date, date_to: date, period: str = 'day') -> List[Dict[str, Any]]:
+        """
+        Рассчитывает выручку по дням, неделям или месяцам за диапазон дат.
 
-        # Если запись уже существует, она обновляется
-        if not created:
-            revenue_record.total_revenue = total_revenue
-            revenue_record.save()
+        Все периоды считаются одним запросом (GROUP BY date_trunc по индексу
+        (status, created_at), вместе с архивом заказов через UNION ALL);
+        периоды без заказов возвращаются с нулевой выручкой.
 
-        return revenue_record
+        :param date_from: Первый день диапазона.
+        :param date_to: Последний день диапазона (включительно).
+        :param period: Период группировки: day, week или month.
+        :return: Список {period_start, total_revenue, orders_count} по возрастанию дат.
+        """
+        start, end = get_day_bounds(date_from, date_to)
+        hot, *archive = [
+            model.objects.filter(status__in=REVENUE_STATUSES, created_at__gte=start, created_at__lt=end)
+            .annotate(period_start=Trunc('created_at', period, output_field=DateField()))
+            .order_by()
+            .values('period_start')
+            .annotate(total_revenue=Sum('total_price'), orders_count=Count('id'))
+            for model in REVENUE_MODELS
+        ]
+        revenue: Dict[date, Decimal] = defaultdict(Decimal)
+        counts: Dict[date, int] = defaultdict(int)
+        for row in hot.union(*archive, all=True):
+            revenue[row['period_start']] += row['total_revenue']
+            counts[row['period_start']] += row['orders_count']
+
+        return [
+            {
+                'period_start': period_start,
+                'total_revenue': revenue.get(period_start, Decimal('0')),
+                'orders_count': counts.get(period_start, 0),
+            }
+            for period_start in iter_periods(date_from, date_to, period)
+        ]
+
+    @staticmethod
+    @transaction.atomic
+    def backfill_revenue(date_from: date, date_to: date, dry_run: bool = False) -> Tuple[int, int]:
+        """
+        Заполняет или исправляет записи Revenue за каждый день диапазона.
+
+        Выручка по дням считается одним GROUP BY, существующие записи читаются
+        одним запросом, а недостающие и неверные записываются одним INSERT ... ON CONFLICT.
+
+        :param date_from: Первый день диапазона.
+        :param date_to: Последний день диапазона (включительно).
+        :param dry_run: Только подсчитать изменения, ничего не записывая.
+        :return: Кортеж (создано записей, исправлено записей).
+        """
+        report = RevenueService.calculate_revenue_report(date_from, date_to, 'day')
+        existing = dict(
+            Revenue.objects.select_for_update()
+            .filter(date__gte=date_from, date__lte=date_to)
+            .values_list('date', 'total_revenue')
+        )
+
+        changed = [
+            Revenue(date=row['period_start'], total_revenue=row['total_revenue'])
+            for row in report
+            if existing.get(row['period_start']) != row['total_revenue']
+        ]
+        created = sum(1 for revenue in changed if revenue.date not in existing)
+
+        if changed and not dry_run:
+            Revenue.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['date'],
+                update_fields=['total_revenue'],
+                batch_size=1000,
+            )
+        return created, len(changed) - created
+
+
+class RevenueLedgerService(RunningTotalService):
+    """
+    Сервис для ведения текущей выручки по дням (RevenueLedger).
+    """
+    model = RevenueLedger
+    key_field = 'date'
+    value_fields = ('total_revenue',)
+
+    @staticmethod
+    def get_contribution(state: Optional[OrderState]) -> Optional[Tuple[date, Tuple[Decimal]]]:
+        """
+        Возвращает день и сумму, которые заказ в данном состоянии вносит в выручку.
+
+        :param state: Состояние заказа или None, если заказа нет.
+        :return: Кортеж (день, (сумма,)) или None, если заказ не учитывается в выручке.
+        """
+        if state is None or state.status not in REVENUE_STATUSES:
+            return None
+        return timezone.localdate(state.created_at), (Decimal(str(state.total_price)),)
+
+    @staticmethod
+    def calculate() -> Dict[date, Tuple[Decimal]]:
+        """
+        Рассчитывает выручку по дням напрямую по заказам (одним GROUP BY
+        по рабочей таблице и архиву, UNION ALL).
+
+        :return: Словарь {день: (выручка,)}.
+        """
+        hot, *archive = [
+            model.objects.filter(status__in=REVENUE_STATUSES)
+            .annotate(day=TruncDate('created_at'))
+            .order_by()
+            .values('day')
+            .annotate(total=Sum('total_price'))
+            for model in REVENUE_MODELS
+        ]
+        totals: Dict[date, Decimal] = defaultdict(Decimal)
+        for row in hot.union(*archive, all=True):
+            totals[row['day']] += row['total']
+        return {day: (total,) for day, total in totals.items()}
@@ -0,0 +1,19 @@
+from typing import List
+
+from django.dispatch import receiver
+
+from finance.services import RevenueLedgerService
+from order.signals import OrderStateChange, order_state_changed
+
+
+@receiver(order_state_changed)
+def update_revenue_ledger(sender, changes: List[OrderStateChange], **kwargs) -> None:
+    """
+    Обновляет текущую выручку по дням при изменении заказов.
+
+    Аргументы:
+        sender: Модель, которая отправила сигнал (Order).
+        changes (List[OrderStateChange]): Изменения заказов.
+        **kwargs: Дополнительные аргументы, передаваемые сигналом.
+    """
+    RevenueLedgerService.apply_changes(changes)
@@ -1,6 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from threading import Barrier
+
 import pytest
+from django.db import connection
+from django.utils import timezone
 from rest_framework.test import APIClient
 from finance.tests.conftest import setup_test_data
+from finance.models import Revenue
+from order.models import Order
 
 
 @pytest.fixture
@@ -48,3 +56,74 @@ def test_close_shift(api_client, setup_test_data):
     assert 'date' in data
     assert 'total_revenue' in data
     assert data['total_revenue'] == 800.00
+
+
+@pytest.mark.django_db
+def test_revenue_report(api_client, django_assert_num_queries):
+    """
+    Тестирование API отчета о выручке по неделям: один запрос к БД, пустые периоды с нулем.
+    """
+    monday = date(2025, 3, 3)
+    for day_offset, total_price, order_status in [(0, 100, 'paid'), (2, 50, 'ready'), (3, 70, 'pending'), (15, 30, 'paid')]:
+        order = Order.objects.create(table_number=1, total_price=total_price, status=order_status)
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.make_aware(datetime.combine(monday + timedelta(days=day_offset), time(12)))
+        )
+
+    with django_assert_num_queries(1):
+        response = api_client.get('/finance/api_revenue_report/', {
+            'date_from': '2025-03-04', 'date_to': '2025-03-20', 'period': 'week',
+        })
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['total_revenue'] == '80.00'
+    assert data['results'] == [
+        {'period_start': '2025-03-03', 'total_revenue': '50.00', 'orders_count': 1},
+        {'period_start': '2025-03-10', 'total_revenue': '0.00', 'orders_count': 0},
+        {'period_start': '2025-03-17', 'total_revenue': '30.00', 'orders_count': 1},
+    ]
+
+
+@pytest.mark.django_db
+def test_revenue_report_invalid_range(api_client):
+    """
+    Тестирование API отчета о выручке с некорректным диапазоном дат.
+    """
+    response = api_client.get('/finance/api_revenue_report/', {'date_from': '2025-03-20', 'date_to': '2025-03-01'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_close_shift_concurrent(setup_test_data):
+    """
+    Тестирование одновременного закрытия смены: все запросы успешны, запись за день одна.
+    """
+    Revenue.objects.filter(date=timezone.localdate()).delete()
+    barrier = Barrier(8)
+
+    def close_shift(_):
+        try:
+            client = APIClient()
+            barrier.wait()  # все потоки отправляют запрос одновременно
+            return client.post('/finance/api_close_shift/').status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        statuses = list(executor.map(close_shift, range(8)))
+
+    assert statuses == [200] * 8
+    revenue = Revenue.objects.get(date=timezone.localdate())
+    assert revenue.total_revenue == 800
+
+
+@pytest.mark.django_db
+def test_close_shift_single_write(api_client, setup_test_data, django_assert_num_queries):
+    """
+    Тестирование закрытия смены: чтение выручки и одна запись (upsert).
+    """
+    with django_assert_num_queries(2) as context:
+        response = api_client.post('/finance/api_close_shift/')
+    assert response.status_code == 200
+    assert 'ON CONFLICT' in context.captured_queries[-1]['sql']
@@ -1,8 +1,13 @@
+from datetime import timedelta
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
 from django.utils import timezone
 
-from finance.services import RevenueService
-from order.models import Order
+from finance.models import Revenue, RevenueLedger
+from finance.services import RevenueService, RevenueLedgerService
+from order.models import Dish, Order, OrderDish
 
 
 @pytest.fixture
@@ -51,4 +56,87 @@ def test_close_shift_and_save_revenue(setup_orders):
         created_at=timezone.now()
     )
     updated_revenue_record = RevenueService.close_shift_and_save_revenue()
-    assert updated_revenue_record.total_revenue == 1000.00  # 800 + 200
\ No newline at end of file
+    assert updated_revenue_record.total_revenue == 1000.00  # 800 + 200
+
+
+@pytest.mark.django_db
+def test_calculate_total_revenue_is_single_lookup(setup_orders, django_assert_num_queries):
+    """
+    Проверяет, что выручка за сегодня читается одним запросом к RevenueLedger.
+    """
+    with django_assert_num_queries(1):
+        assert RevenueService.calculate_total_revenue() == 800.00
+
+
+@pytest.mark.django_db
+def test_revenue_ledger_follows_order_changes():
+    """
+    Проверяет обновление текущей выручки при смене статуса, стоимости и удалении заказа.
+    """
+    today = timezone.localdate()
+    dish = Dish.objects.create(name="Суп", price=100)
+    order = Order.objects.create(table_number=1)
+    OrderDish.objects.create(order=order, dish=dish, quantity=2, price_at_order=100)
+    assert RevenueService.calculate_total_revenue() == 0  # заказ еще в ожидании
+
+    order.refresh_from_db()
+    order.status = 'paid'
+    order.save()
+    assert RevenueLedger.objects.get(date=today).total_revenue == 200
+
+    # Изменение позиции пересчитывает стоимость заказа и выручку
+    bread = Dish.objects.create(name="Хлеб", price=50)
+    OrderDish.objects.create(order=order, dish=bread, quantity=1, price_at_order=50)
+    assert RevenueLedger.objects.get(date=today).total_revenue == 250
+
+    order.refresh_from_db()
+    order.status = 'pending'
+    order.save()
+    assert RevenueLedger.objects.get(date=today).total_revenue == 0
+
+    order.status = 'ready'
+    order.save()
+    order.delete()
+    assert RevenueLedger.objects.get(date=today).total_revenue == 0
+
+
+@pytest.mark.django_db
+def test_reconcile_revenue_ledger_command(setup_orders):
+    """
+    Проверяет, что команда сверки находит и исправляет расхождения.
+    """
+    today = timezone.localdate()
+    RevenueLedger.objects.filter(date=today).update(total_revenue=1)
+
+    out = StringIO()
+    call_command('reconcile_revenue_ledger', '--dry-run', stdout=out)
+    assert 'Найдено расхождений: 1' in out.getvalue()
+    assert RevenueLedger.objects.get(date=today).total_revenue == 1
+
+    call_command('reconcile_revenue_ledger', stdout=out)
+    assert RevenueLedger.objects.get(date=today).total_revenue == 800
+    assert RevenueLedgerService.rebuild(fix=False) == []
+
+
+@pytest.mark.django_db
+def test_backfill_revenue_command():
+    """
+    Проверяет, что команда заполняет недостающие и исправляет неверные записи Revenue.
+    """
+    today = timezone.localdate()
+    order = Order.objects.create(table_number=1, total_price=120, status='paid')
+    Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=2))
+    Revenue.objects.create(date=today - timedelta(days=2), total_revenue=1)
+    Revenue.objects.create(date=today - timedelta(days=1), total_revenue=0)
+
+    out = StringIO()
+    call_command('backfill_revenue', '--from', str(today - timedelta(days=3)), '--dry-run', stdout=out)
+    assert 'создано записей 1, исправлено 1' in out.getvalue()
+    assert Revenue.objects.get(date=today - timedelta(days=2)).total_revenue == 1
+
+    call_command('backfill_revenue', '--from', str(today - timedelta(days=3)), stdout=out)
+    assert dict(Revenue.objects.values_list('date', 'total_revenue')) == {
+        today - timedelta(days=3): 0,
+        today - timedelta(days=2): 120,
+        today - timedelta(days=1): 0,
+    }
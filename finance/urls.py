@@ -1,8 +1,10 @@
 from django.urls import path
 
-from finance.api.endpoints import ApiRevenueList, CalculateRevenueAPI, \
+from finance.api.async_endpoints import AsyncCalculateRevenueAPI
+from finance.api.endpoints import ApiRevenueList, ApiRevenueReport, CalculateRevenueAPI, \
     ApiCloseShift
 from finance.views import RevenueList, CalculateRevenue, CloseShift
+from order.api.async_views import read_view
 
 app_name = 'finance'
 
@@ -12,6 +14,8 @@ urlpatterns = [
     path('close_shift/', CloseShift.as_view(), name='close_shift'),
 
     path('api_revenue_list/', ApiRevenueList.as_view(), name='api_revenue_list'),
-    path('api_calculate_revenue/', CalculateRevenueAPI.as_view(), name='api_calculate_revenue'),
+    path('api_revenue_report/', ApiRevenueReport.as_view(), name='api_revenue_report'),
+    path('api_calculate_revenue/', read_view(CalculateRevenueAPI.as_view(), AsyncCalculateRevenueAPI.as_view()),
+         name='api_calculate_revenue'),
     path('api_close_shift/', ApiCloseShift.as_view(), name='api_close_shift'),
 ]
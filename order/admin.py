@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Dish, Order, OrderDish
+from .models import ArchivedOrder, ArchivedOrderDish, Dish, Order, OrderDish, TableBalance
+from .services import defer_total_recalculation
 
 
 class OrderDishInline(admin.TabularInline):
@@ -19,6 +20,11 @@ class OrderAdmin(admin.ModelAdmin):
     """
     inlines = [OrderDishInline]
 
+    def save_related(self, request, form, formsets, change):
+        """Сохраняет блюда заказа, пересчитывая общую стоимость один раз."""
+        with defer_total_recalculation():
+            super().save_related(request, form, formsets, change)
+
 
 @admin.register(Dish)
 class DishAdmin(admin.ModelAdmin):
@@ -36,3 +42,35 @@ class OrderDishAdmin(admin.ModelAdmin):
     Позволяет управлять связями между заказами и блюдами через административную панель.
     """
     pass
+
+
+class ArchivedOrderDishInline(admin.TabularInline):
+    """
+    Inline-админка для позиций архивного заказа (только просмотр).
+    """
+    model = ArchivedOrderDish
+    extra = 0
+    can_delete = False
+    readonly_fields = ['dish', 'quantity', 'price_at_order']
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """
+    Админка для архивных заказов.
+    Архив только просматривается: заказы переносятся в него командой archive_orders.
+    """
+    inlines = [ArchivedOrderDishInline]
+    list_display = ['id', 'table_number', 'total_price', 'created_at', 'archived_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TableBalance)
+class TableBalanceAdmin(admin.ModelAdmin):
+    """Админка для открытых счетов столов (TableBalance)."""
+    list_display = ['table_number', 'open_total', 'open_orders']
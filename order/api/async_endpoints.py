@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django_filters.utils import translate_validation
+from rest_framework.request import Request
+
+from cafe_order_system.db_router import reads_from_replica
+from order.api.async_views import AsyncAPIView
+from order.api.filters import OrderFilter
+from order.api.pagination import OrderCursorPagination, OrderPagination
+from order.api.serializers import (
+    ArchivedOrderValuesSerializer, DishSerializer, OrderSerializer, OrderValuesSerializer,
+)
+from order.cache import OrderDetailCache, cache_menu_response
+from order.models import ArchivedOrder, Dish, Order
+
+
+class AsyncApiOrderList(AsyncAPIView):
+    """
+    Асинхронный вариант ApiOrderList: те же фильтры, пагинация и формат ответа.
+
+    Включается настройкой ASYNC_API_VIEWS.
+    """
+
+    @reads_from_replica
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        drf_request = Request(request)
+        serializer_class = OrderValuesSerializer if settings.ORDER_VALUES_SERIALIZER else OrderSerializer
+        queryset = serializer_class.setup_eager_loading(Order.objects.all())
+        filterset = OrderFilter(drf_request.query_params, queryset=queryset, request=drf_request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+
+        if drf_request.query_params.get('pagination') == 'cursor':
+            paginator = OrderCursorPagination()
+        else:
+            paginator = OrderPagination()
+        page = await paginator.apaginate_queryset(filterset.qs, drf_request)
+        if settings.ORDER_VALUES_SERIALIZER:
+            data = await OrderValuesSerializer.aserialize(page)
+        else:
+            data = OrderSerializer(page, many=True).data
+        return self.render(paginator.get_paginated_response(data).data)
+
+
+class AsyncApiOrderDetail(AsyncAPIView):
+    """
+    Асинхронный вариант ApiOrderDetail, с теми же ETag, Last-Modified и 304.
+
+    Включается настройкой ASYNC_API_VIEWS.
+    """
+
+    async def get(self, request: HttpRequest, id: int) -> HttpResponse:
+        serializer_class = OrderValuesSerializer if settings.ORDER_VALUES_SERIALIZER else OrderSerializer
+        queryset = serializer_class.setup_eager_loading(Order.objects.all())
+        validators = await OrderDetailCache.aget_validators(request, id)
+        if validators is None:
+            # Заказа нет — тот же ответ 404, что и у синхронного представления
+            await aget_object_or_404(queryset, id=id)
+
+        etag, last_modified = quote_etag(validators[0]), int(validators[1].timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            order = await queryset.filter(id=id).afirst()
+            if order is None:
+                # Заказ перенесен в архив — выводится из архива в том же формате
+                archived = ArchivedOrderValuesSerializer.setup_eager_loading(ArchivedOrder.objects.all())
+                data, = await ArchivedOrderValuesSerializer.aserialize([await aget_object_or_404(archived, id=id)])
+            elif settings.ORDER_VALUES_SERIALIZER:
+                data, = await OrderValuesSerializer.aserialize([order])
+            else:
+                data = OrderSerializer(order).data
+            response = self.render(data)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+@method_decorator(cache_menu_response, name='get')
+class AsyncDishList(AsyncAPIView):
+    """
+    Асинхронный вариант списка блюд (DishViewSet.list), с тем же кэшем меню.
+
+    Включается настройкой ASYNC_API_VIEWS.
+    """
+
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        drf_request = Request(request)
+        paginator = OrderPagination()
+        page = await paginator.apaginate_queryset(Dish.objects.all(), drf_request)
+        data = DishSerializer(page, many=True).data
+        return self.render(paginator.get_paginated_response(data).data)
+
+
+class AsyncDishDetail(AsyncAPIView):
+    """
+    Асинхронный вариант получения блюда (DishViewSet.retrieve).
+
+    Включается настройкой ASYNC_API_VIEWS.
+    """
+
+    async def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        dish = await aget_object_or_404(Dish, pk=pk)
+        return self.render(DishSerializer(dish).data)
@@ -0,0 +1,64 @@
+from typing import Any, Callable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpRequest, HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+
+
+class AsyncAPIView(View):
+    """
+    Базовое асинхронное представление API для чтения.
+
+    DRF 3.15 не поддерживает асинхронные обработчики, поэтому наследники — обычные
+    асинхронные представления Django: данные читаются асинхронным ORM, а
+    сериализуются теми же сериализаторами и пагинаторами DRF, что и в синхронных
+    представлениях. Ответ всегда в JSON (без browsable API), ошибки — в формате DRF.
+    """
+    renderer_class = JSONRenderer
+
+    async def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404 as exc:
+            return self.render({'detail': str(exc)}, status=404)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return self.render(data, status=exc.status_code)
+
+    def render(self, data: Any, status: int = 200) -> HttpResponse:
+        """
+        Возвращает ответ с данными в JSON, как JSONRenderer в DRF.
+        """
+        renderer = self.renderer_class()
+        return HttpResponse(renderer.render(data), content_type=renderer.media_type, status=status)
+
+
+def read_view(sync_view: Callable, async_view: Callable) -> Callable:
+    """
+    Выбирает представление для маршрута по настройке ASYNC_API_VIEWS.
+
+    При включенной настройке GET и HEAD обрабатывает async_view, остальные методы
+    (например, POST в DishViewSet) — по-прежнему sync_view в пуле потоков.
+    Настройка читается при загрузке URLconf.
+
+    :param sync_view: Синхронное представление (DRF).
+    :param async_view: Асинхронное представление для чтения.
+    :return: Представление для маршрута.
+    """
+    if not settings.ASYNC_API_VIEWS:
+        return sync_view
+
+    sync_handler = sync_to_async(sync_view)
+
+    # Представления DRF освобождены от CSRF-проверки Django, выбор не должен ее вернуть
+    @csrf_exempt
+    async def view(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_handler(request, *args, **kwargs)
+
+    return view
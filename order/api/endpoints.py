@@ -1,4 +1,10 @@
-from django.db.models import Prefetch, QuerySet
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.db.models import QuerySet
+from django.http import Http404, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.generics import ListAPIView, RetrieveAPIView, CreateAPIView, UpdateAPIView, DestroyAPIView
@@ -6,11 +12,20 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.request import Request
 import logging
+from typing import Optional
 
+from cafe_order_system.db_router import reads_from_replica, replica_reads
 from order.api.filters import OrderFilter
-from order.api.pagination import OrderPagination
-from order.api.serializers import OrderSerializer, OrderCreateUpdateSerializer, DishSerializer
-from order.models import Order, OrderDish, Dish
+from order.api.pagination import OrderCursorPagination, OrderPagination
+from order.api.serializers import (
+    OrderSerializer, OrderCreateUpdateSerializer, OrderBulkStatusSerializer, DishSerializer,
+    OrderItemAddSerializer, OrderItemQuantitySerializer, OrderValuesSerializer, OrderExportQuerySerializer,
+    ArchivedOrderValuesSerializer, TableBalanceSerializer,
+)
+from order.cache import cache_menu_response, conditional_order_detail
+from order.export import EXPORT_CONTENT_TYPES, OrderExportService, aiter_in_thread
+from order.models import ArchivedOrder, Order, OrderDish, Dish, TableBalance
+from order.services import OrderService
 
 
 logger = logging.getLogger(__name__)
@@ -19,21 +34,23 @@ logger = logging.getLogger(__name__)
 class OrderQuerysetMixin:
     """
     Миксин для оптимизации запросов к Order.
-    Добавляет prefetch_related и only для уменьшения количества запросов к БД.
+    Набор загружаемых полей выводится из полей OrderSerializer, позиции
+    подгружаются одним prefetch-запросом вместе с блюдами.
+
+    При настройке ORDER_VALUES_SERIALIZER заказы выбираются словарями
+    и выводятся OrderValuesSerializer, без создания экземпляров моделей.
     """
 
     def get_queryset(self) -> QuerySet[Order]:
         """
         Возвращает оптимизированный QuerySet для Order.
         """
-        queryset = super().get_queryset()
-        queryset = queryset.prefetch_related(
-            Prefetch('order_dishes', queryset=OrderDish.objects.only('quantity', 'price_at_order', 'dish')),
-            Prefetch('order_dishes__dish', queryset=Dish.objects.only('name', 'price')),
-        ).only('id', 'table_number', 'status')
-        return queryset
+        if settings.ORDER_VALUES_SERIALIZER:
+            return OrderValuesSerializer.setup_eager_loading(super().get_queryset())
+        return OrderSerializer.setup_eager_loading(super().get_queryset())
 
 
+@method_decorator(reads_from_replica, name='get')
 class ApiOrderList(OrderQuerysetMixin, ListAPIView):
     """
     API для получения списка заказов.
@@ -48,15 +65,49 @@ class ApiOrderList(OrderQuerysetMixin, ListAPIView):
     ```
     curl -X GET "http://localhost:8000/api/order_list/?table_number=5&status=pending"
     ```
+
+    Заказы за диапазон дат создания (включительно):
+    ```
+    curl -X GET "http://localhost:8000/api/order_list/?date_from=2025-01-01&date_to=2025-01-31"
+    ```
+
+    Keyset-пагинация по (created_at, id) без COUNT(*) и OFFSET включается
+    параметром `pagination=cursor`, дальше нужно переходить по ссылкам next/previous:
+    ```
+    curl -X GET "http://localhost:8000/api/order_list/?pagination=cursor&status=pending"
+    ```
     """
 
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     pagination_class = OrderPagination
+    cursor_pagination_class = OrderCursorPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = OrderFilter
 
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Возвращает страницу заказов (при ORDER_VALUES_SERIALIZER — без экземпляров моделей).
+        """
+        if not settings.ORDER_VALUES_SERIALIZER:
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        return self.get_paginated_response(OrderValuesSerializer.serialize(page))
+
+    @property
+    def paginator(self) -> OrderPagination | OrderCursorPagination:
+        """
+        Возвращает пагинатор: курсорный при `pagination=cursor`, иначе постраничный.
+        """
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
 
+@method_decorator(conditional_order_detail, name='get')
 class ApiOrderDetail(OrderQuerysetMixin, RetrieveAPIView):
     """
     API для получения деталей конкретного заказа.
@@ -65,12 +116,37 @@ class ApiOrderDetail(OrderQuerysetMixin, RetrieveAPIView):
     ```
     curl -X GET http://localhost:8000/api/order/1/
     ```
+
+    Ответ содержит ETag и Last-Modified; повторный запрос с If-None-Match
+    (или If-Modified-Since) без изменений заказа получает 304 за один запрос к БД:
+    ```
+    curl -X GET http://localhost:8000/api/order/1/ -H 'If-None-Match: "<etag>"'
+    ```
+
+    Оплаченный заказ, перенесенный в архив (archive_orders), отдается из архива в том же формате.
     """
 
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     lookup_field = 'id'
 
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        """
+        Возвращает заказ (при ORDER_VALUES_SERIALIZER — без экземпляров моделей),
+        а если его нет среди рабочих — из архива.
+        """
+        try:
+            if not settings.ORDER_VALUES_SERIALIZER:
+                return super().retrieve(request, *args, **kwargs)
+            order, = OrderValuesSerializer.serialize([self.get_object()])
+        except Http404:
+            archived = ArchivedOrderValuesSerializer.setup_eager_loading(ArchivedOrder.objects.filter(id=kwargs['id']))
+            orders = ArchivedOrderValuesSerializer.serialize(list(archived))
+            if not orders:
+                raise
+            order, = orders
+        return Response(order)
+
 
 class ApiOrderCreate(CreateAPIView):
     """
@@ -152,6 +228,115 @@ class ApiOrderUpdate(UpdateAPIView):
         logger.info(f"Заказ {order.id} успешно обновлен.")
 
 
+class ApiOrderBulkStatus(APIView):
+    """
+    API для массовой смены статуса заказов одним запросом к БД.
+
+    Недопустимые переходы (например, из «Оплачено») пропускаются,
+    в ответе возвращается результат по каждому заказу.
+
+    Пример запроса по списку заказов:
+    ```
+    curl -X POST http://localhost:8000/api/order/bulk_status/ \\
+    -H "Content-Type: application/json" \\
+    -d '{"ids": [1, 2, 3], "status": "ready"}'
+    ```
+
+    Пример запроса по столу (оплатить все готовые заказы стола 5):
+    ```
+    curl -X POST http://localhost:8000/api/order/bulk_status/ \\
+    -H "Content-Type: application/json" \\
+    -d '{"table_number": 5, "current_status": "ready", "status": "paid"}'
+    ```
+    """
+
+    def post(self, request: Request) -> Response:
+        """
+        Меняет статус заказов и возвращает результат по каждому из них.
+        """
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        updated = sum(1 for result in results if result['result'] == 'updated')
+        logger.info(f"Статус '{serializer.validated_data['status']}' установлен для {updated} заказов.")
+        return Response({'updated': updated, 'results': results}, status=status.HTTP_200_OK)
+
+
+class ApiTableBalance(APIView):
+    """
+    API открытых счетов столов: сумма и число неоплаченных заказов.
+
+    Ответ читается из TableBalance, который обновляется при каждом изменении
+    заказов, поэтому стоимость запроса не зависит от числа заказов и позиций.
+
+    Пример запроса по столу (стол без открытых заказов — нулевой счет):
+    ```
+    curl -X GET http://localhost:8000/api/table_balance/7/
+    ```
+
+    Пример запроса по всем столам с открытыми заказами (обзор зала):
+    ```
+    curl -X GET http://localhost:8000/api/table_balance/
+    ```
+    """
+
+    def get(self, request: Request, table_number: Optional[int] = None) -> Response:
+        """
+        Возвращает открытый счет стола или список открытых счетов всех столов.
+        """
+        if table_number is None:
+            balances = TableBalance.objects.filter(open_orders__gt=0)
+            return Response(TableBalanceSerializer(balances, many=True).data)
+        balance = TableBalance.objects.filter(table_number=table_number).first()
+        if balance is None:
+            balance = TableBalance(table_number=table_number)
+        return Response(TableBalanceSerializer(balance).data)
+
+
+class ApiOrderExport(APIView):
+    """
+    API для потоковой выгрузки заказов с позициями за диапазон дат (CSV или NDJSON).
+
+    Выгрузка не ограничена размером страницы: строки читаются серверным курсором
+    и отдаются по мере чтения, память сервера от объема не зависит.
+    Одна строка — одна позиция заказа; заказ без позиций — строка с пустыми полями позиции.
+    Оплаченные заказы, перенесенные в архив, тоже входят в выгрузку.
+
+    Параметры:
+    - `date_from`, `date_to` (date): Диапазон дат создания заказов (включительно).
+    - `file_format` (str): csv (по умолчанию) или ndjson.
+    - `status` (str), `table_number` (int): Необязательные фильтры.
+
+    Пример запроса:
+    ```
+    curl -o orders.csv "http://localhost:8000/api/order/export/?date_from=2025-01-01&date_to=2025-03-31"
+    ```
+    """
+
+    def get(self, request: Request) -> StreamingHttpResponse:
+        query = OrderExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        # Строки читаются уже после выхода из представления: база (реплика или основная) выбирается сейчас
+        with replica_reads():
+            database = router.db_for_read(Order)
+        querysets = [
+            queryset.using(database) for queryset in OrderExportService.get_querysets(
+                params['date_from'], params['date_to'], params.get('status'), params.get('table_number'),
+            )
+        ]
+        blocks = OrderExportService.iter_export(params['file_format'], querysets)
+        if isinstance(request._request, ASGIRequest):
+            # Под ASGI синхронный итератор был бы прочитан в память целиком
+            blocks = aiter_in_thread(blocks)
+
+        response = StreamingHttpResponse(blocks, content_type=EXPORT_CONTENT_TYPES[params['file_format']])
+        filename = f"orders_{params['date_from']}_{params['date_to']}.{params['file_format']}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class ApiOrderDelete(DestroyAPIView):
     """
     API для удаления заказа.
@@ -185,31 +370,111 @@ class ApiRemoveDishFromOrder(APIView):
 
     def delete(self, request: Request, order_id: int, dish_id: int) -> Response:
         """
-        Удаляет блюдо из заказа и пересчитывает общую стоимость.
+        Удаляет блюдо из заказа и уменьшает общую стоимость на стоимость позиции.
         """
         try:
-            # Находим заказ
-            order = Order.objects.get(pk=order_id)
-            # Находим связь между заказом и блюдом
-            order_dish = OrderDish.objects.filter(order=order, dish_id=dish_id).first()
-            if order_dish:
-                # Удаляем связь
-                order_dish.delete()
-                # Пересчитывается общая стоимость
-                order.calculate_total_price()
-                logger.info(f"Блюдо {dish_id} удалено из заказа {order_id}.")
-                return Response({"detail": "Блюдо удалено из заказа."}, status=status.HTTP_204_NO_CONTENT)
-            else:
-                logger.warning(f"Блюдо {dish_id} не найдено в заказе {order_id}.")
-                return Response({"detail": "Блюдо не найдено в заказе."}, status=status.HTTP_404_NOT_FOUND)
+            OrderService.remove_order_item(order_id, dish_id)
+            logger.info(f"Блюдо {dish_id} удалено из заказа {order_id}.")
+            return Response({"detail": "Блюдо удалено из заказа."}, status=status.HTTP_204_NO_CONTENT)
         except Order.DoesNotExist:
             logger.error(f"Заказ {order_id} не найден.")
             return Response({"detail": "Заказ не найден."}, status=status.HTTP_404_NOT_FOUND)
+        except OrderDish.DoesNotExist:
+            logger.warning(f"Блюдо {dish_id} не найдено в заказе {order_id}.")
+            return Response({"detail": "Блюдо не найдено в заказе."}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.error(f"Ошибка при удалении блюда из заказа: {str(e)}")
             return Response({"detail": "Произошла ошибка на сервере."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class ApiOrderItems(APIView):
+    """
+    API для добавления блюда в заказ.
+
+    Запрос выполняется за постоянное число обращений к БД независимо от размера
+    заказа: позиция вставляется, а общая стоимость увеличивается на ее стоимость.
+
+    Пример запроса:
+    ```
+    curl -X POST http://localhost:8000/api/order/1/items/ \\
+    -H "Content-Type: application/json" \\
+    -d '{"dish": 2, "quantity": 1}'
+    ```
+    """
+
+    def post(self, request: Request, order_id: int) -> Response:
+        """
+        Добавляет блюдо в заказ и возвращает позицию и новую общую стоимость.
+        """
+        serializer = OrderItemAddSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            line, total_price = OrderService.add_order_item(order_id, **serializer.validated_data)
+        except Order.DoesNotExist:
+            return Response({"detail": "Заказ не найден."}, status=status.HTTP_404_NOT_FOUND)
+        except DjangoValidationError as e:
+            return Response({"detail": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Блюдо {line.dish_id} добавлено в заказ {order_id}.")
+        data = dict(OrderItemAddSerializer(line).data, total_price=f'{total_price:.2f}')
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class ApiOrderItemDetail(APIView):
+    """
+    API для изменения количества блюда в заказе и его удаления.
+
+    Общая стоимость заказа меняется на разницу (F-выражением), без пересчета
+    всех позиций; в ответе возвращается новая общая стоимость.
+
+    Пример запроса (PATCH):
+    ```
+    curl -X PATCH http://localhost:8000/api/order/1/items/2/ \\
+    -H "Content-Type: application/json" \\
+    -d '{"quantity": 3}'
+    ```
+
+    Пример запроса (DELETE):
+    ```
+    curl -X DELETE http://localhost:8000/api/order/1/items/2/
+    ```
+    """
+
+    def patch(self, request: Request, order_id: int, dish_id: int) -> Response:
+        """
+        Меняет количество блюда в заказе и возвращает позицию и новую общую стоимость.
+        """
+        serializer = OrderItemQuantitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            line, total_price = OrderService.change_order_item_quantity(
+                order_id, dish_id, serializer.validated_data['quantity'],
+            )
+        except Order.DoesNotExist:
+            return Response({"detail": "Заказ не найден."}, status=status.HTTP_404_NOT_FOUND)
+        except OrderDish.DoesNotExist:
+            return Response({"detail": "Блюдо не найдено в заказе."}, status=status.HTTP_404_NOT_FOUND)
+
+        logger.info(f"Количество блюда {dish_id} в заказе {order_id} изменено на {line.quantity}.")
+        data = dict(OrderItemAddSerializer(line).data, total_price=f'{total_price:.2f}')
+        return Response(data, status=status.HTTP_200_OK)
+
+    def delete(self, request: Request, order_id: int, dish_id: int) -> Response:
+        """
+        Удаляет блюдо из заказа и возвращает новую общую стоимость.
+        """
+        try:
+            total_price = OrderService.remove_order_item(order_id, dish_id)
+        except Order.DoesNotExist:
+            return Response({"detail": "Заказ не найден."}, status=status.HTTP_404_NOT_FOUND)
+        except OrderDish.DoesNotExist:
+            return Response({"detail": "Блюдо не найдено в заказе."}, status=status.HTTP_404_NOT_FOUND)
+
+        logger.info(f"Блюдо {dish_id} удалено из заказа {order_id}.")
+        return Response({'total_price': f'{total_price:.2f}'}, status=status.HTTP_200_OK)
+
+
+@method_decorator(cache_menu_response, name='list')
 class DishViewSet(viewsets.ModelViewSet):
     """
     ViewSet для модели Dish.
@@ -249,6 +514,9 @@ class DishViewSet(viewsets.ModelViewSet):
     ```
     curl -X DELETE http://localhost:8000/api/dishes/1/
     ```
+
+    Список блюд отдается из кэша с ETag и Last-Modified по версии меню;
+    условный запрос (If-None-Match) без изменений меню получает 304.
     """
 
     queryset = Dish.objects.all()
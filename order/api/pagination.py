@@ -1,4 +1,11 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from django.core.paginator import InvalidPage, Page
+from django.db.models import F, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+from rest_framework.request import Request
 
 
 class OrderPagination(PageNumberPagination):
@@ -9,3 +16,146 @@ class OrderPagination(PageNumberPagination):
     page_size = 15
     page_size_query_param = 'page_size'
     max_page_size = 50
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request) -> Optional[List[Any]]:
+        """
+        Асинхронный вариант paginate_queryset (для асинхронных представлений).
+
+        COUNT и выборка страницы выполняются асинхронным ORM; ответ затем
+        строится обычным get_paginated_response().
+        """
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Количество уже посчитано, Paginator не будет выполнять COUNT сам
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        bottom = (number - 1) * paginator.per_page
+        results = [obj async for obj in queryset[bottom:bottom + paginator.per_page]]
+        self.page = Page(results, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return results
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация заказов по паре (created_at, id).
+
+    В отличие от OrderPagination не выполняет COUNT(*) и OFFSET: каждая страница —
+    это выборка «строго после ключа последней строки», поэтому глубокие страницы
+    стоят столько же, сколько первая. Токены next/previous непрозрачны (base64).
+    """
+    page_size = 15
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        """
+        Возвращает страницу заказов, следующих за позицией из курсора.
+        """
+        page_queryset = self.get_page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request) -> Optional[List[Any]]:
+        """
+        Асинхронный вариант paginate_queryset (для асинхронных представлений).
+        """
+        page_queryset = self.get_page_queryset(queryset, request)
+        if page_queryset is None:
+            return None
+        return self.set_page([obj async for obj in page_queryset])
+
+    def get_page_queryset(self, queryset: QuerySet, request: Request) -> Optional[QuerySet]:
+        """
+        Возвращает выборку страницы (на одну строку больше размера страницы,
+        чтобы узнать, есть ли следующая) без ее выполнения.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor.reverse)
+
+        # Ключ выбирается аннотацией, чтобы не зависеть от only() в queryset
+        queryset = queryset.annotate(cursor_created_at=F('created_at'))
+
+        # Для перехода назад выборка идет в обратном порядке и затем разворачивается
+        if self.reverse:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+
+        self.position = self.cursor.position if self.cursor else None
+        if self.position is not None:
+            created_at, pk = self._parse_position(self.position)
+            if self.reverse:
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results: List[Any]) -> List[Any]:
+        """
+        Запоминает страницу из результатов выборки get_page_queryset() и
+        определяет, есть ли соседние страницы.
+        """
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = self.position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self) -> Optional[str]:
+        """Возвращает ссылку на следующую страницу (после последней строки)."""
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self) -> Optional[str]:
+        """Возвращает ссылку на предыдущую страницу (перед первой строкой)."""
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance: Any, ordering: Tuple[str, ...]) -> str:
+        """Кодирует ключ строки (экземпляра модели или словаря из values()) как '<created_at в ISO 8601>|<id>'."""
+        if isinstance(instance, dict):
+            return f"{instance['cursor_created_at'].isoformat()}|{instance['id']}"
+        return f'{instance.cursor_created_at.isoformat()}|{instance.pk}'
+
+    def _parse_position(self, position: str) -> Tuple[datetime, int]:
+        """Разбирает ключ строки из курсора."""
+        try:
+            created_at, pk = position.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
@@ -1,5 +1,54 @@
+import re
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Tuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch, QuerySet
 from rest_framework import serializers
-from order.models import Dish, OrderDish, Order
+from order.export import EXPORT_CONTENT_TYPES
+from order.models import ArchivedOrderDish, Dish, OrderDish, Order, TableBalance
+from order.services import OrderService
+
+
+def get_only_fields(serializer: serializers.ModelSerializer) -> List[str]:
+    """
+    Возвращает поля модели, которые реально читает сериализатор, для QuerySet.only().
+
+    Поля вида get_<field>_display сводятся к самому полю, вложенные сериализаторы
+    по внешнему ключу добавляют свои поля через «__».
+    """
+    model_fields = {field.name for field in serializer.Meta.model._meta.concrete_fields}
+    only_fields = []
+    for field in serializer.fields.values():
+        source = field.source.split('.')[0]
+        display = re.fullmatch(r'get_(\w+)_display', source)
+        if display:
+            source = display.group(1)
+        if source not in model_fields:
+            continue
+        only_fields.append(source)
+        if isinstance(field, serializers.ModelSerializer):
+            only_fields.extend(f'{source}__{name}' for name in get_only_fields(field))
+    return only_fields
+
+
+# Порядок позиций в заказе: в порядке добавления. Именно order_id, а не order:
+# иначе сортировка пошла бы по Meta.ordering заказа через JOIN с order_order
+ORDER_ITEMS_ORDERING = ('order_id', 'pk')
+
+
+def get_select_related(serializer: serializers.ModelSerializer) -> List[str]:
+    """Возвращает внешние ключи, которые сериализатор выводит вложенными объектами."""
+    return [
+        field.source for field in serializer.fields.values()
+        if isinstance(field, serializers.ModelSerializer)
+    ]
+
+
+def format_decimal(value: Decimal) -> str:
+    """Форматирует сумму как DecimalField в DRF (строка с двумя знаками после запятой)."""
+    return f'{value:.2f}'
 
 
 class DishSerializer(serializers.ModelSerializer):
@@ -12,6 +61,16 @@ class DishSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'price']
 
 
+class TableBalanceSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для модели TableBalance.
+    Используется для представления открытого счета стола.
+    """
+    class Meta:
+        model = TableBalance
+        fields = ['table_number', 'open_total', 'open_orders']
+
+
 class OrderDishSerializer(serializers.ModelSerializer):
     """
     Сериализатор для модели OrderDish.
@@ -36,6 +95,109 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['id', 'table_number', 'items', 'total_price', 'status']
 
+    @classmethod
+    def setup_eager_loading(cls, queryset: QuerySet[Order]) -> QuerySet[Order]:
+        """
+        Загружает ровно те поля, которые выводит сериализатор.
+
+        Заказы выбираются одним запросом, позиции вместе с блюдами — вторым (JOIN),
+        поэтому число запросов не зависит от количества заказов на странице.
+        """
+        serializer = cls()
+        items = serializer.fields['items'].child
+        order_dishes = OrderDish.objects.select_related(*get_select_related(items)).only(
+            'order', *get_only_fields(items)
+        ).order_by(*ORDER_ITEMS_ORDERING)
+        return queryset.prefetch_related(
+            Prefetch(items.source, queryset=order_dishes),
+        ).only(*get_only_fields(serializer))
+
+
+class OrderValuesSerializer:
+    """
+    Быстрый вариант OrderSerializer только для чтения.
+
+    Заказы и позиции выбираются через values()/values_list() и собираются в словари
+    без создания экземпляров Order, OrderDish и Dish и без полей DRF. Вывод
+    совпадает с OrderSerializer байт в байт (это проверяют тесты), поэтому при
+    изменении OrderSerializer нужно изменить и этот класс.
+    Используется при настройке ORDER_VALUES_SERIALIZER.
+    """
+    order_fields = ('id', 'table_number', 'total_price', 'status')
+    item_fields = ('order_id', 'dish_id', 'dish__name', 'dish__price', 'quantity', 'price_at_order')
+    items_model = OrderDish
+
+    @classmethod
+    def setup_eager_loading(cls, queryset: QuerySet[Order]) -> QuerySet:
+        """
+        Возвращает queryset словарей с полями заказа (позиции выбираются в serialize()).
+        """
+        return queryset.values(*cls.order_fields)
+
+    @classmethod
+    def get_items_queryset(cls, order_ids: Iterable[int]) -> QuerySet:
+        """
+        Возвращает позиции заказов с блюдами одним запросом (JOIN), кортежами.
+        """
+        return (
+            cls.items_model.objects.filter(order_id__in=order_ids)
+            .order_by(*ORDER_ITEMS_ORDERING)
+            .values_list(*cls.item_fields)
+        )
+
+    @classmethod
+    def serialize(cls, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Возвращает данные заказов в формате OrderSerializer.
+
+        :param orders: Заказы из queryset setup_eager_loading().
+        """
+        items = cls.get_items_queryset([order['id'] for order in orders]) if orders else []
+        return cls.build(orders, items)
+
+    @classmethod
+    async def aserialize(cls, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Асинхронный вариант serialize().
+        """
+        items = []
+        if orders:
+            items = [item async for item in cls.get_items_queryset([order['id'] for order in orders])]
+        return cls.build(orders, items)
+
+    @staticmethod
+    def build(orders: List[Dict[str, Any]], items: Iterable[Tuple]) -> List[Dict[str, Any]]:
+        """
+        Собирает вложенную структуру заказов из строк заказов и позиций.
+        """
+        order_items = defaultdict(list)
+        for order_id, dish_id, dish_name, dish_price, quantity, price_at_order in items:
+            order_items[order_id].append({
+                'dish': {'id': dish_id, 'name': dish_name, 'price': format_decimal(dish_price)},
+                'quantity': quantity,
+                'price_at_order': format_decimal(price_at_order),
+            })
+
+        status_labels = dict(Order.StatusChoices.choices)
+        return [
+            {
+                'id': order['id'],
+                'table_number': order['table_number'],
+                'items': order_items.get(order['id'], []),
+                'total_price': format_decimal(order['total_price']),
+                'status': str(status_labels.get(order['status'], order['status'])),
+            }
+            for order in orders
+        ]
+
+
+class ArchivedOrderValuesSerializer(OrderValuesSerializer):
+    """
+    Вывод архивного заказа (ArchivedOrder) в том же формате, что и у рабочего:
+    после переноса в архив детали заказа в API не меняются.
+    """
+    items_model = ArchivedOrderDish
+
 
 class OrderDishCreateUpdateSerializer(serializers.ModelSerializer):
     """
@@ -58,6 +220,18 @@ class OrderCreateUpdateSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['table_number', 'items', 'status']
 
+    def validate_items(self, items_data: list) -> list:
+        """
+        Проверяет, что каждое блюдо указано в заказе не больше одного раза.
+
+        :param items_data: Список позиций заказа.
+        :return: Тот же список, если повторов нет.
+        """
+        dish_ids = [item_data['dish'].pk for item_data in items_data]
+        if len(dish_ids) != len(set(dish_ids)):
+            raise serializers.ValidationError("Блюдо указано в заказе несколько раз.")
+        return items_data
+
     def create(self, validated_data: dict) -> Order:
         """
         Создает новый заказ на основе переданных данных.
@@ -65,50 +239,101 @@ class OrderCreateUpdateSerializer(serializers.ModelSerializer):
         :param validated_data: Валидированные данные для создания заказа.
         :return: Созданный объект Order.
         """
-        items_data = validated_data.pop('order_dishes')
-        order = Order.objects.create(**validated_data)
-        for item_data in items_data:
-            OrderDish.objects.create(
-                order=order,
-                dish=item_data['dish'],
-                quantity=item_data['quantity'],
-                price_at_order=item_data['price_at_order']
-            )
-        order.calculate_total_price()
-        return order
+        items_data = validated_data.pop('order_dishes', [])
+        return OrderService.create_order_with_items(items_data, **validated_data)
 
     def update(self, instance: Order, validated_data: dict) -> Order:
         """
         Обновляет существующий заказ на основе переданных данных.
 
+        Если передан список блюд, позиции заказа синхронизируются с ним
+        (без удаления и пересоздания неизмененных позиций).
+
         :param instance: Объект Order, который нужно обновить.
         :param validated_data: Валидированные данные для обновления заказа.
         :return: Обновленный объект Order.
+        :raises serializers.ValidationError: Если переход в новый статус недопустим.
         """
         items_data = validated_data.pop('order_dishes', None)
+        try:
+            return OrderService.update_order_with_items(instance, items_data, **validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'status': e.messages})
+
+
+class OrderExportQuerySerializer(serializers.Serializer):
+    """
+    Сериализатор параметров выгрузки заказов: диапазон дат, формат и фильтры.
+
+    Параметр формата называется file_format: `format` в DRF выбирает рендерер ответа.
+    """
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    file_format = serializers.ChoiceField(choices=list(EXPORT_CONTENT_TYPES), default='csv')
+    status = serializers.ChoiceField(choices=Order.StatusChoices.choices, required=False)
+    table_number = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, attrs: dict) -> dict:
+        """Проверяет, что диапазон дат задан корректно."""
+        if attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from не может быть позже date_to.")
+        return attrs
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    """
+    Сериализатор для массовой смены статуса заказов.
+    Заказы задаются списком идентификаторов (ids) или номером стола
+    (table_number) с необязательным текущим статусом (current_status).
+    """
+    status = serializers.ChoiceField(choices=Order.StatusChoices.choices)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=500,
+    )
+    table_number = serializers.IntegerField(required=False, min_value=1)
+    current_status = serializers.ChoiceField(choices=Order.StatusChoices.choices, required=False)
+
+    def validate(self, attrs: dict) -> dict:
+        """
+        Проверяет, что заказы заданы списком идентификаторов или номером стола.
+
+        :param attrs: Данные запроса.
+        :return: Те же данные.
+        """
+        if 'ids' not in attrs and 'table_number' not in attrs:
+            raise serializers.ValidationError("Укажите ids или table_number.")
+        return attrs
+
+    def save(self) -> list:
+        """
+        Меняет статус выбранных заказов.
+
+        :return: Результат по каждому заказу.
+        """
+        return OrderService.bulk_change_status(
+            self.validated_data['status'],
+            order_ids=self.validated_data.get('ids'),
+            table_number=self.validated_data.get('table_number'),
+            current_status=self.validated_data.get('current_status'),
+        )
+
+
+class OrderItemAddSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для добавления одного блюда в заказ.
+    Цена по умолчанию берется из текущей цены блюда.
+    """
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+    class Meta:
+        model = OrderDish
+        fields = ['dish', 'quantity', 'price_at_order']
+        extra_kwargs = {'price_at_order': {'required': False}}
+
 
-        # Обновляю table_number, если оно передано
-        if 'table_number' in validated_data:
-            instance.table_number = validated_data['table_number']
-
-        # Обновляем статус, если он передан
-        if 'status' in validated_data:
-            instance.status = validated_data['status']
-
-        # Обновляем список блюд, если он передан
-        if items_data is not None:
-            # Удаляю старые блюда
-            instance.order_dishes.all().delete()
-            # Добавляею новые блюда
-            for item_data in items_data:
-                OrderDish.objects.create(
-                    order=instance,
-                    dish=item_data['dish'],
-                    quantity=item_data['quantity'],
-                    price_at_order=item_data['price_at_order']
-                )
-            # Общая стоимость пересчитывается
-            instance.calculate_total_price()
-
-        instance.save()
-        return instance
+class OrderItemQuantitySerializer(serializers.Serializer):
+    """Сериализатор для изменения количества блюда в заказе."""
+    quantity = serializers.IntegerField(min_value=1)
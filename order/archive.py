@@ -0,0 +1,112 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from order.models import ArchivedOrder, ArchivedOrderDish, Order, OrderDish
+
+logger = logging.getLogger(__name__)
+
+# Сколько заказов переносится в архив одной транзакцией
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def get_columns(model, exclude: Tuple[str, ...] = ()) -> List[str]:
+    """Возвращает экранированные имена столбцов таблицы модели."""
+    return [
+        connection.ops.quote_name(field.column)
+        for field in model._meta.concrete_fields if field.name not in exclude
+    ]
+
+
+class OrderArchiveService:
+    """
+    Перенос оплаченных заказов с позициями из рабочих таблиц в архив.
+
+    Рабочие таблицы (Order, OrderDish) остаются небольшими: в них только текущие
+    и недавние заказы. Перенос идет пакетами, каждый — одной транзакцией из
+    INSERT ... SELECT и DELETE на стороне БД. Сигналы не срабатывают: выручка
+    и другие агрегаты уже учитывают эти заказы, а архив учитывается в отчетах.
+    """
+
+    @staticmethod
+    def get_cutoff(days: int) -> datetime:
+        """
+        Возвращает момент, раньше которого оплаченные заказы переносятся в архив
+        (начало дня days дней назад в текущем часовом поясе).
+        """
+        day = timezone.localdate() - timedelta(days=days)
+        return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+    @staticmethod
+    @transaction.atomic
+    def archive_batch(cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> Tuple[int, int]:
+        """
+        Переносит в архив один пакет оплаченных заказов, созданных раньше cutoff.
+
+        Заказы блокируются (FOR UPDATE SKIP LOCKED), поэтому параллельный запуск
+        не переносит их дважды и не ждет чужих транзакций.
+
+        :param cutoff: Граница по дате создания.
+        :param batch_size: Наибольшее число заказов в пакете.
+        :return: Кортеж (перенесено заказов, перенесено позиций).
+        """
+        order_ids = list(
+            Order.objects.filter(status=Order.StatusChoices.PAID, created_at__lt=cutoff)
+            .order_by('created_at', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return 0, 0
+
+        order_columns = ', '.join(get_columns(ArchivedOrder, exclude=('archived_at',)))
+        line_columns = ', '.join(get_columns(ArchivedOrderDish))
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(ArchivedOrder._meta.db_table)} ({order_columns}, {quote("archived_at")}) '
+                f'SELECT {order_columns}, %s FROM {quote(Order._meta.db_table)} '
+                f'WHERE id = ANY(%s) AND created_at < %s',
+                [timezone.now(), order_ids, cutoff],
+            )
+            cursor.execute(
+                f'WITH moved AS ('
+                f'  DELETE FROM {quote(OrderDish._meta.db_table)} WHERE order_id = ANY(%s) RETURNING {line_columns}'
+                f') INSERT INTO {quote(ArchivedOrderDish._meta.db_table)} ({line_columns}) '
+                f'SELECT {line_columns} FROM moved',
+                [order_ids],
+            )
+            lines = cursor.rowcount
+            # Условие по created_at отсекает лишние секции, если таблица заказов секционирована
+            cursor.execute(
+                f'DELETE FROM {quote(Order._meta.db_table)} WHERE id = ANY(%s) AND created_at < %s',
+                [order_ids, cutoff],
+            )
+        return len(order_ids), lines
+
+    @staticmethod
+    def archive_orders(
+            days: int, batch_size: int = ARCHIVE_BATCH_SIZE, max_batches: Optional[int] = None,
+    ) -> Tuple[int, int]:
+        """
+        Переносит в архив все оплаченные заказы старше days дней, пакет за пакетом.
+
+        :param days: Возраст заказов в днях.
+        :param batch_size: Заказов в одном пакете (одной транзакции).
+        :param max_batches: Наибольшее число пакетов за запуск (None — без ограничения).
+        :return: Кортеж (перенесено заказов, перенесено позиций).
+        """
+        cutoff = OrderArchiveService.get_cutoff(days)
+        orders = lines = batches = 0
+        while max_batches is None or batches < max_batches:
+            moved_orders, moved_lines = OrderArchiveService.archive_batch(cutoff, batch_size)
+            if not moved_orders:
+                break
+            orders += moved_orders
+            lines += moved_lines
+            batches += 1
+            logger.info(f"В архив перенесено заказов: {moved_orders}, позиций: {moved_lines}")
+        return orders, lines
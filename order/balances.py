@@ -0,0 +1,46 @@
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from django.db.models import Count, Sum
+
+from cafe_order_system.db_utils import RunningTotalService
+from order.models import Order, TableBalance
+from order.signals import OrderState
+
+
+class TableBalanceService(RunningTotalService):
+    """
+    Сервис для ведения открытых счетов столов (TableBalance).
+
+    Открытый счет — неоплаченные заказы стола (в ожидании и готовые).
+    """
+    model = TableBalance
+    key_field = 'table_number'
+    value_fields = ('open_total', 'open_orders')
+
+    @staticmethod
+    def get_contribution(state: Optional[OrderState]) -> Optional[Tuple[int, Tuple[Decimal, int]]]:
+        """
+        Возвращает вклад заказа в данном состоянии в открытый счет стола.
+
+        :param state: Состояние заказа или None, если заказа нет.
+        :return: Кортеж (стол, (сумма, 1)) или None, если заказ не входит в открытый счет.
+        """
+        if state is None or state.status == Order.StatusChoices.PAID:
+            return None
+        return state.table_number, (Decimal(str(state.total_price)), 1)
+
+    @staticmethod
+    def calculate() -> Dict[int, Tuple[Decimal, int]]:
+        """
+        Рассчитывает открытые счета напрямую по заказам (одним GROUP BY).
+
+        :return: Словарь {стол: (сумма, число заказов)}.
+        """
+        rows = (
+            Order.objects.exclude(status=Order.StatusChoices.PAID)
+            .order_by()
+            .values('table_number')
+            .annotate(total=Sum('total_price'), count=Count('id'))
+        )
+        return {row['table_number']: (row['total'], row['count']) for row in rows}
@@ -0,0 +1,460 @@
+import asyncio
+import importlib
+import math
+import random
+import sys
+import threading
+import time
+import warnings
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.urls import clear_url_caches, reverse
+from django.utils.deprecation import RemovedInDjango60Warning
+
+from finance.services import RevenueLedgerService
+from order.api.pagination import OrderPagination
+from order.models import Dish, Order, OrderDish
+from order.services import OrderService
+
+# Сценарий нагрузки: имя, HTTP-метод и функция, возвращающая (url, данные) для очередного запроса
+Scenario = namedtuple('Scenario', ['name', 'method', 'make_request'])
+
+# Данные, на которых строятся запросы сценариев
+BenchmarkData = namedtuple('BenchmarkData', ['order_ids', 'dish_ids', 'random'])
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Режимы соединений с БД для замера: новое соединение на запрос, постоянное
+# соединение потока (CONN_MAX_AGE) и пул
+DB_CONNECTION_MODES = ('new', 'persistent', 'pool')
+
+# Кэш на время замеров: отдельный локальный, чтобы не очищать общий кэш (сессии, данные
+# других приложений) и не оставлять в нем меню и версию меню с тестовыми блюдами
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+class QueryTimer:
+    """
+    Обертка выполнения SQL (connection.execute_wrapper): считает запросы и время в БД.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: Dict) -> Any:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Возвращает перцентиль с линейной интерполяцией между соседними значениями.
+
+    :param values: Значения (непустой список).
+    :param percent: Перцентиль от 0 до 100.
+    :return: Значение перцентиля.
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def make_order_items(data: BenchmarkData, lines: int) -> List[Dict[str, Any]]:
+    """Возвращает позиции заказа для запросов создания и обновления."""
+    return [
+        {'dish': dish_id, 'quantity': data.random.randint(1, 3), 'price_at_order': '100.00'}
+        for dish_id in data.random.sample(data.dish_ids, min(lines, len(data.dish_ids)))
+    ]
+
+
+def get_scenarios(lines: int) -> List[Scenario]:
+    """
+    Возвращает сценарии для основных эндпоинтов заказов и финансов.
+
+    :param lines: Количество позиций в создаваемых и обновляемых заказах.
+    :return: Список сценариев.
+    """
+    order_list = reverse('orders:api_order_list')
+    return [
+        Scenario('order_list', 'get', lambda data: (order_list, {})),
+        Scenario('order_list_deep_page', 'get', lambda data: (
+            order_list, {'page': max(1, len(data.order_ids) // OrderPagination.page_size // 2)},
+        )),
+        Scenario('order_list_cursor', 'get', lambda data: (order_list, {'pagination': 'cursor'})),
+        Scenario('order_detail', 'get', lambda data: (
+            reverse('orders:api_order_detail', args=[data.random.choice(data.order_ids)]), {},
+        )),
+        Scenario('order_create', 'post', lambda data: (
+            reverse('orders:api_order_create'),
+            {'table_number': data.random.randint(1, 30), 'status': 'pending',
+             'items': make_order_items(data, lines)},
+        )),
+        Scenario('order_update', 'put', lambda data: (
+            reverse('orders:api_order_update', args=[data.random.choice(data.order_ids)]),
+            {'table_number': data.random.randint(1, 30), 'status': 'pending',
+             'items': make_order_items(data, lines)},
+        )),
+        Scenario('dish_list', 'get', lambda data: (reverse('orders:dish-list'), {})),
+        Scenario('calculate_revenue', 'get', lambda data: (reverse('finance:api_calculate_revenue'), {})),
+        Scenario('close_shift', 'post', lambda data: (reverse('finance:api_close_shift'), {})),
+    ]
+
+
+def get_read_scenarios() -> List[Scenario]:
+    """
+    Возвращает сценарии для эндпоинтов чтения, у которых есть асинхронные варианты
+    (настройка ASYNC_API_VIEWS).
+    """
+    order_list = reverse('orders:api_order_list')
+    return [
+        Scenario('order_list', 'get', lambda data: (order_list, {})),
+        Scenario('order_list_cursor', 'get', lambda data: (order_list, {'pagination': 'cursor'})),
+        Scenario('order_detail', 'get', lambda data: (
+            reverse('orders:api_order_detail', args=[data.random.choice(data.order_ids)]), {},
+        )),
+        Scenario('dish_list', 'get', lambda data: (reverse('orders:dish-list'), {})),
+        Scenario('dish_detail', 'get', lambda data: (
+            reverse('orders:dish-detail', args=[data.random.choice(data.dish_ids)]), {},
+        )),
+        Scenario('calculate_revenue', 'get', lambda data: (reverse('finance:api_calculate_revenue'), {})),
+    ]
+
+
+def reload_urlconf() -> None:
+    """
+    Перезагружает URLconf проекта, чтобы применилась новая настройка ASYNC_API_VIEWS.
+    """
+    with warnings.catch_warnings():
+        # Роутер DRF при повторной сборке маршрутов заново регистрирует свой конвертер
+        warnings.simplefilter('ignore', RemovedInDjango60Warning)
+        for module in ('order.urls', 'finance.urls', settings.ROOT_URLCONF):
+            if module in sys.modules:
+                importlib.reload(sys.modules[module])
+    clear_url_caches()
+
+
+async def asgi_get(application: Callable, path: str, params: Dict[str, Any]) -> int:
+    """
+    Выполняет GET-запрос напрямую к ASGI-приложению (без сети), как ASGI-сервер.
+
+    :param application: ASGI-приложение.
+    :param path: Путь запроса.
+    :param params: Параметры строки запроса.
+    :return: HTTP-статус ответа.
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': urlencode(params).encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'accept', b'application/json')],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+    messages = []
+    request_sent = False
+    # Клиент не отключается, пока ответ не отправлен
+    disconnected = asyncio.Event()
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message: Dict[str, Any]) -> None:
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]['status']
+
+
+def configure_db_connections(mode: str, pool_options: Dict[str, Any]) -> None:
+    """
+    Переключает режим соединений с БД (default) во всех потоках процесса.
+
+    Открытые соединения текущего потока и пул закрываются, новые соединения
+    открываются уже в заданном режиме.
+
+    :param mode: Режим из DB_CONNECTION_MODES.
+    :param pool_options: Параметры пула для режима pool.
+    """
+    connections.close_all()
+    connection.close_pool()
+    # Словарь настроек общий для соединений всех потоков
+    settings_dict = connection.settings_dict
+    settings_dict['OPTIONS'].pop('pool', None)
+    settings_dict['CONN_MAX_AGE'] = 60 if mode == 'persistent' else 0
+    if mode == 'pool':
+        settings_dict['OPTIONS']['pool'] = pool_options
+
+
+def wsgi_get(application: Callable, path: str, params: Dict[str, Any]) -> int:
+    """
+    Выполняет GET-запрос напрямую к WSGI-приложению (без сети), как WSGI-сервер.
+
+    В отличие от тестового клиента Django соединения с БД закрываются и
+    возвращаются в пул по окончании запроса, как на рабочем сервере.
+
+    :param application: WSGI-приложение.
+    :param path: Путь запроса.
+    :param params: Параметры строки запроса.
+    :return: HTTP-статус ответа.
+    """
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': urlencode(params),
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': 'testserver',
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+    response = application(environ, lambda status, headers: statuses.append(int(status.split()[0])))
+    try:
+        for _ in response:
+            pass
+    finally:
+        # Сигнал request_finished (закрытие соединений) отправляется при закрытии ответа
+        response.close()
+    return statuses[0]
+
+
+class BenchmarkService:
+    """
+    Сервис нагрузочного замера эндпоинтов через тестовый клиент Django.
+    """
+
+    @staticmethod
+    def seed(dishes: int, orders: int, lines: int, seed: int = 0) -> BenchmarkData:
+        """
+        Создает тестовые блюда, заказы и позиции пакетными вставками.
+
+        :param dishes: Количество блюд.
+        :param orders: Количество заказов.
+        :param lines: Позиций в каждом заказе.
+        :param seed: Начальное значение генератора случайных чисел.
+        :return: Данные для построения запросов.
+        """
+        rnd = random.Random(seed)
+        dish_objects = Dish.objects.bulk_create(
+            Dish(name=f'Блюдо {i}', price=Decimal(100 + i)) for i in range(dishes)
+        )
+        order_objects = Order.objects.bulk_create(
+            (
+                Order(table_number=rnd.randint(1, 30), status=rnd.choice(Order.StatusChoices.values))
+                for _ in range(orders)
+            ),
+            batch_size=1000,
+        )
+        lines = min(lines, dishes)
+        OrderDish.objects.bulk_create(
+            (
+                OrderDish(order=order, dish=dish, quantity=rnd.randint(1, 3), price_at_order=dish.price)
+                for order in order_objects
+                for dish in rnd.sample(dish_objects, lines)
+            ),
+            batch_size=5000,
+        )
+        order_ids = [order.pk for order in order_objects]
+        OrderService.recalculate_totals(order_ids)
+        RevenueLedgerService.rebuild()
+        return BenchmarkData(order_ids, [dish.pk for dish in dish_objects], rnd)
+
+    @staticmethod
+    def run_scenario(
+            client: Client, scenario: Scenario, data: BenchmarkData, requests: int, warmup: int,
+    ) -> Dict[str, Any]:
+        """
+        Выполняет запросы сценария и возвращает статистику по ним.
+
+        :param client: Тестовый клиент Django.
+        :param scenario: Сценарий.
+        :param data: Данные для построения запросов.
+        :param requests: Количество замеряемых запросов.
+        :param warmup: Количество прогревочных запросов (не учитываются).
+        :return: Перцентили времени ответа (мс), число запросов к БД и время в БД (мс).
+        """
+        latencies, query_counts, db_times = [], [], []
+        for i in range(warmup + requests):
+            url, payload = scenario.make_request(data)
+            send = getattr(client, scenario.method)
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                start = time.perf_counter()
+                if scenario.method == 'get':
+                    response = send(url, payload)
+                else:
+                    response = send(url, payload, content_type='application/json')
+                elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise RuntimeError(f'{scenario.name}: {response.status_code} {response.content[:200]!r}')
+            if i >= warmup:
+                latencies.append(elapsed * 1000)
+                query_counts.append(timer.count)
+                db_times.append(timer.duration * 1000)
+
+        stats = {f'p{p}_ms': round(percentile(latencies, p), 3) for p in PERCENTILES}
+        stats.update({
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'max_ms': round(max(latencies), 3),
+            'queries_mean': round(sum(query_counts) / len(query_counts), 2),
+            'queries_max': max(query_counts),
+            'db_mean_ms': round(sum(db_times) / len(db_times), 3),
+        })
+        return stats
+
+    @staticmethod
+    def compare(
+            results: Dict[str, Dict[str, Any]],
+            baseline: Dict[str, Dict[str, Any]],
+            tolerance: float,
+            min_delta_ms: float,
+    ) -> List[Tuple[str, str, Optional[float], float]]:
+        """
+        Сравнивает результаты с базовыми и возвращает регрессии.
+
+        Регрессией считается рост p95 больше чем на tolerance (и не меньше min_delta_ms)
+        или рост максимального числа запросов к БД.
+
+        :param results: Текущие результаты по сценариям.
+        :param baseline: Базовые результаты по сценариям.
+        :param tolerance: Допустимый относительный рост p95 (0.2 — 20%).
+        :param min_delta_ms: Рост p95 меньше этого порога считается шумом.
+        :return: Список (сценарий, метрика, базовое значение, текущее значение).
+        """
+        regressions = []
+        for name, stats in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if stats['queries_max'] > base['queries_max']:
+                regressions.append((name, 'queries_max', base['queries_max'], stats['queries_max']))
+            if (stats['p95_ms'] > base['p95_ms'] * (1 + tolerance)
+                    and stats['p95_ms'] - base['p95_ms'] >= min_delta_ms):
+                regressions.append((name, 'p95_ms', base['p95_ms'], stats['p95_ms']))
+        return regressions
+
+    @staticmethod
+    async def run_concurrent(
+            application: Callable, scenario: Scenario, data: BenchmarkData, requests: int, concurrency: int,
+    ) -> Dict[str, Any]:
+        """
+        Выполняет запросы сценария к ASGI-приложению с заданным числом одновременных клиентов.
+
+        :param application: ASGI-приложение.
+        :param scenario: Сценарий (только GET).
+        :param data: Данные для построения запросов.
+        :param requests: Общее количество запросов.
+        :param concurrency: Количество одновременных клиентов.
+        :return: Пропускная способность (запросов/с), перцентили времени ответа (мс)
+            и наибольшее число потоков процесса во время замера.
+        """
+        latencies = []
+        remaining = requests
+        threads_max = threading.active_count()
+
+        async def client() -> None:
+            nonlocal remaining, threads_max
+            while remaining > 0:
+                remaining -= 1
+                url, params = scenario.make_request(data)
+                start = time.perf_counter()
+                status = await asgi_get(application, url, params)
+                latencies.append((time.perf_counter() - start) * 1000)
+                threads_max = max(threads_max, threading.active_count())
+                if status >= 400:
+                    raise RuntimeError(f'{scenario.name}: {status}')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        stats = {'rps': round(len(latencies) / elapsed, 1)}
+        stats.update({f'p{p}_ms': round(percentile(latencies, p), 3) for p in PERCENTILES})
+        stats['threads_max'] = threads_max
+        return stats
+
+    @staticmethod
+    def run_threaded(
+            application: Callable, scenario: Scenario, data: BenchmarkData, requests: int, concurrency: int,
+    ) -> Dict[str, Any]:
+        """
+        Выполняет запросы сценария к WSGI-приложению из заданного числа потоков,
+        как многопоточный WSGI-сервер.
+
+        :param application: WSGI-приложение.
+        :param scenario: Сценарий (только GET).
+        :param data: Данные для построения запросов.
+        :param requests: Общее количество запросов.
+        :param concurrency: Количество потоков.
+        :return: Пропускная способность (запросов/с) и перцентили времени ответа (мс).
+        """
+        latencies = []
+        lock = threading.Lock()
+        remaining = requests
+
+        def client() -> None:
+            nonlocal remaining
+            try:
+                while True:
+                    with lock:
+                        if remaining <= 0:
+                            return
+                        remaining -= 1
+                        url, params = scenario.make_request(data)
+                    start = time.perf_counter()
+                    status = wsgi_get(application, url, params)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if status >= 400:
+                        raise RuntimeError(f'{scenario.name}: {status}')
+            finally:
+                # Постоянные соединения потока закрываются вместе с ним
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(client) for _ in range(concurrency)]:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        stats = {'rps': round(len(latencies) / elapsed, 1)}
+        stats.update({f'p{p}_ms': round(percentile(latencies, p), 3) for p in PERCENTILES})
+        return stats
@@ -0,0 +1,258 @@
+import hashlib
+from asyncio import iscoroutinefunction
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.http import HttpRequest, HttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from order.models import ArchivedOrder, MenuVersion, Order
+
+# Ключ с копией текущей версии меню: (токен версии, время последнего изменения)
+MENU_VERSION_KEY = 'menu:version'
+# Первичный ключ единственной записи MenuVersion
+MENU_VERSION_PK = 1
+
+
+class MenuCache:
+    """
+    Версионированный кэш меню.
+
+    Версия меню хранится в БД (MenuVersion) и увеличивается при любом изменении Dish.
+    В кэше лежит ее копия, поэтому ETag, Last-Modified и ключи закэшированных ответов
+    вычисляются без обращения к базе данных, а старые ответы просто перестают
+    использоваться. Копия в локальном кэше процесса живет MENU_VERSION_TIMEOUT секунд:
+    после этого процесс перечитывает версию из БД и видит изменения блюд, сделанные
+    другими процессами. Истечение копии версию не меняет, и 304 продолжают работать.
+    """
+
+    @staticmethod
+    def get_version(request: HttpRequest) -> Tuple[str, datetime]:
+        """
+        Возвращает текущую версию меню (один раз за запрос).
+
+        :param request: Объект запроса.
+        :return: Кортеж (токен версии, время последнего изменения).
+        """
+        version = getattr(request, '_menu_version', None)
+        if version is None:
+            version = cache.get(MENU_VERSION_KEY)
+            if version is None:
+                # Копии нет (истекла, вытеснена или процесс только запущен) — читаем из БД
+                version = MenuCache.refresh()
+            request._menu_version = version
+        return version
+
+    @staticmethod
+    def refresh() -> Tuple[str, datetime]:
+        """
+        Читает версию меню из БД и обновляет ее копию в кэше.
+
+        Версия читается из основной базы: копия с отстающей реплики
+        могла бы остаться в общем кэше бессрочно.
+
+        :return: Кортеж (токен версии, время последнего изменения).
+        """
+        menu_version = MenuVersion.objects.using(DEFAULT_DB_ALIAS).filter(pk=MENU_VERSION_PK).first()
+        if menu_version is None:
+            menu_version, _ = MenuVersion.objects.using(DEFAULT_DB_ALIAS).get_or_create(
+                pk=MENU_VERSION_PK, defaults={'modified_at': timezone.now().replace(microsecond=0)},
+            )
+        version = (str(menu_version.version), menu_version.modified_at)
+        cache.set(MENU_VERSION_KEY, version, timeout=settings.MENU_VERSION_TIMEOUT)
+        return version
+
+    @staticmethod
+    def invalidate() -> None:
+        """
+        Увеличивает версию меню в БД (в текущей транзакции) и удаляет ее копию из кэша.
+
+        До фиксации транзакции запросы перечитывают из БД прежнюю версию.
+        Время округляется до секунд, как в HTTP-заголовках.
+        """
+        modified_at = timezone.now().replace(microsecond=0)
+        rows = MenuVersion.objects.using(DEFAULT_DB_ALIAS).filter(pk=MENU_VERSION_PK)
+        if not rows.update(version=F('version') + 1, modified_at=modified_at):
+            MenuVersion.objects.using(DEFAULT_DB_ALIAS).get_or_create(
+                pk=MENU_VERSION_PK, defaults={'version': 1, 'modified_at': modified_at},
+            )
+        cache.delete(MENU_VERSION_KEY)
+
+    @staticmethod
+    def get_variant(request: HttpRequest) -> str:
+        """Возвращает хэш представления ответа: путь с параметрами и заголовок Accept."""
+        variant = f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}"
+        return hashlib.md5(variant.encode()).hexdigest()
+
+    @staticmethod
+    def get_etag(request: HttpRequest, *args, **kwargs) -> str:
+        """
+        Возвращает ETag ответа меню: версия меню и представление ответа.
+        """
+        token, _ = MenuCache.get_version(request)
+        return f"{token}-{MenuCache.get_variant(request)[:8]}"
+
+    @staticmethod
+    def get_last_modified(request: HttpRequest, *args, **kwargs) -> datetime:
+        """
+        Возвращает время последнего изменения меню.
+        """
+        _, last_modified = MenuCache.get_version(request)
+        return last_modified
+
+    @staticmethod
+    def get_body_key(request: HttpRequest) -> str:
+        """Возвращает ключ кэша для тела ответа в текущей версии меню."""
+        token, _ = MenuCache.get_version(request)
+        return f"menu:body:{token}:{MenuCache.get_variant(request)}"
+
+
+class OrderDetailCache:
+    """
+    Валидаторы (ETag и Last-Modified) для деталей заказа.
+
+    Строятся по Order.updated_at, который меняется и при изменении позиций заказа,
+    по номеру версии меню из MenuVersion (в позициях выводятся блюда) и по представлению
+    ответа. Номер версии меняется только при изменении блюд, поэтому ETag заказа
+    не зависит от срока жизни копии версии в кэше. Для условного запроса нужен
+    только один запрос к БД — updated_at по первичному ключу (для архивного
+    заказа — второй, к ArchivedOrder).
+    """
+
+    @staticmethod
+    def make_validators(request: HttpRequest, updated_at: Optional[datetime]) -> Optional[Tuple[str, datetime]]:
+        """
+        Возвращает (ETag, Last-Modified) для заказа или None, если заказа нет.
+
+        :param request: Объект запроса.
+        :param updated_at: Время последнего изменения заказа.
+        """
+        if updated_at is None:
+            return None
+        token, menu_modified = MenuCache.get_version(request)
+        etag = f"{int(updated_at.timestamp() * 1_000_000)}-{token}-{MenuCache.get_variant(request)[:8]}"
+        return etag, max(updated_at, menu_modified)
+
+    @staticmethod
+    def get_validators(request: HttpRequest, id: int, **kwargs) -> Optional[Tuple[str, datetime]]:
+        """
+        Возвращает валидаторы заказа (один раз за запрос).
+        """
+        cached = getattr(request, '_order_validators', None)
+        if cached is None or cached[0] != id:
+            updated_at = Order.objects.filter(pk=id).values_list('updated_at', flat=True).first()
+            if updated_at is None:
+                updated_at = ArchivedOrder.objects.filter(pk=id).values_list('updated_at', flat=True).first()
+            cached = (id, OrderDetailCache.make_validators(request, updated_at))
+            request._order_validators = cached
+        return cached[1]
+
+    @staticmethod
+    async def aget_validators(request: HttpRequest, id: int) -> Optional[Tuple[str, datetime]]:
+        """
+        Асинхронный вариант get_validators().
+        """
+        updated_at = await Order.objects.filter(pk=id).values_list('updated_at', flat=True).afirst()
+        if updated_at is None:
+            updated_at = await ArchivedOrder.objects.filter(pk=id).values_list('updated_at', flat=True).afirst()
+        return OrderDetailCache.make_validators(request, updated_at)
+
+    @staticmethod
+    def get_etag(request: HttpRequest, *args, **kwargs) -> Optional[str]:
+        """Возвращает ETag деталей заказа."""
+        validators = OrderDetailCache.get_validators(request, **kwargs)
+        return validators and validators[0]
+
+    @staticmethod
+    def get_last_modified(request: HttpRequest, *args, **kwargs) -> Optional[datetime]:
+        """Возвращает время последнего изменения деталей заказа."""
+        validators = OrderDetailCache.get_validators(request, **kwargs)
+        return validators and validators[1]
+
+
+def invalidate_menu_cache() -> None:
+    """
+    Сбрасывает кэш меню: увеличивает версию меню в текущей транзакции
+    и обновляет ее копию в кэше после фиксации.
+
+    Новая версия появляется в кэше только после фиксации, поэтому параллельные
+    запросы не закэшируют под ней ответы по еще не зафиксированным данным.
+    """
+    MenuCache.invalidate()
+    transaction.on_commit(MenuCache.refresh, using=DEFAULT_DB_ALIAS)
+
+
+def cache_menu_response(view_func: Callable) -> Callable:
+    """
+    Декоратор для представлений меню (GET), синхронных и асинхронных.
+
+    Добавляет ETag и Last-Modified по версии меню, отвечает 304 на условные
+    запросы и отдает тело ответа из кэша, не обращаясь к базе данных.
+    """
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapped_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            body_key = MenuCache.get_body_key(request)
+            cached = await cache.aget(body_key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = await view_func(request, *args, **kwargs)
+                if response.status_code == 200:
+                    await cache.aset(
+                        body_key, (response.content, response['Content-Type']), timeout=settings.MENU_CACHE_TIMEOUT,
+                    )
+            patch_vary_headers(response, ['Accept'])
+            return response
+    else:
+        @wraps(view_func)
+        def wrapped_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            body_key = MenuCache.get_body_key(request)
+            cached = cache.get(body_key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code == 200:
+                    def store(rendered_response: HttpResponse) -> None:
+                        cache.set(
+                            body_key,
+                            (rendered_response.content, rendered_response['Content-Type']),
+                            timeout=settings.MENU_CACHE_TIMEOUT,
+                        )
+
+                    if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+                        # Ответ (TemplateResponse или DRF Response) рендерится позже
+                        response.add_post_render_callback(store)
+                    else:
+                        store(response)
+            patch_vary_headers(response, ['Accept'])
+            return response
+
+    return condition(etag_func=MenuCache.get_etag, last_modified_func=MenuCache.get_last_modified)(wrapped_view)
+
+
+def conditional_order_detail(view_func: Callable) -> Callable:
+    """
+    Декоратор для деталей заказа (GET): ETag и Last-Modified по OrderDetailCache
+    и 304 на условные запросы без загрузки и сериализации заказа.
+
+    Cache-Control: no-cache заставляет клиентов и прокси каждый раз проверять
+    актуальность ответа, а не показывать его из кэша по эвристике Last-Modified.
+    """
+    conditional_view = condition(
+        etag_func=OrderDetailCache.get_etag, last_modified_func=OrderDetailCache.get_last_modified,
+    )(view_func)
+    return cache_control(private=True, no_cache=True)(conditional_view)
@@ -0,0 +1,251 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from order.models import Order
+
+if TYPE_CHECKING:
+    from order.signals import OrderStateChange
+
+logger = logging.getLogger(__name__)
+
+# Типы событий потока заказов
+ORDER_CREATED = 'created'
+ORDER_UPDATED = 'updated'
+ORDER_STATUS_CHANGED = 'status_changed'
+ORDER_DELETED = 'deleted'
+
+# Событие, после которого клиент должен перечитать данные целиком (подписчик не успевал
+# читать очередь или пропущенных при переподключении событий уже нет в истории)
+RESYNC = 'resync'
+
+
+class Subscription:
+    """
+    Подписка одного клиента: очередь событий в цикле событий клиента.
+
+    Очередь ограничена; если клиент не успевает ее читать, накопленные события
+    заменяются одним событием resync.
+    """
+
+    def __init__(self, maxsize: int):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event: Dict[str, Any]) -> None:
+        """
+        Кладет событие в очередь. Вызывается только в цикле событий подписки.
+        """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'id': event['id'], 'event': RESYNC, 'data': {}})
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Ждет следующее событие.
+
+        :param timeout: Максимальное время ожидания в секундах.
+        :return: Событие или None, если за timeout событий не было.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class OrderEventBroadcaster:
+    """
+    Рассыльщик событий заказов подписчикам текущего процесса.
+
+    Подписка — это очередь и ожидающая корутина, поэтому простаивающие клиенты
+    почти ничего не стоят. publish() можно вызывать из любого потока: события
+    передаются в цикл событий каждого подписчика через call_soon_threadsafe.
+
+    Последние ORDER_EVENTS_HISTORY_SIZE событий хранятся в истории: клиент,
+    переподключившийся с Last-Event-ID, получает пропущенные события, а если
+    их в истории уже нет (или идентификатор от другого процесса) — событие resync.
+    Идентификаторы событий — «<эпоха процесса>-<номер>», поэтому после перезапуска
+    старые идентификаторы не совпадут с новыми.
+
+    Класс выбирается настройкой ORDER_EVENTS_BROADCASTER. Чтобы разносить события
+    между несколькими процессами (Redis pub/sub, PostgreSQL LISTEN/NOTIFY и т.п.),
+    наследник переопределяет publish(): отправляет события в общий канал, а
+    получая их из канала, вызывает dispatch().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._epoch = uuid.uuid4().hex[:8]
+        self._ids = itertools.count(1)
+        self._last_number = 0
+        self._history: deque = deque(maxlen=settings.ORDER_EVENTS_HISTORY_SIZE)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Создает подписку в текущем цикле событий.
+
+        :param last_event_id: Идентификатор последнего полученного клиентом события
+            (заголовок Last-Event-ID при переподключении); пропущенные после него
+            события сразу кладутся в очередь подписки.
+        """
+        subscription = Subscription(settings.ORDER_EVENTS_QUEUE_SIZE)
+        with self._lock:
+            # История и подписка меняются под одной блокировкой с dispatch(): событие
+            # попадет к клиенту либо из истории, либо из рассылки, но не дважды
+            missed = [] if last_event_id is None else self._get_missed(last_event_id)
+            self._subscriptions.add(subscription)
+        for event in missed:
+            subscription.put(event)
+        return subscription
+
+    def _get_missed(self, last_event_id: str) -> List[Dict[str, Any]]:
+        """
+        Возвращает события после last_event_id или одно событие resync,
+        если продолжить поток с этого места нельзя.
+        """
+        epoch, _, number = last_event_id.partition('-')
+        if epoch == self._epoch and number.isdigit():
+            number = int(number)
+            if number == self._last_number:
+                return []
+            first_number = self._last_number - len(self._history) + 1
+            if first_number - 1 <= number < self._last_number:
+                return list(self._history)[number - first_number + 1:]
+        return [{'id': self._make_id(self._last_number), 'event': RESYNC, 'data': {}}]
+
+    def _make_id(self, number: int) -> str:
+        """Возвращает идентификатор события с номером number."""
+        return f'{self._epoch}-{number}'
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Удаляет подписку.
+        """
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, events: Iterable[Dict[str, Any]]) -> None:
+        """
+        Публикует события для всех подписчиков.
+
+        :param events: События в виде {'event': тип, 'data': данные}.
+        """
+        self.dispatch(events)
+
+    def dispatch(self, events: Iterable[Dict[str, Any]]) -> None:
+        """
+        Раздает события подписчикам текущего процесса.
+
+        :param events: События в виде {'event': тип, 'data': данные}.
+        """
+        with self._lock:
+            events = [{'id': self._make_id(next(self._ids)), **event} for event in events]
+            if events:
+                self._history.extend(events)
+                self._last_number += len(events)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            for event in events:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.put, event)
+                except RuntimeError:
+                    # Цикл событий подписчика уже закрыт
+                    self.unsubscribe(subscription)
+                    break
+
+
+@lru_cache(maxsize=None)
+def get_broadcaster() -> OrderEventBroadcaster:
+    """
+    Возвращает рассыльщик событий заказов, заданный настройкой ORDER_EVENTS_BROADCASTER.
+    """
+    return import_string(settings.ORDER_EVENTS_BROADCASTER)()
+
+
+@receiver(setting_changed)
+def reset_broadcaster(setting: str, **kwargs) -> None:
+    """
+    Сбрасывает рассыльщик при изменении настройки (override_settings в тестах).
+    """
+    if setting == 'ORDER_EVENTS_BROADCASTER':
+        get_broadcaster.cache_clear()
+
+
+def build_order_events(changes: Iterable['OrderStateChange']) -> List[Dict[str, Any]]:
+    """
+    Преобразует изменения заказов в события для клиентов.
+
+    :param changes: Изменения заказов (OrderStateChange).
+    :return: События в виде {'event': тип, 'data': данные заказа}.
+    """
+    status_labels = dict(Order.StatusChoices.choices)
+    events = []
+    for change in changes:
+        if change.after is None:
+            events.append({'event': ORDER_DELETED, 'data': {'id': change.order_id}})
+            continue
+        if change.before is None:
+            event_type = ORDER_CREATED
+        elif change.before.status != change.after.status:
+            event_type = ORDER_STATUS_CHANGED
+        else:
+            event_type = ORDER_UPDATED
+        events.append({
+            'event': event_type,
+            'data': {
+                'id': change.order_id,
+                'table_number': change.after.table_number,
+                'status': change.after.status,
+                'status_display': status_labels.get(change.after.status, change.after.status),
+                'total_price': change.after.total_price,
+                'created_at': change.after.created_at,
+            },
+        })
+    return events
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """
+    Форматирует событие в формате text/event-stream.
+    """
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+
+async def stream_order_events(
+        broadcaster: OrderEventBroadcaster, heartbeat: float, last_event_id: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """
+    Отдает события заказов в формате text/event-stream, пока клиент подключен.
+
+    :param broadcaster: Рассыльщик событий.
+    :param heartbeat: Интервал (в секундах) комментариев-пингов, по которым
+        прокси и клиент понимают, что соединение живо.
+    :param last_event_id: Последнее полученное клиентом событие (Last-Event-ID):
+        поток начинается с пропущенных после него событий.
+    """
+    subscription = broadcaster.subscribe(last_event_id)
+    try:
+        # Через сколько миллисекунд EventSource переподключается после обрыва
+        yield f'retry: {settings.ORDER_EVENTS_RETRY}\n\n'
+        while True:
+            event = await subscription.get(heartbeat)
+            yield ': ping\n\n' if event is None else format_event(event)
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,173 @@
+import csv
+import heapq
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence, Type
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Model, QuerySet
+from django.utils import timezone
+
+from order.models import ArchivedOrder, Order
+
+# Форматы выгрузки и их типы содержимого
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# Колонки выгрузки: одна строка на позицию заказа
+EXPORT_COLUMNS = (
+    'order_id', 'created_at', 'table_number', 'status', 'total_price',
+    'dish_id', 'dish_name', 'quantity', 'price_at_order', 'line_total',
+)
+
+# Сколько строк читается из серверного курсора за раз и отдается одним блоком
+EXPORT_CHUNK_SIZE = 2000
+
+
+class OrderExportService:
+    """
+    Потоковая выгрузка заказов с позициями в CSV или NDJSON.
+
+    Строки читаются серверным курсором (iterator(chunk_size)) и отдаются блоками,
+    поэтому память не зависит от размера выгрузки, а заголовок CSV уходит
+    клиенту до выполнения запроса. Оплаченные заказы, перенесенные в архив,
+    читаются вторым курсором и сливаются с рабочими по (created_at, id).
+    """
+
+    @staticmethod
+    def get_queryset(
+            date_from: date,
+            date_to: date,
+            status: Optional[str] = None,
+            table_number: Optional[int] = None,
+            model: Type[Model] = Order,
+    ) -> QuerySet:
+        """
+        Возвращает кортежи для выгрузки: по строке на позицию, заказ без позиций —
+        одной строкой с пустыми полями позиции (LEFT JOIN).
+
+        :param date_from: Первый день диапазона (по дате создания заказа).
+        :param date_to: Последний день диапазона (включительно).
+        :param status: Статус заказов.
+        :param table_number: Номер стола.
+        :param model: Order или ArchivedOrder.
+        """
+        # Границы дней в текущем часовом поясе, как в отчетах о выручке
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+        orders = model.objects.filter(created_at__gte=start, created_at__lt=end)
+        if status:
+            orders = orders.filter(status=status)
+        if table_number is not None:
+            orders = orders.filter(table_number=table_number)
+        # Порядок по индексу (created_at, id): строки идут из курсора без сортировки всей выборки
+        return orders.order_by('created_at', 'id', 'order_dishes__id').values_list(
+            'id', 'created_at', 'table_number', 'status', 'total_price',
+            'order_dishes__dish_id', 'order_dishes__dish__name',
+            'order_dishes__quantity', 'order_dishes__price_at_order',
+        )
+
+    @staticmethod
+    def get_querysets(
+            date_from: date,
+            date_to: date,
+            status: Optional[str] = None,
+            table_number: Optional[int] = None,
+    ) -> List[QuerySet]:
+        """
+        Возвращает выборки get_queryset() по рабочим заказам и по архиву.
+        Архив (только оплаченные заказы) не читается, если выгружается другой статус.
+        """
+        models = [Order]
+        if not status or status == Order.StatusChoices.PAID:
+            models.append(ArchivedOrder)
+        return [
+            OrderExportService.get_queryset(date_from, date_to, status, table_number, model)
+            for model in models
+        ]
+
+    @staticmethod
+    def make_row(values: Sequence[Any]) -> List[Any]:
+        """
+        Возвращает строку выгрузки (значения колонок EXPORT_COLUMNS) из кортежа запроса.
+        """
+        order_id, created_at, table_number, status, total_price, dish_id, dish_name, quantity, price = values
+        line_total = quantity * price if dish_id is not None else None
+        return [
+            order_id, created_at.isoformat(), table_number, status, str(total_price),
+            dish_id, dish_name, quantity,
+            None if price is None else str(price),
+            None if line_total is None else str(line_total),
+        ]
+
+    @staticmethod
+    def iter_export(
+            export_format: str,
+            querysets: Sequence[QuerySet],
+            chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> Iterator[str]:
+        """
+        Отдает выгрузку блоками текста: для CSV первым блоком идет заголовок.
+
+        Чтение идет в транзакции: серверный курсор вне транзакции создается
+        WITH HOLD, и PostgreSQL сначала материализует всю выборку.
+        Выборки уже упорядочены по (created_at, id) и сливаются без сортировки.
+
+        :param export_format: csv или ndjson.
+        :param querysets: Выборки из get_querysets() (из одной базы).
+        :param chunk_size: Строк в одном блоке (и в одной порции курсора).
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if export_format == 'csv' else None
+
+        def flush() -> str:
+            block = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return block
+
+        if writer is not None:
+            writer.writerow(EXPORT_COLUMNS)
+            yield flush()
+
+        with transaction.atomic(using=querysets[0].db):
+            rows = 0
+            merged = heapq.merge(
+                *(queryset.iterator(chunk_size=chunk_size) for queryset in querysets),
+                key=lambda values: (values[1], values[0]),
+            )
+            for values in merged:
+                row = OrderExportService.make_row(values)
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+                    buffer.write('\n')
+                rows += 1
+                if rows % chunk_size == 0:
+                    yield flush()
+        block = flush()
+        if block:
+            yield block
+
+
+async def aiter_in_thread(iterator: Iterator[str]) -> AsyncIterator[str]:
+    """
+    Асинхронно отдает блоки синхронного итератора выгрузки (для ASGI).
+
+    Каждый блок читается через sync_to_async в одном и том же потоке запроса,
+    поэтому транзакция и серверный курсор итератора живут между блоками, а
+    память, как и под WSGI, не растет. При обрыве соединения итератор
+    закрывается в том же потоке.
+    """
+    next_block = sync_to_async(next)
+    done = object()
+    try:
+        while (block := await next_block(iterator, done)) is not done:
+            yield block
+    finally:
+        await sync_to_async(iterator.close)()
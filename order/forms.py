@@ -1,5 +1,5 @@
 from django import forms
-from django.forms import inlineformset_factory
+from django.forms import BaseInlineFormSet, inlineformset_factory
 from order.models import Order, OrderDish, Dish
 
 
@@ -14,10 +14,28 @@ class OrderForm(forms.ModelForm):
         fields = ['table_number']
 
 
+class BaseOrderDishFormSet(BaseInlineFormSet):
+    """
+    FormSet позиций заказа.
+    Каждое блюдо может быть указано в заказе только один раз (ограничение order_dish_unique).
+    """
+
+    def clean(self):
+        """Проверяет, что блюда в позициях не повторяются."""
+        dishes = [
+            form.cleaned_data['dish'] for form in self.forms
+            if form.cleaned_data.get('dish') and not self._should_delete_form(form)
+        ]
+        if len(dishes) != len(set(dishes)):
+            raise forms.ValidationError("Блюдо указано в заказе несколько раз.", code='duplicate_dish')
+        super().clean()
+
+
 # FormSet для модели OrderDish
 OrderDishFormSet = inlineformset_factory(
     Order,  # Родительская модель
     OrderDish,  # Дочерняя модель
+    formset=BaseOrderDishFormSet,
     fields=['dish', 'quantity', 'price_at_order'],  # Поля, которые будут отображаться в форме
     extra=1,  # Количество дополнительных пустых форм для добавления новых блюд
     can_delete=False,
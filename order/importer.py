@@ -0,0 +1,281 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Type
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.core.serializers.python import Deserializer
+from django.db import connection, transaction
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django.db.models import DateTimeField, Model
+from django.utils import timezone
+
+from order.cache import invalidate_menu_cache
+from order.models import Dish, Order, OrderDish
+from order.partitions import OrderPartitionService
+
+# Сколько записей одной модели копируется в БД за раз
+IMPORT_BATCH_SIZE = 5000
+
+# Размер порции чтения JSON-файла (символов)
+JSON_READ_SIZE = 1 << 16
+
+# Временная таблица с идентификаторами заказов, чью стоимость нужно пересчитать
+IMPORTED_ORDERS_TABLE = 'import_order_ids'
+
+
+def iter_json_array(stream: IO[str], read_size: int = JSON_READ_SIZE) -> Iterator[Any]:
+    """
+    Перебирает элементы JSON-массива (формат фикстур Django), читая файл порциями,
+    а не загружая его целиком.
+
+    :param stream: Текстовый поток с массивом.
+    :param read_size: Размер порции чтения.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    while True:
+        chunk = stream.read(read_size)
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ',')):
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError("Ожидался JSON-массив записей.")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Элемент прочитан не полностью: дочитываем следующую порцию
+                if not chunk:
+                    raise
+                break
+            yield item
+        buffer = buffer[position:]
+        if not chunk:
+            raise ValueError("JSON-массив не завершен.")
+
+
+def iter_csv_records(stream: IO[str], model: Type[Model]) -> Iterator[Dict[str, Any]]:
+    """
+    Превращает строки CSV (заголовок — имена полей, id или pk — первичный ключ)
+    в записи формата фикстур. Пустые значения nullable-полей становятся NULL.
+
+    :param stream: Текстовый поток CSV.
+    :param model: Модель, к которой относятся строки.
+    """
+    label = model._meta.label_lower
+    fields = {field.attname: field.name for field in model._meta.concrete_fields}
+    nullable = {field.name for field in model._meta.concrete_fields if field.null}
+    pk_names = {'pk', 'id', model._meta.pk.attname}
+    for row in csv.DictReader(stream):
+        pk = next((row.pop(name) for name in pk_names & row.keys()), None)
+        values = {}
+        for column, value in row.items():
+            name = fields.get(column, column)
+            values[name] = None if value == '' and name in nullable else value
+        yield {'model': label, 'pk': pk, 'fields': values}
+
+
+def iter_file_records(path: Path, model: Optional[Type[Model]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Перебирает записи файла: JSON-массив фикстур, NDJSON (запись фикстуры в строке) или CSV.
+
+    :param path: Путь к файлу; формат определяется по расширению.
+    :param model: Модель для CSV (по умолчанию — из имени файла, например order.dish.csv).
+    """
+    suffix = path.suffix.lower()
+    with open(path, encoding='utf-8', newline='' if suffix == '.csv' else None) as stream:
+        if suffix == '.csv':
+            if model is None:
+                model = apps.get_model(path.stem)
+            yield from iter_csv_records(stream, model)
+        elif suffix in ('.ndjson', '.jsonl'):
+            yield from (json.loads(line) for line in stream if line.strip())
+        else:
+            yield from iter_json_array(stream)
+
+
+class DataImportService:
+    """
+    Пакетная загрузка данных (блюд, заказов, позиций, выручки) в PostgreSQL.
+
+    В отличие от loaddata записи не сохраняются по одной: каждая порция модели
+    копируется командой COPY во временную таблицу и переносится одним
+    INSERT ... ON CONFLICT (id) DO UPDATE, поэтому повторная загрузка тех же
+    данных обновляет записи. Сигналы моделей не срабатывают; стоимость заказов
+    пересчитывается в конце одним UPDATE по затронутым заказам.
+
+    У секционированной таблицы заказов (partition_orders convert) первичный ключ —
+    (id, created_at), и уникального ограничения на один id, нужного ON CONFLICT (id),
+    нет: заказы переносятся двумя запросами — UPDATE существующих по id (заказ
+    с измененной датой переезжает в свою секцию) и INSERT остальных.
+    """
+
+    def __init__(self, batch_size: int = IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.pending: Dict[Type[Model], List[Model]] = defaultdict(list)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.staging_tables: Dict[Type[Model], str] = {}
+        self.now = timezone.now()
+        self.orders_partitioned: Optional[bool] = None
+
+    def run(self, records: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Загружает записи в одной транзакции (ссылки между моделями проверяются при фиксации)
+        и пересчитывает стоимость затронутых заказов.
+
+        :param records: Записи в формате фикстур Django ({model, pk, fields}).
+        :return: Число загруженных записей по моделям и число исправленных сумм заказов (totals_fixed).
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {IMPORTED_ORDERS_TABLE} (id bigint PRIMARY KEY) ON COMMIT DROP'
+            )
+            for deserialized in Deserializer(records):
+                obj = deserialized.object
+                self.pending[type(obj)].append(obj)
+                if len(self.pending[type(obj)]) >= self.batch_size:
+                    self.flush(cursor, type(obj))
+            for model in list(self.pending):
+                self.flush(cursor, model)
+
+            # Записи загружены с явными id: последовательности продолжают нумерацию после них
+            for sql in connection.ops.sequence_reset_sql(no_style(), list(self.staging_tables)):
+                cursor.execute(sql)
+            self.counts['totals_fixed'] = self.recalculate_totals(cursor)
+            for table in self.staging_tables.values():
+                cursor.execute(f'DROP TABLE {table}')
+            cursor.execute(f'DROP TABLE {IMPORTED_ORDERS_TABLE}')
+
+        if Dish in self.staging_tables:
+            # Сигнал Dish, сбрасывающий кэш меню, при загрузке не срабатывает
+            invalidate_menu_cache()
+        return dict(self.counts)
+
+    def flush(self, cursor, model: Type[Model]) -> None:
+        """
+        Копирует накопленную порцию записей модели в БД: COPY во временную таблицу,
+        затем INSERT ... ON CONFLICT в основную.
+        """
+        objs = self.pending.pop(model, [])
+        if not objs:
+            return
+        opts = model._meta
+        fields = opts.concrete_fields
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        table = connection.ops.quote_name(opts.db_table)
+        staging = self.get_staging_table(cursor, model)
+
+        buffer = io.StringIO()
+        for obj in objs:
+            if obj.pk is None:
+                raise ValueError(f"Запись {opts.label_lower} без первичного ключа.")
+            buffer.write('\t'.join(self.copy_value(obj, field) for field in fields))
+            buffer.write('\n')
+        copy_sql = f'COPY {staging} ({columns}) FROM STDIN'
+        if is_psycopg3:
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+
+        pk_column = connection.ops.quote_name(opts.pk.column)
+        if model is Order and self.is_orders_partitioned():
+            updates = ', '.join(
+                f'{connection.ops.quote_name(field.column)} = s.{connection.ops.quote_name(field.column)}'
+                for field in fields if not field.primary_key
+            )
+            cursor.execute(
+                f'UPDATE {table} AS t SET {updates} FROM {staging} AS s WHERE t.{pk_column} = s.{pk_column}'
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} AS s '
+                f'WHERE NOT EXISTS (SELECT 1 FROM {table} AS t WHERE t.{pk_column} = s.{pk_column})'
+            )
+        else:
+            updates = ', '.join(
+                f'{connection.ops.quote_name(field.column)} = EXCLUDED.{connection.ops.quote_name(field.column)}'
+                for field in fields if not field.primary_key
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} '
+                f'ON CONFLICT ({pk_column}) DO UPDATE SET {updates}'
+            )
+        if model is Order or model is OrderDish:
+            order_column = 'id' if model is Order else OrderDish._meta.get_field('order').column
+            cursor.execute(
+                f'INSERT INTO {IMPORTED_ORDERS_TABLE} SELECT DISTINCT {order_column} FROM {staging} '
+                f'ON CONFLICT DO NOTHING'
+            )
+        cursor.execute(f'TRUNCATE {staging}')
+        self.counts[opts.label_lower] += len(objs)
+
+    def is_orders_partitioned(self) -> bool:
+        """Возвращает True, если таблица заказов секционирована (проверяется один раз за загрузку)."""
+        if self.orders_partitioned is None:
+            self.orders_partitioned = OrderPartitionService.is_partitioned()
+        return self.orders_partitioned
+
+    def get_staging_table(self, cursor, model: Type[Model]) -> str:
+        """Создает (один раз за загрузку) временную таблицу со структурой таблицы модели."""
+        if model not in self.staging_tables:
+            staging = connection.ops.quote_name(f'import_{model._meta.db_table}')
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {staging} '
+                f'(LIKE {connection.ops.quote_name(model._meta.db_table)} INCLUDING DEFAULTS) ON COMMIT DROP'
+            )
+            self.staging_tables[model] = staging
+        return self.staging_tables[model]
+
+    def copy_value(self, obj: Model, field) -> str:
+        """
+        Возвращает значение поля в текстовом формате COPY (NULL — \\N, спецсимволы экранируются).
+        """
+        value = getattr(obj, field.attname)
+        if value is None and isinstance(field, DateTimeField) and (field.auto_now or field.auto_now_add):
+            # Даты из файла сохраняются как есть; отсутствующие заполняются, как при save()
+            value = self.now
+        value = field.get_db_prep_save(value, connection)
+        if value is None:
+            return '\\N'
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        return (
+            str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r')
+        )
+
+    @staticmethod
+    def recalculate_totals(cursor) -> int:
+        """
+        Пересчитывает стоимость загруженных заказов одним UPDATE с SUM по позициям
+        (вместо пересчета на каждую позицию через сигналы OrderDish).
+
+        :return: Число заказов, у которых стоимость изменилась.
+        """
+        order_table = connection.ops.quote_name(Order._meta.db_table)
+        line_table = connection.ops.quote_name(OrderDish._meta.db_table)
+        cursor.execute(
+            f'UPDATE {order_table} AS o SET total_price = t.total, updated_at = %s '
+            f'FROM (SELECT i.id, COALESCE(SUM(l.quantity * l.price_at_order), 0) AS total '
+            f'      FROM {IMPORTED_ORDERS_TABLE} AS i LEFT JOIN {line_table} AS l ON l.order_id = i.id '
+            f'      GROUP BY i.id) AS t '
+            f'WHERE o.id = t.id AND o.total_price IS DISTINCT FROM t.total',
+            [timezone.now()],
+        )
+        return cursor.rowcount
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from order.archive import ARCHIVE_BATCH_SIZE, OrderArchiveService
+from order.models import Order
+
+
+class Command(BaseCommand):
+    """
+    Переносит оплаченные заказы старше заданного числа дней вместе с позициями
+    в архив (ArchivedOrder, ArchivedOrderDish).
+
+    Перенос идет пакетами по --batch-size заказов, каждый пакет — отдельной
+    короткой транзакцией, поэтому команду можно запускать на работающей системе
+    (например, по расписанию раз в сутки). Детали заказа, выгрузка и отчеты
+    о выручке учитывают архив.
+
+    Пример:
+        python manage.py archive_orders --days 90
+        python manage.py archive_orders --days 30 --batch-size 5000 --dry-run
+    """
+    help = 'Перенос старых оплаченных заказов в архив.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+                            help='Переносить оплаченные заказы старше этого числа дней.')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help='Заказов в одном пакете (транзакции).')
+        parser.add_argument('--max-batches', type=int, help='Наибольшее число пакетов за запуск.')
+        parser.add_argument('--dry-run', action='store_true', help='Только подсчитать заказы для переноса.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days не может быть отрицательным.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+
+        cutoff = OrderArchiveService.get_cutoff(options['days'])
+        if options['dry_run']:
+            count = Order.objects.filter(status=Order.StatusChoices.PAID, created_at__lt=cutoff).count()
+            self.stdout.write(f'Заказов для переноса в архив (созданы до {cutoff:%Y-%m-%d}): {count}')
+            return
+
+        orders, lines = OrderArchiveService.archive_orders(
+            options['days'], options['batch_size'], options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено в архив заказов: {orders}, позиций: {lines} (созданы до {cutoff:%Y-%m-%d}).'
+        ))
@@ -0,0 +1,115 @@
+import json
+import logging
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from order.benchmark import BENCHMARK_CACHES, BenchmarkService, PERCENTILES, get_scenarios
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию с тестовыми данными после замеров."""
+
+
+class Command(BaseCommand):
+    """
+    Замеряет время ответа основных эндпоинтов заказов и финансов.
+
+    Тестовые данные создаются в транзакции, которая в конце откатывается;
+    кэш на время замеров подменяется отдельным локальным (BENCHMARK_CACHES).
+    Результаты (перцентили времени ответа, число запросов и время в БД)
+    записываются в JSON и сравниваются с базовыми; при регрессии команда
+    завершается с ошибкой.
+
+    Пример:
+        python manage.py benchmark_api --orders 20000 --requests 100
+        python manage.py benchmark_api --output benchmarks/baseline.json  # новая базовая линия
+    """
+    help = 'Нагрузочный замер API заказов и финансов со сравнением с базовыми результатами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dishes', type=int, default=50, help='Количество тестовых блюд.')
+        parser.add_argument('--orders', type=int, default=5000, help='Количество тестовых заказов.')
+        parser.add_argument('--lines', type=int, default=3, help='Позиций в каждом заказе.')
+        parser.add_argument('--requests', type=int, default=50, help='Замеряемых запросов на эндпоинт.')
+        parser.add_argument('--warmup', type=int, default=5, help='Прогревочных запросов на эндпоинт.')
+        parser.add_argument('--only', nargs='+', help='Замерить только указанные сценарии.')
+        parser.add_argument('--output', default='benchmark_results.json', help='Файл для результатов (JSON).')
+        parser.add_argument('--baseline', default='benchmarks/baseline.json', help='Файл базовых результатов.')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Допустимый рост p95 (0.2 — 20%%).')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Рост p95 меньше порога — шум.')
+
+    def handle(self, *args, **options):
+        scenarios = get_scenarios(options['lines'])
+        if options['only']:
+            unknown = set(options['only']) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['only']]
+
+        results = {}
+        # Журналирование каждого SQL-запроса (DEBUG) искажает замеры
+        logging.disable(logging.INFO)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver'], CACHES=BENCHMARK_CACHES), transaction.atomic():
+                data = BenchmarkService.seed(options['dishes'], options['orders'], options['lines'])
+                cache.clear()
+                client = Client()
+                for scenario in scenarios:
+                    results[scenario.name] = BenchmarkService.run_scenario(
+                        client, scenario, data, options['requests'], options['warmup'],
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            logging.disable(logging.NOTSET)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'params': {
+                key: options[key] for key in ('dishes', 'orders', 'lines', 'requests', 'warmup')
+            },
+            'results': results,
+        }
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+        self.print_results(results)
+        self.stdout.write(f"Результаты записаны в {output}")
+        self.check_baseline(results, options)
+
+    def print_results(self, results):
+        """Выводит таблицу результатов."""
+        columns = [f'p{p}_ms' for p in PERCENTILES] + ['queries_max', 'db_mean_ms']
+        self.stdout.write(f"{'сценарий':<22}" + ''.join(f'{column:>13}' for column in columns))
+        for name, stats in results.items():
+            self.stdout.write(f'{name:<22}' + ''.join(f'{stats[column]:>13}' for column in columns))
+
+    def check_baseline(self, results, options):
+        """Сравнивает результаты с базовыми и завершает команду ошибкой при регрессии."""
+        baseline_path = Path(options['baseline'])
+        if not baseline_path.exists() or baseline_path.resolve() == Path(options['output']).resolve():
+            self.stdout.write(self.style.WARNING(f"Базовые результаты ({baseline_path}) не найдены, сравнение пропущено."))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('params') != {key: options[key] for key in baseline.get('params', {})}:
+            self.stdout.write(self.style.WARNING('Параметры замера отличаются от базовых, сравнение может быть неточным.'))
+
+        regressions = BenchmarkService.compare(
+            results, baseline['results'], options['tolerance'], options['min_delta_ms'],
+        )
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f'Регрессий относительно {baseline_path} нет.'))
+            return
+        for name, metric, before, after in regressions:
+            self.stdout.write(self.style.ERROR(f'{name}: {metric} {before} -> {after}'))
+        raise CommandError(f'Найдено регрессий: {len(regressions)}.')
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from order.benchmark import BENCHMARK_CACHES, BenchmarkService, get_read_scenarios, reload_urlconf
+
+MODES = ('sync', 'async')
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает синхронные и асинхронные (ASYNC_API_VIEWS) представления чтения
+    под одинаковой конкурентной нагрузкой.
+
+    Запросы идут напрямую в ASGI-приложение, как от ASGI-сервера: синхронные
+    представления выполняются в пуле потоков, асинхронные — в цикле событий.
+    Замер выполняется на временной базе (test_<имя БД>), которая создается
+    и удаляется командой, поэтому рабочие данные не затрагиваются.
+
+    Пример:
+        python manage.py benchmark_async --orders 5000 --requests 500 --concurrency 1 10 50
+    """
+    help = 'Сравнение синхронных и асинхронных представлений чтения под конкурентной нагрузкой (ASGI).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dishes', type=int, default=50, help='Количество тестовых блюд.')
+        parser.add_argument('--orders', type=int, default=5000, help='Количество тестовых заказов.')
+        parser.add_argument('--lines', type=int, default=3, help='Позиций в каждом заказе.')
+        parser.add_argument('--requests', type=int, default=500, help='Запросов на сценарий и уровень нагрузки.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50],
+                            help='Числа одновременных клиентов.')
+        parser.add_argument('--only', nargs='+', help='Замерить только указанные сценарии.')
+        parser.add_argument('--output', default='benchmark_async_results.json', help='Файл для результатов (JSON).')
+
+    def handle(self, *args, **options):
+        scenarios = get_read_scenarios()
+        if options['only']:
+            unknown = set(options['only']) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['only']]
+
+        results = {}
+        # Журналирование каждого SQL-запроса (DEBUG) искажает замеры
+        logging.disable(logging.INFO)
+        old_name = connection.settings_dict['NAME']
+        # Пул соединений создан для прежней базы: соединения к временной берутся из нового
+        connection.close()
+        connection.close_pool()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            data = BenchmarkService.seed(options['dishes'], options['orders'], options['lines'])
+            # Запросы выполняются в других потоках со своими соединениями
+            connection.close()
+            for mode in MODES:
+                with override_settings(
+                        ASYNC_API_VIEWS=mode == 'async', ALLOWED_HOSTS=['testserver'], CACHES=BENCHMARK_CACHES,
+                ):
+                    reload_urlconf()
+                    application = get_asgi_application()
+                    for scenario in scenarios:
+                        for concurrency in options['concurrency']:
+                            cache.clear()
+                            stats = asyncio.run(BenchmarkService.run_concurrent(
+                                application, scenario, data, options['requests'], concurrency,
+                            ))
+                            results.setdefault(scenario.name, {}).setdefault(mode, {})[concurrency] = stats
+        finally:
+            reload_urlconf()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            logging.disable(logging.NOTSET)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'params': {
+                key: options[key] for key in ('dishes', 'orders', 'lines', 'requests', 'concurrency')
+            },
+            'results': results,
+        }
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+        self.print_results(results)
+        self.stdout.write(f"Результаты записаны в {output}")
+
+    def print_results(self, results):
+        """Выводит таблицу: для каждого сценария и нагрузки — sync и async рядом."""
+        columns = ['rps', 'p50_ms', 'p99_ms', 'threads_max']
+        header = f"{'сценарий':<20}{'клиентов':>9}" + ''.join(
+            f'{f"{mode} {column}":>18}' for column in columns for mode in MODES
+        )
+        self.stdout.write(header)
+        for name, modes in results.items():
+            for concurrency in modes['sync']:
+                row = f'{name:<20}{concurrency:>9}' + ''.join(
+                    f'{modes[mode][concurrency][column]:>18}' for column in columns for mode in MODES
+                )
+                self.stdout.write(row)
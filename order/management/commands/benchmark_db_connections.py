@@ -0,0 +1,134 @@
+import asyncio
+import copy
+import json
+import logging
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from order.benchmark import BENCHMARK_CACHES, BenchmarkService, configure_db_connections, get_read_scenarios
+
+# Режимы соединений, которые замеряются под каждым сервером. Постоянные соединения
+# (CONN_MAX_AGE) под ASGI остаются открытыми в потоках пула и не замеряются.
+SERVER_MODES = {
+    'wsgi': ('new', 'persistent', 'pool'),
+    'asgi': ('new', 'pool'),
+}
+
+# Параметры пула для замера, если в настройках пул выключен
+DEFAULT_POOL_OPTIONS = {'min_size': 2, 'max_size': 10}
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает задержку запросов с новым соединением к БД на каждый запрос,
+    с постоянными соединениями (CONN_MAX_AGE) и с пулом соединений,
+    под WSGI (потоки) и ASGI.
+
+    Замер выполняется на временной базе (test_<имя БД>), которая создается
+    и удаляется командой, поэтому рабочие данные не затрагиваются.
+
+    Пример:
+        python manage.py benchmark_db_connections --requests 500 --concurrency 1 10
+    """
+    help = 'Сравнение задержки без пула, с постоянными соединениями и с пулом соединений к БД.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dishes', type=int, default=50, help='Количество тестовых блюд.')
+        parser.add_argument('--orders', type=int, default=1000, help='Количество тестовых заказов.')
+        parser.add_argument('--lines', type=int, default=3, help='Позиций в каждом заказе.')
+        parser.add_argument('--requests', type=int, default=500, help='Запросов на сценарий и уровень нагрузки.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10],
+                            help='Числа одновременных клиентов.')
+        parser.add_argument('--servers', nargs='+', choices=list(SERVER_MODES), default=list(SERVER_MODES),
+                            help='Интерфейсы сервера.')
+        parser.add_argument('--only', nargs='+', default=['order_detail', 'dish_detail'],
+                            help='Замерить только указанные сценарии.')
+        parser.add_argument('--output', default='benchmark_db_connections_results.json',
+                            help='Файл для результатов (JSON).')
+
+    def handle(self, *args, **options):
+        scenarios = get_read_scenarios()
+        unknown = set(options['only']) - {scenario.name for scenario in scenarios}
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in scenarios if scenario.name in options['only']]
+
+        settings_dict = connection.settings_dict
+        original = {'CONN_MAX_AGE': settings_dict['CONN_MAX_AGE'], 'OPTIONS': copy.copy(settings_dict['OPTIONS'])}
+        pool_options = original['OPTIONS'].get('pool') or DEFAULT_POOL_OPTIONS
+        if pool_options is True:
+            pool_options = DEFAULT_POOL_OPTIONS
+
+        results = {}
+        # Журналирование каждого SQL-запроса (DEBUG) искажает замеры
+        logging.disable(logging.INFO)
+        old_name = settings_dict['NAME']
+        # Пул соединений создан для прежней базы: соединения к временной берутся из нового
+        connection.close()
+        connection.close_pool()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            data = BenchmarkService.seed(options['dishes'], options['orders'], options['lines'])
+            with override_settings(ALLOWED_HOSTS=['testserver'], CACHES=BENCHMARK_CACHES):
+                applications = {'wsgi': get_wsgi_application(), 'asgi': get_asgi_application()}
+                for server in options['servers']:
+                    for mode in SERVER_MODES[server]:
+                        configure_db_connections(mode, pool_options)
+                        for scenario in scenarios:
+                            for concurrency in options['concurrency']:
+                                cache.clear()
+                                stats = self.run(
+                                    server, applications[server], scenario, data, options['requests'], concurrency,
+                                )
+                                results.setdefault(scenario.name, {}).setdefault(server, {}) \
+                                    .setdefault(mode, {})[concurrency] = stats
+        finally:
+            configure_db_connections('new', pool_options)
+            settings_dict.update(original)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            logging.disable(logging.NOTSET)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'params': {
+                key: options[key] for key in ('dishes', 'orders', 'lines', 'requests', 'concurrency')
+            },
+            'pool': pool_options,
+            'results': results,
+        }
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+        self.print_results(results)
+        self.stdout.write(f"Результаты записаны в {output}")
+
+    @staticmethod
+    def run(server, application, scenario, data, requests, concurrency):
+        """Выполняет замер сценария под WSGI (потоки) или ASGI (цикл событий)."""
+        if server == 'wsgi':
+            return BenchmarkService.run_threaded(application, scenario, data, requests, concurrency)
+        return asyncio.run(BenchmarkService.run_concurrent(application, scenario, data, requests, concurrency))
+
+    def print_results(self, results):
+        """Выводит таблицу: для каждого сценария, сервера, режима и нагрузки — rps и перцентили."""
+        columns = ['rps', 'p50_ms', 'p95_ms', 'p99_ms']
+        header = f"{'сценарий':<16}{'сервер':>8}{'режим':>12}{'клиентов':>10}" + ''.join(
+            f'{column:>12}' for column in columns
+        )
+        self.stdout.write(header)
+        for name, servers in results.items():
+            for server, modes in servers.items():
+                for mode, levels in modes.items():
+                    for concurrency, stats in levels.items():
+                        row = f'{name:<16}{server:>8}{mode:>12}{concurrency:>10}' + ''.join(
+                            f'{stats[column]:>12}' for column in columns
+                        )
+                        self.stdout.write(row)
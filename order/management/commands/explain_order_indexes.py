@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from order.models import Dish, Order, OrderDish
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию с тестовыми данными после замеров."""
+
+
+class Command(BaseCommand):
+    """
+    Показывает планы запросов к Order и OrderDish с индексами и без них.
+
+    Все действия выполняются в одной транзакции, которая в конце откатывается:
+    тестовые данные вставляются, индексы удаляются только внутри нее.
+    Удаление индекса блокирует таблицу до конца транзакции, поэтому команду
+    нужно запускать на копии базы, а не на рабочей.
+
+    Пример:
+        python manage.py explain_order_indexes --orders 200000
+    """
+    help = 'Сравнивает планы запросов к заказам до и после добавления индексов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100000, help='Количество тестовых заказов.')
+        parser.add_argument('--dishes', type=int, default=50, help='Количество тестовых блюд.')
+        parser.add_argument('--lines', type=int, default=3, help='Позиций в каждом заказе.')
+        parser.add_argument('--days', type=int, default=365, help='За сколько дней распределить заказы.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options)
+                with_indexes = self.explain_all()
+                self.drop_indexes()
+                without_indexes = self.explain_all()
+                raise Rollback
+        except Rollback:
+            pass
+
+        for title, plan_after in with_indexes.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {title}'))
+            self.stdout.write(self.style.WARNING('--- без индексов'))
+            self.stdout.write(without_indexes[title])
+            self.stdout.write(self.style.SUCCESS('--- с индексами'))
+            self.stdout.write(plan_after)
+
+    def seed(self, options):
+        """Вставляет тестовые блюда, заказы и позиции средствами PostgreSQL (generate_series)."""
+        self.stdout.write(f"Создание {options['orders']} заказов...")
+        order_table = Order._meta.db_table
+        order_dish_table = OrderDish._meta.db_table
+        dish_table = Dish._meta.db_table
+        last_order_id = Order.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        lines = min(options['lines'], options['dishes'])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {dish_table} (name, price)
+                SELECT 'Блюдо ' || n, 100 + n FROM generate_series(1, %s) AS n
+                """,
+                [options['dishes']],
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {order_table} (table_number, total_price, status, created_at, updated_at)
+                SELECT 1 + (n %% 30), 0,
+                       (ARRAY['pending', 'ready', 'paid', 'paid', 'paid'])[1 + (n %% 5)],
+                       now() - random() * %s * interval '1 day', now()
+                FROM generate_series(1, %s) AS n
+                """,
+                [options['days'], options['orders']],
+            )
+            # Каждому заказу — несколько разных блюд подряд, начиная со «случайного»
+            cursor.execute(
+                f"""
+                INSERT INTO {order_dish_table} (order_id, dish_id, quantity, price_at_order)
+                SELECT o.id, d.id, 1 + (o.id %% 3), d.price
+                FROM {order_table} o
+                CROSS JOIN generate_series(0, %s - 1) AS line
+                JOIN LATERAL (
+                    SELECT id, price FROM {dish_table}
+                    ORDER BY id DESC OFFSET (o.id + line) %% %s LIMIT 1
+                ) d ON true
+                WHERE o.id > %s
+                """,
+                [lines, options['dishes'], last_order_id],
+            )
+            cursor.execute(f'ANALYZE {dish_table}')
+            cursor.execute(f'ANALYZE {order_table}')
+            cursor.execute(f'ANALYZE {order_dish_table}')
+            # Отложенные проверки FK выполняются сейчас (после ANALYZE, чтобы они шли по индексу),
+            # иначе ALTER TABLE ниже невозможен
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    def drop_indexes(self):
+        """Удаляет индексы и ограничения для шаблонов доступа и возвращает исходный индекс FK."""
+        with connection.schema_editor() as schema_editor:
+            for index in Order._meta.indexes:
+                schema_editor.remove_index(Order, index)
+            for constraint in OrderDish._meta.constraints:
+                schema_editor.remove_constraint(OrderDish, constraint)
+            schema_editor.execute(
+                f'CREATE INDEX order_orderdish_order_id_tmp ON {OrderDish._meta.db_table} (order_id)'
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Order._meta.db_table}')
+            cursor.execute(f'ANALYZE {OrderDish._meta.db_table}')
+
+    def explain_all(self):
+        """Возвращает планы (EXPLAIN ANALYZE) для основных запросов проекта."""
+        now = timezone.now()
+        start_of_today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        order_id, dish_id = OrderDish.objects.order_by('-id').values_list('order_id', 'dish_id').first()
+        queries = {
+            'Список заказов (ORDER BY created_at DESC, id DESC LIMIT 15)':
+                Order.objects.order_by('-created_at', '-id')[:15],
+            'OrderFilter: table_number + status':
+                Order.objects.filter(table_number=5, status='pending').order_by('-created_at', '-id')[:15],
+            'Выручка за день: status IN (paid, ready) + created_at':
+                Order.objects.filter(
+                    status__in=['paid', 'ready'],
+                    created_at__gte=start_of_today - timedelta(days=3),
+                    created_at__lt=start_of_today - timedelta(days=2),
+                ).values_list('total_price'),
+            'Неоплаченные заказы стола':
+                Order.objects.exclude(status='paid').filter(table_number=7).values_list('id', 'total_price'),
+            'Доска заказов: сегодня или не оплачены':
+                Order.objects.filter(
+                    Q(created_at__gte=start_of_today) | ~Q(status='paid')
+                ).order_by('-created_at', '-id')[:20],
+            'Позиция заказа по (order, dish)':
+                OrderDish.objects.filter(order_id=order_id, dish_id=dish_id),
+        }
+        return {
+            title: queryset.explain(analyze=True)
+            for title, queryset in queries.items()
+        }
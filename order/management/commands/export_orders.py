@@ -0,0 +1,58 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from order.export import EXPORT_CHUNK_SIZE, EXPORT_CONTENT_TYPES, OrderExportService
+from order.models import Order
+
+
+class Command(BaseCommand):
+    """
+    Выгружает заказы с позициями за диапазон дат в CSV или NDJSON.
+
+    Строки читаются серверным курсором и пишутся блоками, поэтому память
+    не зависит от размера выгрузки.
+
+    Пример:
+        python manage.py export_orders --from 2025-01-01 --to 2025-03-31 --output orders.csv
+        python manage.py export_orders --from 2025-01-01 --format ndjson --status paid > orders.ndjson
+    """
+    help = 'Потоковая выгрузка заказов с позициями в CSV или NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, required=True,
+                            help='Первый день диапазона (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help='Последний день диапазона (YYYY-MM-DD), по умолчанию сегодня.')
+        parser.add_argument('--format', dest='export_format', choices=list(EXPORT_CONTENT_TYPES), default='csv',
+                            help='Формат выгрузки.')
+        parser.add_argument('--status', choices=Order.StatusChoices.values, help='Только заказы с этим статусом.')
+        parser.add_argument('--table-number', type=int, help='Только заказы этого стола.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help='Строк в одной порции чтения и записи.')
+        parser.add_argument('--output', help='Файл для выгрузки, по умолчанию стандартный вывод.')
+
+    def handle(self, *args, **options):
+        date_from = options['date_from']
+        date_to = options['date_to'] or timezone.localdate()
+        if date_from > date_to:
+            raise CommandError('Дата --from не может быть позже --to.')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть больше нуля.')
+
+        querysets = OrderExportService.get_querysets(
+            date_from, date_to, options['status'], options['table_number'],
+        )
+        blocks = OrderExportService.iter_export(options['export_format'], querysets, options['chunk_size'])
+
+        if not options['output']:
+            for block in blocks:
+                self.stdout.write(block, ending='')
+            return
+
+        # newline='' — переводы строк CSV пишутся как есть
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for block in blocks:
+                output.write(block)
+        self.stderr.write(self.style.SUCCESS(f"Заказы за {date_from} — {date_to} выгружены в {options['output']}"))
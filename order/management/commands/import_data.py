@@ -0,0 +1,66 @@
+from itertools import chain
+from pathlib import Path
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+
+from finance.services import RevenueLedgerService
+from order.balances import TableBalanceService
+from order.importer import IMPORT_BATCH_SIZE, DataImportService, iter_file_records
+
+
+class Command(BaseCommand):
+    """
+    Пакетно загружает данные (блюда, заказы, позиции, выручку) из файлов.
+
+    Замена loaddata для больших объемов: файлы читаются потоково, записи
+    копируются в БД порциями (COPY), сигналы моделей не срабатывают, а стоимость
+    заказов, текущая выручка (RevenueLedger) и открытые счета столов (TableBalance)
+    пересчитываются в конце целиком.
+    Повторная загрузка тех же файлов обновляет записи с теми же id.
+
+    Поддерживаются JSON-массивы в формате фикстур Django, NDJSON (.ndjson, .jsonl)
+    с такими же записями и CSV (модель — из --model или имени файла, например order.dish.csv).
+
+    Пример:
+        python manage.py import_data order/fixtures/dishes.json order/fixtures/orders.json
+        python manage.py import_data lines.csv --model order.orderdish --batch-size 20000
+    """
+    help = 'Пакетная загрузка данных из JSON, NDJSON и CSV с пересчетом стоимости заказов и выручки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', type=Path, help='Файлы для загрузки.')
+        parser.add_argument('--model', help='Модель для CSV-файлов (app_label.model_name).')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help='Записей одной модели в одной порции.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        missing = [str(path) for path in options['files'] if not path.is_file()]
+        if missing:
+            raise CommandError(f"Файлы не найдены: {', '.join(missing)}")
+        try:
+            model = apps.get_model(options['model']) if options['model'] else None
+        except (LookupError, ValueError):
+            raise CommandError(f"Неизвестная модель: {options['model']}")
+
+        records = chain.from_iterable(iter_file_records(path, model) for path in options['files'])
+        try:
+            counts = DataImportService(options['batch_size']).run(records)
+        except (DeserializationError, FieldDoesNotExist, LookupError, ValueError) as exc:
+            raise CommandError(f'Ошибка загрузки: {exc}')
+
+        totals_fixed = counts.pop('totals_fixed')
+        for label, count in counts.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(f'Исправлена стоимость заказов: {totals_fixed}')
+
+        drift = RevenueLedgerService.rebuild()
+        table_drift = TableBalanceService.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {sum(counts.values())}, исправлено дней текущей выручки: {len(drift)}, '
+            f'открытых счетов столов: {len(table_drift)}.'
+        ))
@@ -0,0 +1,106 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.services import REVENUE_STATUSES
+from order.balances import TableBalanceService
+from order.partitions import OrderPartitionService
+
+
+class Command(BaseCommand):
+    """
+    Секционирование таблицы заказов по месяцам (PostgreSQL).
+
+    Действия:
+        convert — однократный переход: прежняя таблица становится секцией
+                  order_order_legacy, создаются месячные секции на --months-ahead вперед;
+        create  — создает недостающие секции на --months-ahead месяцев вперед
+                  (запускать по расписанию, например раз в сутки);
+        detach  — отсоединяет секции, целиком лежащие раньше месяца --before,
+                  вместе с позициями их заказов (--drop — удаляет их);
+        status  — выводит секции и их границы.
+
+    convert меняет схему вне миграций: первичный ключ заказов становится (id, created_at),
+    внешний ключ OrderDish -> Order удаляется. Поэтому convert выполняется только при
+    полностью примененных миграциях, а после перехода миграции, изменяющие заказы
+    и их позиции, применить нельзя (makemigrations и migrate в entrypoint.sh
+    не должны создавать и применять такие миграции).
+
+    Отсоединенные заказы пропадают из отчетов о выручке, поэтому секции
+    с оплаченными и готовыми заказами не отсоединяются без --force:
+    сначала их нужно перенести в архив командой archive_orders.
+
+    Пример:
+        python manage.py partition_orders convert --months-ahead 3
+        python manage.py partition_orders create
+        python manage.py partition_orders detach --before 2025-01-01 --drop
+    """
+    help = (
+        'Секционирование таблицы заказов по месяцам: переход, создание и отсоединение секций. '
+        'convert меняет схему вне миграций и несовместим с миграциями, изменяющими заказы '
+        'и их позиции: он не выполняется при непримененных миграциях, а после него такие '
+        'миграции применить нельзя.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['convert', 'create', 'detach', 'status'], help='Действие.')
+        parser.add_argument('--months-ahead', type=int, default=settings.ORDER_PARTITION_MONTHS_AHEAD,
+                            help='На сколько месяцев вперед создать секции.')
+        parser.add_argument('--before', type=date.fromisoformat,
+                            help='detach: отсоединить секции раньше месяца этой даты (YYYY-MM-DD).')
+        parser.add_argument('--drop', action='store_true', help='detach: удалить отсоединенные секции.')
+        parser.add_argument('--force', action='store_true',
+                            help='detach: отсоединять и секции с заказами, учтенными в выручке.')
+
+    def handle(self, *args, **options):
+        if options['months_ahead'] < 0:
+            raise CommandError('--months-ahead не может быть отрицательным.')
+        action = options['action']
+        if action == 'convert':
+            try:
+                created = OrderPartitionService.convert(options['months_ahead'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(
+                f"Таблица заказов секционирована, созданы секции: {', '.join(created)}"
+            ))
+            return
+
+        if not OrderPartitionService.is_partitioned():
+            raise CommandError('Таблица заказов не секционирована, сначала выполните partition_orders convert.')
+
+        if action == 'create':
+            created = OrderPartitionService.create_partitions(options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f"Создано секций: {len(created)} {', '.join(created)}"))
+        elif action == 'detach':
+            self.detach(options)
+        else:
+            for partition in OrderPartitionService.get_partitions():
+                start = partition.start.isoformat() if partition.start else 'MINVALUE'
+                end = partition.end.isoformat() if partition.end else 'MAXVALUE'
+                self.stdout.write(f'{partition.name}: {start} — {end}')
+
+    def detach(self, options):
+        """Отсоединяет старые секции, проверяя, что в них нет заказов, учтенных в выручке."""
+        if options['before'] is None:
+            raise CommandError('Для detach нужен параметр --before.')
+        partitions = OrderPartitionService.get_detachable(options['before'])
+        if not options['force']:
+            blocked = [
+                partition.name for partition in partitions
+                if OrderPartitionService.count_orders(partition, REVENUE_STATUSES)
+            ]
+            if blocked:
+                raise CommandError(
+                    f"В секциях есть заказы, учтенные в выручке: {', '.join(blocked)}. "
+                    f"Перенесите их в архив (archive_orders) или укажите --force."
+                )
+        for partition in partitions:
+            lines_table, lines = OrderPartitionService.detach(partition, options['drop'])
+            action = 'удалена' if options['drop'] else f'отсоединена, позиции ({lines}) перенесены в {lines_table}'
+            self.stdout.write(f'Секция {partition.name} {action}')
+        if partitions:
+            # Отсоединенные неоплаченные заказы больше не входят в открытые счета столов
+            TableBalanceService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Отсоединено секций: {len(partitions)}'))
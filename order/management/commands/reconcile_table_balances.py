@@ -0,0 +1,14 @@
+from cafe_order_system.db_utils import ReconcileCommand
+from order.balances import TableBalanceService
+
+
+class Command(ReconcileCommand):
+    """
+    Сверяет открытые счета столов (TableBalance) с заказами и перестраивает их.
+
+    Пример:
+        python manage.py reconcile_table_balances
+        python manage.py reconcile_table_balances --dry-run
+    """
+    help = 'Сверяет открытые счета столов с заказами и исправляет расхождения.'
+    service = TableBalanceService
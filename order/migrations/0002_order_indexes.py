@@ -0,0 +1,77 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Min, Sum
+
+
+def merge_duplicate_order_dishes(apps, schema_editor):
+    """
+    Сливает повторяющиеся позиции (order, dish) в одну перед добавлением ограничения.
+
+    Количество суммируется в позицию с наименьшим id, цена берется из нее же;
+    общая стоимость затронутых заказов пересчитывается.
+    """
+    Order = apps.get_model('order', 'Order')
+    OrderDish = apps.get_model('order', 'OrderDish')
+    duplicates = (
+        OrderDish.objects.order_by()
+        .values('order_id', 'dish_id')
+        .annotate(lines=Count('id'), keep_id=Min('id'), quantity=Sum('quantity'))
+        .filter(lines__gt=1)
+    )
+    order_ids = set()
+    for duplicate in duplicates:
+        OrderDish.objects.filter(pk=duplicate['keep_id']).update(quantity=duplicate['quantity'])
+        OrderDish.objects.filter(
+            order_id=duplicate['order_id'], dish_id=duplicate['dish_id'],
+        ).exclude(pk=duplicate['keep_id']).delete()
+        order_ids.add(duplicate['order_id'])
+
+    line_total = ExpressionWrapper(
+        F('quantity') * F('price_at_order'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    for order_id in order_ids:
+        total = OrderDish.objects.filter(order_id=order_id).aggregate(total=Sum(line_total))['total']
+        Order.objects.filter(pk=order_id).update(total_price=total or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_order_dishes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='orderdish',
+            constraint=models.UniqueConstraint(fields=('order', 'dish'), name='order_dish_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['table_number', 'status'], name='order_table_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'paid'), _negated=True), fields=['table_number'], name='order_open_table_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'paid'), _negated=True), fields=['-created_at'], name='order_open_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='orderdish',
+            name='order',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='order_dishes', to='order.order'),
+        ),
+    ]
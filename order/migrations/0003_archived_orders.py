@@ -0,0 +1,47 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0002_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('table_number', models.PositiveIntegerField()),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'В ожидании'), ('ready', 'Готово'), ('paid', 'Оплачено')], max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архивные заказы',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at', 'id'], name='archived_order_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderDish',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField()),
+                ('price_at_order', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('dish', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='order.dish')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_dishes', to='order.archivedorder')),
+            ],
+            options={
+                'verbose_name': 'Блюдо в архивном заказе',
+                'verbose_name_plural': 'Блюда в архивных заказах',
+                'ordering': ['order'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:02
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_table_balances(apps, schema_editor):
+    """Заполняет открытые счета столов по уже существующим неоплаченным заказам."""
+    Order = apps.get_model('order', 'Order')
+    TableBalance = apps.get_model('order', 'TableBalance')
+    rows = (
+        Order.objects.exclude(status='paid')
+        .order_by()
+        .values('table_number')
+        .annotate(total=Sum('total_price'), count=Count('id'))
+    )
+    TableBalance.objects.bulk_create(
+        TableBalance(table_number=row['table_number'], open_total=row['total'], open_orders=row['count'])
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0003_archived_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableBalance',
+            fields=[
+                ('table_number', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('open_total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('open_orders', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Открытый счет стола',
+                'verbose_name_plural': 'Открытые счета столов',
+                'ordering': ['table_number'],
+            },
+        ),
+        migrations.RunPython(fill_table_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:20
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_menu_version(apps, schema_editor):
+    """Создает единственную запись версии меню."""
+    MenuVersion = apps.get_model('order', 'MenuVersion')
+    MenuVersion.objects.using(schema_editor.connection.alias).create(
+        pk=1, version=0, modified_at=timezone.now().replace(microsecond=0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0004_tablebalance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('modified_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Версия меню',
+                'verbose_name_plural': 'Версии меню',
+            },
+        ),
+        migrations.RunPython(create_menu_version, migrations.RunPython.noop),
+    ]
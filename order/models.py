@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
 from django.utils.translation import gettext_lazy as _
 
 from .validators import ValidatePrice
@@ -39,24 +40,66 @@ class Order(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     dishes = models.ManyToManyField(Dish, through='OrderDish', related_name='orders')
 
+    # Допустимые переходы между статусами: оплаченный заказ больше не меняется
+    STATUS_TRANSITIONS = {
+        StatusChoices.PENDING: {StatusChoices.READY, StatusChoices.PAID},
+        StatusChoices.READY: {StatusChoices.PENDING, StatusChoices.PAID},
+        StatusChoices.PAID: set(),
+    }
+
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
         ordering = ['-created_at']
+        indexes = [
+            # Сортировка списков и keyset-пагинация по (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            # OrderFilter: номер стола и статус
+            models.Index(fields=['table_number', 'status'], name='order_table_status_idx'),
+            # Выручка: статус и диапазон дат
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # Неоплаченные заказы: по столам и свежие сверху
+            models.Index(
+                fields=['table_number'],
+                condition=~models.Q(status='paid'),
+                name='order_open_table_idx',
+            ),
+            models.Index(
+                fields=['-created_at'],
+                condition=~models.Q(status='paid'),
+                name='order_open_created_idx',
+            ),
+        ]
 
     def __str__(self):
         """Возвращает строковое представление заказа."""
         return f"Заказ {self.pk} - Стол {self.table_number}"
 
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет заказ в транзакции: состояние до сохранения (сигнал pre_save)
+        читается с блокировкой строки, и параллельное сохранение того же заказа
+        ждет фиксации, а не повторяет то же изменение агрегатов.
+        """
+        using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def can_change_status(cls, current_status: str, new_status: str) -> bool:
+        """Проверяет, допустим ли переход заказа из статуса current_status в new_status."""
+        return new_status in cls.STATUS_TRANSITIONS.get(current_status, set())
+
     def calculate_total_price(self):
-        """Пересчитывает общую стоимость заказа на основе блюд и их количества."""
-        total = sum(item.price_at_order * item.quantity for item in self.order_dishes.all())
-        self.total_price = total
+        """Пересчитывает общую стоимость заказа на основе блюд и их количества (на стороне БД)."""
+        total = self.order_dishes.order_by().aggregate(total=Sum(OrderDish.line_total()))['total']
+        self.total_price = total or 0
 
 
 class OrderDish(models.Model):
     """Промежуточная модель для связи заказа и блюда с указанием количества и цены."""
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_dishes')
+    # Отдельный индекс по order не нужен: его покрывает уникальный индекс (order, dish)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_dishes', db_index=False)
     dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=1)
     price_at_order = models.DecimalField(max_digits=10, decimal_places=2, validators=[ValidatePrice()])
@@ -65,7 +108,108 @@ class OrderDish(models.Model):
         verbose_name = "Блюдо в заказе"
         verbose_name_plural = "Блюда в заказах"
         ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'dish'], name='order_dish_unique'),
+        ]
+
+    @staticmethod
+    def line_total() -> ExpressionWrapper:
+        """Выражение стоимости позиции (quantity * price_at_order) для агрегатов в БД."""
+        return ExpressionWrapper(
+            F('quantity') * F('price_at_order'),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
 
     def __str__(self):
         """Возвращает строковое представление связи заказа и блюда."""
         return f"{self.dish.name} x {self.quantity} в Заказе {self.order.id}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Заказ, перенесенный в архив (оплаченный и старше ORDER_ARCHIVE_AFTER_DAYS).
+
+    Архив не меняется: идентификатор, поля и даты переносятся из Order как есть,
+    поэтому детали и выгрузка архивного заказа выглядят так же, как до переноса.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    table_number = models.PositiveIntegerField()
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=10, choices=Order.StatusChoices.choices)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Архивный заказ"
+        verbose_name_plural = "Архивные заказы"
+        ordering = ['-created_at']
+        indexes = [
+            # Выгрузка и отчеты о выручке по диапазону дат
+            models.Index(fields=['created_at', 'id'], name='archived_order_created_idx'),
+        ]
+
+    def __str__(self):
+        """Возвращает строковое представление архивного заказа."""
+        return f"Архивный заказ {self.pk} - Стол {self.table_number}"
+
+
+class ArchivedOrderDish(models.Model):
+    """Позиция архивного заказа (перенесенная из OrderDish вместе с заказом)."""
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='order_dishes')
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='+')
+    quantity = models.IntegerField()
+    price_at_order = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Блюдо в архивном заказе"
+        verbose_name_plural = "Блюда в архивных заказах"
+        ordering = ['order']
+
+    def __str__(self):
+        """Возвращает строковое представление позиции архивного заказа."""
+        return f"{self.dish.name} x {self.quantity} в Архивном заказе {self.order_id}"
+
+
+class TableBalance(models.Model):
+    """
+    Открытый счет стола: сумма и число неоплаченных заказов.
+
+    Запись обновляется при каждом изменении заказов (сигнал order_state_changed):
+    создании, смене статуса или общей стоимости, удалении. Поэтому «сколько
+    должен стол» — поиск по первичному ключу, а обзор зала — чтение небольшой
+    таблицы, независимо от числа заказов.
+    """
+    table_number = models.PositiveIntegerField(primary_key=True)
+    open_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    open_orders = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Открытый счет стола"
+        verbose_name_plural = "Открытые счета столов"
+        ordering = ['table_number']
+
+    def __str__(self):
+        """Возвращает строковое представление открытого счета стола."""
+        return f"Стол {self.table_number}: {self.open_total} ({self.open_orders} заказов)"
+
+
+class MenuVersion(models.Model):
+    """
+    Версия меню: номер, который увеличивается при каждом изменении блюд, и время изменения.
+
+    Хранится одной записью (pk=1); по ней строятся ETag, Last-Modified и ключи
+    закэшированных ответов меню (order.cache.MenuCache). В кэше лежит только
+    копия версии, поэтому ее истечение или вытеснение не меняет версию.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    modified_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Версия меню"
+        verbose_name_plural = "Версии меню"
+
+    def __str__(self):
+        """Возвращает строковое представление версии меню."""
+        return f"Меню v{self.version} ({self.modified_at})"
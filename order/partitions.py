@@ -0,0 +1,305 @@
+import re
+from collections import namedtuple
+from datetime import date, datetime, time
+from typing import Iterable, List, Optional, Tuple
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.state import ProjectState
+from django.utils import timezone
+
+from order.models import Order, OrderDish
+
+# Секция, в которую при переходе на секционирование попадает вся прежняя таблица заказов
+LEGACY_PARTITION = f'{Order._meta.db_table}_legacy'
+
+# Секция таблицы заказов: имя и границы по created_at (None — MINVALUE/MAXVALUE)
+Partition = namedtuple('Partition', ['name', 'start', 'end'])
+
+# Границы секции в выводе pg_get_expr(relpartbound)
+PARTITION_BOUND_RE = re.compile(r"FROM \((.+)\) TO \((.+)\)")
+
+
+def add_months(month: date, months: int) -> date:
+    """Возвращает первый день месяца, отстоящего от month на months месяцев."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_month_bound(month: date) -> datetime:
+    """Возвращает начало месяца в текущем часовом поясе (граница секций)."""
+    return timezone.make_aware(datetime.combine(month.replace(day=1), time.min))
+
+
+def get_partition_name(month: date) -> str:
+    """Возвращает имя месячной секции заказов, например order_order_p2025_01."""
+    return f'{Order._meta.db_table}_p{month:%Y_%m}'
+
+
+def get_lines_table(partition: str) -> str:
+    """
+    Возвращает имя таблицы, в которую при отсоединении секции переносятся позиции
+    ее заказов, например order_orderdish_p2025_01.
+    """
+    return OrderDish._meta.db_table + partition[len(Order._meta.db_table):]
+
+
+def parse_bound(value: str) -> Optional[datetime]:
+    """Разбирает границу секции: MINVALUE и MAXVALUE — None, иначе момент времени."""
+    if value in ('MINVALUE', 'MAXVALUE'):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+class OrderPartitionService:
+    """
+    Секционирование таблицы заказов по месяцам (PARTITION BY RANGE (created_at)).
+
+    Переход необязателен и выполняется командой partition_orders convert: прежняя
+    таблица без копирования строк становится секцией order_order_legacy со всеми
+    существующими заказами, новые заказы попадают в месячные секции. Запросы
+    с диапазоном created_at (отчеты о выручке, фильтр заказов по датам, выгрузка)
+    читают только нужные секции, а очистка (VACUUM) идет по небольшим таблицам.
+
+    Первичный ключ секционированной таблицы включает ключ секционирования
+    (id, created_at), поэтому внешний ключ позиций на заказ в БД снимается;
+    каскадное удаление позиций выполняет ORM, уникальность id — последовательность.
+    Позиции не секционируются (в них нет даты заказа): при отсоединении секции
+    позиции ее заказов переносятся в отдельную таблицу рядом с ней.
+
+    Отсечение секций работает только для запросов с условием на created_at.
+    Поиск заказа по одному pk (детали заказа в API и вебе, запрос updated_at
+    для ETag в OrderDetailCache.get_validators, изменения заказа и его позиций,
+    перенос в архив) проверяет индекс первичного ключа в каждой секции, поэтому
+    его стоимость растет с числом секций: старые секции стоит переносить в архив
+    и отсоединять. Загрузка import_data по той же причине не может использовать
+    ON CONFLICT (id) и обновляет заказы отдельным UPDATE по id.
+    """
+
+    @staticmethod
+    def is_partitioned() -> bool:
+        """Возвращает True, если таблица заказов уже секционирована."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))',
+                [Order._meta.db_table],
+            )
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def get_partitions() -> List[Partition]:
+        """
+        Возвращает секции таблицы заказов по возрастанию границ.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) '
+                'FROM pg_inherits AS i JOIN pg_class AS c ON c.oid = i.inhrelid '
+                'WHERE i.inhparent = to_regclass(%s)',
+                [Order._meta.db_table],
+            )
+            rows = cursor.fetchall()
+        partitions = []
+        for name, bound in rows:
+            start, end = PARTITION_BOUND_RE.search(bound).groups()
+            partitions.append(Partition(name, parse_bound(start), parse_bound(end)))
+        return sorted(partitions, key=lambda partition: (partition.start is not None, partition.start))
+
+    @staticmethod
+    def get_pending_migrations() -> List[str]:
+        """
+        Возвращает непримененные миграции и приложения с изменениями моделей,
+        для которых миграции еще не созданы (их создаст makemigrations).
+
+        :return: Список «приложение.миграция» и «приложение (нет миграции)».
+        """
+        executor = MigrationExecutor(connection)
+        loader = executor.loader
+        pending = [
+            f'{migration.app_label}.{migration.name}'
+            for migration, _ in executor.migration_plan(loader.graph.leaf_nodes())
+        ]
+        changes = MigrationAutodetector(loader.project_state(), ProjectState.from_apps(apps)).changes(loader.graph)
+        pending.extend(f'{app_label} (нет миграции)' for app_label in sorted(changes))
+        return pending
+
+    @staticmethod
+    @transaction.atomic
+    def convert(months_ahead: int) -> List[str]:
+        """
+        Превращает таблицу заказов в секционированную по месяцам.
+
+        Таблица на время перехода блокируется; строки не копируются, но при
+        присоединении прежней таблицы PostgreSQL один раз проверяет ее строки
+        и строит уникальный индекс (id, created_at).
+
+        Переход меняет схему вне миграций (первичный ключ (id, created_at), без внешнего
+        ключа OrderDish -> Order), поэтому выполняется только при полностью примененных
+        миграциях. Миграции, изменяющие после перехода таблицы order_order
+        и order_orderdish, применить нельзя.
+
+        :param months_ahead: На сколько месяцев вперед создать секции.
+        :return: Имена созданных месячных секций.
+        :raises ValueError: Если таблица уже секционирована или есть непримененные миграции.
+        """
+        if OrderPartitionService.is_partitioned():
+            raise ValueError("Таблица заказов уже секционирована.")
+        pending = OrderPartitionService.get_pending_migrations()
+        if pending:
+            raise ValueError(
+                f"Есть непримененные миграции: {', '.join(pending)}. "
+                f"Создайте и примените их (makemigrations, migrate) до перехода."
+            )
+
+        quote = connection.ops.quote_name
+        table = Order._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'SELECT max(created_at) FROM {quote(table)}')
+            latest = max(filter(None, [cursor.fetchone()[0], timezone.now()]))
+            # Все существующие заказы (включая текущий месяц) остаются в прежней таблице
+            first_month = add_months(timezone.localdate(latest).replace(day=1), 1)
+
+            cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(LEGACY_PARTITION)}')
+            for index in Order._meta.indexes:
+                # Имена индексов освобождаются для секционированной таблицы; при присоединении
+                # прежние индексы становятся ее секциями без перестроения
+                cursor.execute(f'ALTER INDEX {quote(index.name)} RENAME TO {quote(index.name + "_legacy")}')
+            cursor.execute(f'ALTER TABLE {quote(LEGACY_PARTITION)} ALTER COLUMN id DROP IDENTITY')
+
+            # Внешний ключ на секционированную таблицу возможен только по (id, created_at)
+            cursor.execute(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE confrelid = to_regclass(%s) AND contype = 'f'",
+                [LEGACY_PARTITION],
+            )
+            foreign_keys = cursor.fetchall()
+            if foreign_keys:
+                # Таблицу с отложенными проверками ключей в текущей транзакции изменить нельзя
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            for referencing_table, constraint in foreign_keys:
+                cursor.execute(f'ALTER TABLE {referencing_table} DROP CONSTRAINT {quote(constraint)}')
+            # Первичный ключ (id) заменяется ключом секционированной таблицы (id, created_at)
+            cursor.execute(f'ALTER TABLE {quote(LEGACY_PARTITION)} DROP CONSTRAINT {quote(table + "_pkey")}')
+
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} (LIKE {quote(LEGACY_PARTITION)} INCLUDING DEFAULTS) '
+                f'PARTITION BY RANGE (created_at)'
+            )
+            cursor.execute(f'ALTER TABLE {quote(table)} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + "_pkey")} PRIMARY KEY (id, created_at)')
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND contype = 'c'",
+                [LEGACY_PARTITION],
+            )
+            for constraint, definition in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(constraint)} {definition}')
+        with connection.schema_editor() as editor:
+            for index in Order._meta.indexes:
+                editor.add_index(Order, index)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(LEGACY_PARTITION)} '
+                f'FOR VALUES FROM (MINVALUE) TO (%s)',
+                [get_month_bound(first_month)],
+            )
+            created = OrderPartitionService.create_partitions(months_ahead, cursor)
+            # Новая последовательность id продолжает нумерацию прежней таблицы
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Order]):
+                cursor.execute(sql)
+        return created
+
+    @staticmethod
+    def create_partitions(months_ahead: int, cursor=None) -> List[str]:
+        """
+        Создает недостающие месячные секции с текущего месяца на months_ahead месяцев вперед.
+
+        Команду нужно запускать заранее (например, раз в сутки): заказ, для даты
+        которого нет секции, не сохранится.
+
+        :param months_ahead: На сколько месяцев вперед создать секции.
+        :return: Имена созданных секций.
+        """
+        if cursor is None:
+            with transaction.atomic(), connection.cursor() as cursor:
+                return OrderPartitionService.create_partitions(months_ahead, cursor)
+
+        partitions = OrderPartitionService.get_partitions()
+        current = timezone.localdate().replace(day=1)
+        created = []
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            start, end = get_month_bound(month), get_month_bound(add_months(month, 1))
+            if any(
+                (partition.start is None or partition.start < end) and (partition.end is None or start < partition.end)
+                for partition in partitions
+            ):
+                continue
+            name = get_partition_name(month)
+            cursor.execute(
+                f'CREATE TABLE {connection.ops.quote_name(name)} '
+                f'PARTITION OF {connection.ops.quote_name(Order._meta.db_table)} FOR VALUES FROM (%s) TO (%s)',
+                [start, end],
+            )
+            created.append(name)
+        return created
+
+    @staticmethod
+    def get_detachable(before: date) -> List[Partition]:
+        """
+        Возвращает секции, все заказы которых созданы раньше месяца before.
+        """
+        cutoff = get_month_bound(before)
+        return [
+            partition for partition in OrderPartitionService.get_partitions()
+            if partition.end is not None and partition.end <= cutoff
+        ]
+
+    @staticmethod
+    def count_orders(partition: Partition, statuses: Iterable[str]) -> int:
+        """Возвращает число заказов секции с указанными статусами."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {connection.ops.quote_name(partition.name)} WHERE status = ANY(%s)',
+                [list(statuses)],
+            )
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    @transaction.atomic
+    def detach(partition: Partition, drop: bool = False) -> Tuple[str, int]:
+        """
+        Отсоединяет секцию от таблицы заказов вместе с позициями ее заказов.
+
+        Позиции переносятся в таблицу get_lines_table() (одним DELETE ... RETURNING),
+        секция и эта таблица остаются в базе как обычные таблицы, если не задан drop.
+
+        :param partition: Секция из get_detachable().
+        :param drop: Удалить отсоединенную секцию и позиции.
+        :return: Кортеж (таблица позиций, перенесено позиций).
+        """
+        quote = connection.ops.quote_name
+        lines_table = get_lines_table(partition.name)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE {quote(lines_table)} '
+                f'(LIKE {quote(OrderDish._meta.db_table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES)'
+            )
+            cursor.execute(
+                f'WITH moved AS ('
+                f'  DELETE FROM {quote(OrderDish._meta.db_table)} '
+                f'  WHERE order_id IN (SELECT id FROM {quote(partition.name)}) RETURNING *'
+                f') INSERT INTO {quote(lines_table)} SELECT * FROM moved'
+            )
+            lines = cursor.rowcount
+            cursor.execute(
+                f'ALTER TABLE {quote(Order._meta.db_table)} DETACH PARTITION {quote(partition.name)}'
+            )
+            if drop:
+                cursor.execute(f'DROP TABLE {quote(partition.name)}, {quote(lines_table)}')
+        return lines_table, lines
@@ -0,0 +1,416 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from order.models import Dish, Order, OrderDish
+from order.signals import OrderState, OrderStateChange, order_state_changed
+
+# Заказы, помеченные «грязными» внутри текущего defer_total_recalculation()
+_dirty_orders: ContextVar[Optional[Set[int]]] = ContextVar('dirty_orders', default=None)
+
+
+class OrderService:
+    """
+    Сервис для работы с заказами и их позициями.
+    """
+
+    @staticmethod
+    @transaction.atomic
+    def create_order_with_items(items_data: Iterable[Dict[str, Any]], **order_data: Any) -> Order:
+        """
+        Создает заказ вместе со всеми позициями за постоянное число запросов к БД.
+
+        Общая стоимость считается один раз по переданным позициям, сами позиции
+        вставляются одним bulk_create, поэтому сигналы OrderDish не срабатывают.
+
+        :param items_data: Позиции заказа (dish, quantity, price_at_order).
+        :param order_data: Поля заказа (table_number, status).
+        :return: Созданный объект Order.
+        """
+        order_dishes: List[OrderDish] = [OrderDish(**item_data) for item_data in items_data]
+        total_price = sum(
+            (Decimal(str(item.price_at_order)) * item.quantity for item in order_dishes),
+            Decimal('0'),
+        )
+
+        order = Order.objects.create(total_price=total_price, **order_data)
+        for order_dish in order_dishes:
+            order_dish.order = order
+        OrderDish.objects.bulk_create(order_dishes)
+        return order
+
+    @staticmethod
+    @transaction.atomic
+    def update_order_with_items(
+            order: Order, items_data: Optional[Iterable[Dict[str, Any]]] = None, **order_data: Any,
+    ) -> Order:
+        """
+        Обновляет заказ и, если переданы позиции, синхронизирует их с текущими.
+
+        Позиции не пересоздаются: изменяются только отличающиеся, новые вставляются,
+        отсутствующие удаляются, а общая стоимость пересчитывается один раз.
+
+        :param order: Обновляемый заказ.
+        :param items_data: Новый полный список позиций (dish, quantity, price_at_order) или None.
+        :param order_data: Изменяемые поля заказа (table_number, status).
+        :return: Обновленный объект Order.
+        :raises ValidationError: Если переход в новый статус недопустим.
+        """
+        if 'status' in order_data:
+            # Переход проверяется по заблокированной строке, а не по загруженному ранее экземпляру
+            current = OrderService._lock_order(order.pk)
+            OrderService.validate_status_change(current.status, order_data['status'])
+        for field, value in order_data.items():
+            setattr(order, field, value)
+        if items_data is None:
+            order.save()
+            return order
+
+        with defer_total_recalculation() as dirty_orders:
+            # total_price не сохраняется из памяти: его пересчитает БД
+            order.save(update_fields=[*order_data, 'updated_at'])
+            OrderService.sync_order_items(order, items_data)
+            dirty_orders.add(order.pk)
+        order.refresh_from_db(fields=['total_price'])
+        return order
+
+    @staticmethod
+    def validate_status_change(current_status: str, new_status: str) -> None:
+        """
+        Проверяет переход заказа из статуса current_status в new_status (Order.STATUS_TRANSITIONS).
+
+        :param current_status: Текущий статус.
+        :param new_status: Новый статус.
+        :raises ValidationError: Если переход недопустим.
+        """
+        if current_status == new_status or Order.can_change_status(current_status, new_status):
+            return
+        labels = dict(Order.StatusChoices.choices)
+        raise ValidationError(
+            f"Нельзя изменить статус заказа с «{labels.get(current_status, current_status)}» "
+            f"на «{labels.get(new_status, new_status)}».",
+            code='invalid_transition',
+        )
+
+    @staticmethod
+    def sync_order_items(order: Order, items_data: Iterable[Dict[str, Any]]) -> Tuple[int, int, int]:
+        """
+        Приводит позиции заказа к переданному списку пакетными операциями.
+
+        Позиции сопоставляются по блюду: у совпадающих меняются количество и цена
+        (одним bulk_update, только если они отличаются), новые вставляются одним
+        bulk_create, лишние удаляются одним DELETE. Общая стоимость не пересчитывается.
+
+        :param order: Заказ.
+        :param items_data: Полный список позиций (dish, quantity, price_at_order).
+        :return: Кортеж (создано, изменено, удалено).
+        """
+        existing = {line.dish_id: line for line in OrderDish.objects.filter(order=order)}
+        to_create: List[OrderDish] = []
+        to_update: List[OrderDish] = []
+        for item_data in items_data:
+            dish = item_data['dish']
+            line = existing.pop(getattr(dish, 'pk', dish), None)
+            quantity = item_data['quantity']
+            price_at_order = Decimal(str(item_data['price_at_order']))
+            if line is None:
+                to_create.append(OrderDish(order=order, **item_data))
+            elif line.quantity != quantity or line.price_at_order != price_at_order:
+                line.quantity, line.price_at_order = quantity, price_at_order
+                to_update.append(line)
+
+        # Оставшиеся в existing позиции в новом списке отсутствуют
+        if existing:
+            OrderDish.objects.filter(pk__in=[line.pk for line in existing.values()]).delete()
+        if to_update:
+            OrderDish.objects.bulk_update(to_update, ['quantity', 'price_at_order'])
+        if to_create:
+            OrderDish.objects.bulk_create(to_create)
+        return len(to_create), len(to_update), len(existing)
+
+    @staticmethod
+    @transaction.atomic
+    def add_order_item(order_id: int, dish: Dish, quantity: int,
+                       price_at_order: Optional[Decimal] = None) -> Tuple[OrderDish, Decimal]:
+        """
+        Добавляет в заказ одну позицию за постоянное число запросов.
+
+        :param order_id: Идентификатор заказа.
+        :param dish: Блюдо.
+        :param quantity: Количество.
+        :param price_at_order: Цена (по умолчанию текущая цена блюда).
+        :return: Кортеж (созданная позиция, новая общая стоимость заказа).
+        :raises Order.DoesNotExist: Если заказа нет.
+        :raises ValidationError: Если блюдо уже есть в заказе.
+        """
+        before = OrderService._lock_order(order_id)
+        line = OrderDish(order_id=order_id, dish=dish, quantity=quantity,
+                         price_at_order=dish.price if price_at_order is None else price_at_order)
+        try:
+            with OrderService._keep_total(order_id), transaction.atomic():
+                line.save(force_insert=True)
+        except IntegrityError:
+            raise ValidationError("Блюдо уже есть в заказе, измените его количество.")
+        total = OrderService._add_to_total(order_id, before, line.quantity * Decimal(str(line.price_at_order)))
+        return line, total
+
+    @staticmethod
+    @transaction.atomic
+    def change_order_item_quantity(order_id: int, dish_id: int, quantity: int) -> Tuple[OrderDish, Decimal]:
+        """
+        Меняет количество блюда в заказе за постоянное число запросов.
+
+        :param order_id: Идентификатор заказа.
+        :param dish_id: Идентификатор блюда.
+        :param quantity: Новое количество.
+        :return: Кортеж (позиция, новая общая стоимость заказа).
+        :raises Order.DoesNotExist: Если заказа нет.
+        :raises OrderDish.DoesNotExist: Если блюда нет в заказе.
+        """
+        before = OrderService._lock_order(order_id)
+        line = OrderDish.objects.select_for_update().get(order_id=order_id, dish_id=dish_id)
+        delta = (quantity - line.quantity) * line.price_at_order
+        line.quantity = quantity
+        # QuerySet.update не вызывает сигналы OrderDish, поэтому полного пересчета нет
+        OrderDish.objects.filter(pk=line.pk).update(quantity=quantity)
+        return line, OrderService._add_to_total(order_id, before, delta)
+
+    @staticmethod
+    @transaction.atomic
+    def remove_order_item(order_id: int, dish_id: int) -> Decimal:
+        """
+        Удаляет блюдо из заказа за постоянное число запросов.
+
+        :param order_id: Идентификатор заказа.
+        :param dish_id: Идентификатор блюда.
+        :return: Новая общая стоимость заказа.
+        :raises Order.DoesNotExist: Если заказа нет.
+        :raises OrderDish.DoesNotExist: Если блюда нет в заказе.
+        """
+        before = OrderService._lock_order(order_id)
+        line = OrderDish.objects.select_for_update().get(order_id=order_id, dish_id=dish_id)
+        with OrderService._keep_total(order_id):
+            line.delete()
+        return OrderService._add_to_total(order_id, before, -line.quantity * line.price_at_order)
+
+    @staticmethod
+    def _lock_order(order_id: int) -> OrderState:
+        """Блокирует заказ (SELECT ... FOR UPDATE) и возвращает его состояние."""
+        state = (
+            Order.objects.select_for_update().filter(pk=order_id)
+            .values_list(*OrderState._fields).first()
+        )
+        if state is None:
+            raise Order.DoesNotExist(f"Заказ {order_id} не найден.")
+        return OrderState(*state)
+
+    @staticmethod
+    @contextmanager
+    def _keep_total(order_id: int) -> Iterator[None]:
+        """
+        Отменяет полный пересчет стоимости заказа, который запросят сигналы OrderDish
+        внутри блока: стоимость будет изменена на разницу.
+        """
+        with defer_total_recalculation() as dirty_orders:
+            was_dirty = order_id in dirty_orders
+            yield
+            if not was_dirty:
+                dirty_orders.discard(order_id)
+
+    @staticmethod
+    def _add_to_total(order_id: int, before: OrderState, delta: Decimal) -> Decimal:
+        """
+        Атомарно прибавляет delta к общей стоимости заказа (F-выражением) и оповещает подписчиков.
+
+        :param order_id: Идентификатор заблокированного заказа.
+        :param before: Состояние заказа до изменения.
+        :param delta: Изменение общей стоимости.
+        :return: Новая общая стоимость.
+        """
+        Order.objects.filter(pk=order_id).update(total_price=F('total_price') + delta, updated_at=timezone.now())
+        # Заказ заблокирован, поэтому новая стоимость известна без повторного чтения
+        after = before._replace(total_price=before.total_price + delta)
+        if delta and order_state_changed.has_listeners():
+            OrderService.notify_state_changes({order_id: before}, {order_id: after})
+        return after.total_price
+
+    @staticmethod
+    @transaction.atomic
+    def recalculate_totals(order_ids: Iterable[int]) -> None:
+        """
+        Пересчитывает общую стоимость заказов одним UPDATE с SUM(quantity * price_at_order) в БД.
+
+        Если на order_state_changed есть подписчики, состояние заказов до и после
+        пересчета выбирается еще двумя запросами (независимо от числа заказов).
+
+        :param order_ids: Идентификаторы заказов для пересчета.
+        """
+        order_ids = set(order_ids)
+        if not order_ids:
+            return
+
+        orders = Order.objects.filter(pk__in=order_ids)
+        notify = order_state_changed.has_listeners()
+        if notify:
+            before = OrderService._get_states(orders.select_for_update())
+
+        line_totals = (
+            OrderDish.objects.filter(order=OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(total=Sum(OrderDish.line_total()))
+            .values('total')
+        )
+        # updated_at меняется, даже если сумма осталась прежней: позиции изменились (ETag деталей заказа)
+        orders.update(
+            total_price=Coalesce(
+                Subquery(line_totals),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            updated_at=timezone.now(),
+        )
+
+        if notify:
+            after = OrderService._get_states(orders)
+            OrderService.notify_state_changes(before, after)
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_change_status(
+            new_status: str,
+            order_ids: Optional[Iterable[int]] = None,
+            table_number: Optional[int] = None,
+            current_status: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Переводит несколько заказов в новый статус одним UPDATE.
+
+        Заказы выбираются по списку идентификаторов или по номеру стола
+        (и, при необходимости, текущему статусу) и блокируются одним SELECT ... FOR UPDATE;
+        недопустимые переходы (Order.STATUS_TRANSITIONS) пропускаются.
+
+        :param new_status: Новый статус.
+        :param order_ids: Идентификаторы заказов.
+        :param table_number: Номер стола (если заказы выбираются по фильтру).
+        :param current_status: Текущий статус заказов (дополнительный фильтр).
+        :return: Результат по каждому заказу: id, result
+            (updated, unchanged, invalid_transition, not_found) и итоговый status.
+        """
+        orders = Order.objects.select_for_update().order_by('pk')
+        if order_ids is not None:
+            order_ids = list(dict.fromkeys(order_ids))
+            orders = orders.filter(pk__in=order_ids)
+        if table_number is not None:
+            orders = orders.filter(table_number=table_number)
+        if current_status is not None:
+            orders = orders.filter(status=current_status)
+
+        # Строки блокируются в порядке pk, чтобы параллельные пакеты не взаимоблокировались
+        before = {pk: OrderState(*state) for pk, *state in orders.values_list('pk', *OrderState._fields)}
+        results: Dict[int, Dict[str, Any]] = {}
+        changed: List[int] = []
+        for pk, state in before.items():
+            if state.status == new_status:
+                result = 'unchanged'
+            elif Order.can_change_status(state.status, new_status):
+                result = 'updated'
+                changed.append(pk)
+            else:
+                result = 'invalid_transition'
+            results[pk] = {
+                'id': pk,
+                'result': result,
+                'status': new_status if result == 'updated' else state.status,
+            }
+
+        if changed:
+            Order.objects.filter(pk__in=changed).update(status=new_status, updated_at=timezone.now())
+            if order_state_changed.has_listeners():
+                after = {pk: before[pk]._replace(status=new_status) for pk in changed}
+                OrderService.notify_state_changes({pk: before[pk] for pk in changed}, after)
+
+        if order_ids is None:
+            return list(results.values())
+        return [
+            results.get(pk, {'id': pk, 'result': 'not_found', 'status': None})
+            for pk in order_ids
+        ]
+
+    @staticmethod
+    def _get_states(orders: QuerySet[Order]) -> Dict[int, OrderState]:
+        """Выбирает состояние заказов одним запросом."""
+        return {
+            pk: OrderState(*state)
+            for pk, *state in orders.order_by().values_list('pk', *OrderState._fields)
+        }
+
+    @staticmethod
+    def notify_state_changes(before: Dict[int, OrderState], after: Dict[int, OrderState]) -> None:
+        """
+        Отправляет order_state_changed для заказов, изменившихся в обход save().
+
+        :param before: Состояния заказов до изменения.
+        :param after: Состояния заказов после изменения.
+        """
+        changes = [
+            OrderStateChange(pk, before.get(pk), after.get(pk))
+            for pk in before.keys() | after.keys()
+            if before.get(pk) != after.get(pk)
+        ]
+        if changes:
+            order_state_changed.send(sender=Order, changes=changes)
+
+    @staticmethod
+    def mark_order_dirty(order_id: int) -> None:
+        """
+        Помечает заказ для пересчета общей стоимости.
+
+        Внутри defer_total_recalculation() пересчет откладывается до конца блока,
+        иначе выполняется сразу.
+
+        :param order_id: Идентификатор заказа.
+        """
+        dirty_orders = _dirty_orders.get()
+        if dirty_orders is None:
+            OrderService.recalculate_totals([order_id])
+        else:
+            dirty_orders.add(order_id)
+
+
+@contextmanager
+def defer_total_recalculation() -> Iterator[Set[int]]:
+    """
+    Контекстный менеджер для пакетных изменений позиций заказов.
+
+    Открывает транзакцию, собирает заказы, затронутые изменениями OrderDish,
+    и перед фиксацией пересчитывает каждый из них ровно один раз.
+    Вложенные блоки присоединяются к внешнему.
+
+    Пример:
+        with defer_total_recalculation():
+            for item in items:
+                OrderDish.objects.create(order=order, **item)
+
+    :return: Множество идентификаторов «грязных» заказов.
+    """
+    dirty_orders = _dirty_orders.get()
+    if dirty_orders is not None:
+        yield dirty_orders
+        return
+
+    dirty_orders = set()
+    token = _dirty_orders.set(dirty_orders)
+    try:
+        with transaction.atomic():
+            yield dirty_orders
+            OrderService.recalculate_totals(dirty_orders)
+    finally:
+        _dirty_orders.reset(token)
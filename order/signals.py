@@ -1,8 +1,28 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver, Signal
 from django.db.models import Model
 
-from order.models import OrderDish
+from order.cache import invalidate_menu_cache
+from order.events import build_order_events, get_broadcaster
+from order.models import Dish, Order, OrderDish
+
+# Состояние заказа, от которого зависят агрегаты (выручка и т.п.)
+OrderState = namedtuple('OrderState', ['table_number', 'status', 'total_price', 'created_at'])
+
+# Изменение заказа: before=None — заказ создан, after=None — удален
+OrderStateChange = namedtuple('OrderStateChange', ['order_id', 'before', 'after'])
+
+# Отправляется при любом изменении состояния заказов, в том числе массовом (QuerySet.update).
+# Аргументы: changes (List[OrderStateChange]).
+order_state_changed = Signal()
+
+
+def get_order_state(order: Order) -> OrderState:
+    """Возвращает состояние заказа из экземпляра модели."""
+    return OrderState(*(getattr(order, field) for field in OrderState._fields))
 
 
 @receiver(post_save, sender=OrderDish)
@@ -11,11 +31,97 @@ def update_order_total_price(sender: Model, instance: OrderDish, **kwargs) -> No
     """
     Обновляет общую стоимость заказа при сохранении или удалении OrderDish.
 
+    Пересчет выполняется в БД одним запросом; внутри defer_total_recalculation()
+    заказ только помечается и пересчитывается один раз в конце транзакции.
+    При каскадном удалении самого заказа пересчет не нужен.
+
     Аргументы:
         sender (Model): Модель, которая отправила сигнал (OrderDish).
         instance (OrderDish): Экземпляр модели OrderDish, который был сохранен или удален.
         **kwargs: Дополнительные аргументы, передаваемые сигналом.
     """
-    order = instance.order
-    order.calculate_total_price()
-    order.save(update_fields=['total_price'])
+    # order.services сам импортирует этот модуль, поэтому импорт здесь
+    from order.services import OrderService
+
+    origin = kwargs.get('origin')
+    if isinstance(origin, Order) or getattr(origin, 'model', None) is Order:
+        return
+    OrderService.mark_order_dirty(instance.order_id)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_state(sender: Model, instance: Order, **kwargs) -> None:
+    """
+    Запоминает состояние заказа в БД до сохранения, если на изменения есть подписчики.
+
+    Строка блокируется (Order.save() выполняется в транзакции) до конца транзакции:
+    параллельное сохранение того же заказа прочитает уже зафиксированное состояние.
+    """
+    instance._state_before = None
+    if instance.pk is None or not order_state_changed.has_listeners():
+        return
+    before = (
+        Order.objects.db_manager(kwargs['using']).select_for_update()
+        .filter(pk=instance.pk).values_list(*OrderState._fields).first()
+    )
+    if before is not None:
+        instance._state_before = OrderState(*before)
+
+
+@receiver(post_save, sender=Order)
+def notify_order_saved(sender: Model, instance: Order, **kwargs) -> None:
+    """
+    Сообщает подписчикам order_state_changed об изменении сохраненного заказа.
+
+    Поля, не вошедшие в update_fields, в БД не менялись: их значения берутся
+    из состояния до сохранения, а не из (возможно, устаревшего) экземпляра.
+    """
+    before = getattr(instance, '_state_before', None)
+    after = get_order_state(instance)
+    update_fields = kwargs.get('update_fields')
+    if before is not None and update_fields is not None:
+        after = after._replace(**{
+            field: getattr(before, field) for field in OrderState._fields if field not in update_fields
+        })
+    if before != after:
+        order_state_changed.send(sender=Order, changes=[OrderStateChange(instance.pk, before, after)])
+
+
+@receiver(post_delete, sender=Order)
+def notify_order_deleted(sender: Model, instance: Order, **kwargs) -> None:
+    """
+    Сообщает подписчикам order_state_changed об удалении заказа.
+    """
+    change = OrderStateChange(instance.pk, get_order_state(instance), None)
+    order_state_changed.send(sender=Order, changes=[change])
+
+
+@receiver(order_state_changed)
+def publish_order_events(sender, changes, **kwargs) -> None:
+    """
+    Отправляет изменения заказов в поток событий (SSE) после фиксации транзакции,
+    чтобы клиенты не увидели откатившиеся изменения.
+    """
+    events = build_order_events(changes)
+    transaction.on_commit(lambda: get_broadcaster().publish(events), robust=True)
+
+
+@receiver(order_state_changed)
+def update_table_balances(sender, changes, **kwargs) -> None:
+    """
+    Обновляет открытые счета столов (TableBalance) при изменении заказов.
+    """
+    # order.balances сам импортирует этот модуль, поэтому импорт здесь
+    from order.balances import TableBalanceService
+
+    TableBalanceService.apply_changes(changes)
+
+
+@receiver(post_save, sender=Dish)
+@receiver(post_delete, sender=Dish)
+def invalidate_menu(sender: Model, instance: Dish, **kwargs) -> None:
+    """
+    Сбрасывает кэш меню при создании, изменении или удалении блюда
+    (через API, веб-интерфейс или админку).
+    """
+    invalidate_menu_cache()
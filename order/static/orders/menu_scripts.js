@@ -14,7 +14,7 @@ $(document).ready(function () {
                 url: `/order/delete_dish/${dishIdToDelete}/`,  // URL для удаления блюда
                 method: 'DELETE',
                 headers: {
-                    'X-CSRFToken': $('meta[name="csrf-token"]').attr('content')  // CSRF-токен для защиты
+                    'X-CSRFToken': getCookie('csrftoken')  // CSRF-токен из cookie (страница меню кэшируется)
                 },
                 success: function (response) {
                     $('#deleteDishModal').modal('hide');
@@ -29,6 +29,12 @@ $(document).ready(function () {
         }
     });
 
+    // Функция для чтения cookie по имени
+    function getCookie(name) {
+        const cookie = document.cookie.split('; ').find(row => row.startsWith(`${name}=`));
+        return cookie ? decodeURIComponent(cookie.split('=')[1]) : null;
+    }
+
     // Функция для отображения уведомлений
     function showToast(message, type) {
         const toastTemplate = $('#toastTemplate').clone().removeAttr('id');
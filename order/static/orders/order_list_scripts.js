@@ -2,7 +2,8 @@ $(document).ready(function() {
     let orderIdToDelete;
 
     // Открытие модального окна и сохранение id заказа
-    $('.delete-btn').click(function() {
+    // (обработчики делегированы, чтобы работать и для подгруженных строк)
+    $(document).on('click', '.delete-btn', function() {
         orderIdToDelete = $(this).data('order-id');
     });
 
@@ -33,7 +34,7 @@ $(document).ready(function() {
     });
 
     // Изменение статуса
-    $('.change-status').click(function(e) {
+    $(document).on('click', '.change-status', function(e) {
         e.preventDefault();
 
         const orderId = $(this).data('order-id');
@@ -68,6 +69,123 @@ $(document).ready(function() {
         });
     });
 
+    // Подгрузка следующей порции заказов с теми же фильтрами
+    function loadMoreOrders() {
+        const button = $('#loadMore');
+        const nextPage = button.data('next-page');
+        if (!nextPage || button.prop('disabled')) {
+            return;
+        }
+
+        const params = new URLSearchParams(window.location.search);
+        params.set('page', nextPage);
+        button.prop('disabled', true);
+
+        $.ajax({
+            url: `${window.location.pathname}?${params.toString()}`,
+            method: 'GET',
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest',
+            },
+            success: function(data) {
+                $('#ordersBody').append(data.html);
+                if (data.next_page) {
+                    button.data('next-page', data.next_page).prop('disabled', false);
+                } else {
+                    $('#loadMoreContainer').remove();
+                }
+            },
+            error: function() {
+                button.prop('disabled', false);
+                showToast('Произошла ошибка при загрузке заказов.', 'danger');
+            }
+        });
+    }
+
+    $('#loadMore').click(loadMoreOrders);
+
+    // Бесконечная прокрутка: следующая порция грузится, когда кнопка видна на экране
+    if ('IntersectionObserver' in window && $('#loadMore').length) {
+        const observer = new IntersectionObserver(function(entries) {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadMoreOrders();
+            }
+        });
+        observer.observe($('#loadMore')[0]);
+    }
+
+    // Живое обновление таблицы по потоку событий заказов (SSE)
+    function matchesFilters(order) {
+        const params = new URLSearchParams(window.location.search);
+        const tableNumber = params.get('table_number');
+        const status = params.get('status');
+        return (!tableNumber || Number(tableNumber) === order.table_number)
+            && (!status || status === order.status);
+    }
+
+    // Загружает строку заказа с сервера и заменяет существующую или добавляет в начало таблицы
+    function refreshOrderRow(orderId) {
+        $.ajax({
+            url: `/order/row/${orderId}/`,
+            method: 'GET',
+            success: function(data) {
+                const row = $(`#order-${orderId}`);
+                if (row.length) {
+                    row.replaceWith(data.html);
+                } else {
+                    $('#ordersBody').prepend(data.html);
+                }
+            }
+        });
+    }
+
+    if ('EventSource' in window) {
+        const events = new EventSource('/order/events/');
+
+        events.addEventListener('created', function(e) {
+            const order = JSON.parse(e.data);
+            if (matchesFilters(order)) {
+                refreshOrderRow(order.id);
+            }
+        });
+
+        // Изменились позиции, сумма или стол — строку проще перерисовать целиком
+        events.addEventListener('updated', function(e) {
+            const order = JSON.parse(e.data);
+            if (!$(`#order-${order.id}`).length) {
+                return;
+            }
+            if (matchesFilters(order)) {
+                refreshOrderRow(order.id);
+            } else {
+                $(`#order-${order.id}`).remove();
+            }
+        });
+
+        events.addEventListener('status_changed', function(e) {
+            const order = JSON.parse(e.data);
+            const row = $(`#order-${order.id}`);
+            if (!row.length) {
+                return;
+            }
+            if (matchesFilters(order)) {
+                row.find('td:nth-child(4)').text(`${order.total_price} руб.`);
+                row.find('td:nth-child(5)').text(order.status_display);
+            } else {
+                row.remove();
+            }
+        });
+
+        events.addEventListener('deleted', function(e) {
+            $(`#order-${JSON.parse(e.data).id}`).remove();
+        });
+
+        // Страница отстала от потока — перечитываем ее целиком
+        events.addEventListener('resync', function() {
+            window.location.reload();
+        });
+    }
+
     // Проверка номера стола перед отправкой
     $('#searchForm').submit(function(e) {
         const tableNumber = $('#table_number').val();
@@ -1,7 +1,17 @@
 import pytest
+from django.core.cache import cache
+
 from order.models import Dish, Order, OrderDish
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Фикстура для очистки кэша (в т.ч. кэша меню) между тестами."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def dish():
     """Фикстура для создания блюда."""
@@ -17,4 +27,16 @@ def order():
 @pytest.fixture
 def order_dish(order, dish):
     """Фикстура для создания связи заказа и блюда."""
-    return OrderDish.objects.create(order=order, dish=dish, quantity=2, price_at_order=10.50)
\ No newline at end of file
+    return OrderDish.objects.create(order=order, dish=dish, quantity=2, price_at_order=10.50)
+
+
+@pytest.fixture
+def orders_with_dishes():
+    """Фикстура для создания 50 заказов по 3 блюда в каждом."""
+    dishes = Dish.objects.bulk_create(Dish(name=f"Блюдо {i}", price=10 + i) for i in range(3))
+    orders = Order.objects.bulk_create(Order(table_number=i % 10 + 1, total_price=33) for i in range(50))
+    OrderDish.objects.bulk_create(
+        OrderDish(order=order, dish=dish, quantity=1, price_at_order=dish.price)
+        for order in orders for dish in dishes
+    )
+    return orders
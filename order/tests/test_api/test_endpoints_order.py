@@ -1,8 +1,71 @@
+import csv
+import gzip
+import io
+import json
+from asyncio import iscoroutinefunction
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+
 import pytest
-from django.urls import reverse
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection, router, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 
-from order.models import Order, OrderDish, Dish
+from cafe_order_system.db_router import PRIMARY_PIN_COOKIE, replica_reads
+from finance.services import RevenueService
+from order.benchmark import reload_urlconf
+from order.cache import MENU_VERSION_KEY, MenuCache
+from order.archive import OrderArchiveService
+from order.balances import TableBalanceService
+from order.models import ArchivedOrder, MenuVersion, Order, OrderDish, Dish
+from order.services import OrderService
+
+
+@pytest.mark.django_db
+def test_api_order_create(client, dish):
+    """
+    Тест создания заказа с позициями (API).
+    """
+    url = reverse('orders:api_order_create')
+    data = {
+        'table_number': 5,
+        'status': 'pending',
+        'items': [
+            {'dish': dish.id, 'quantity': 3, 'price_at_order': '10.50'},
+        ],
+    }
+    response = client.post(url, data, content_type='application/json')
+    assert response.status_code == 201
+    order = Order.objects.get()
+    assert order.total_price == 31.50
+    assert order.order_dishes.count() == 1
+
+
+@pytest.mark.django_db
+def test_api_order_create_duplicate_dish(client, dish):
+    """
+    Тест: одно блюдо нельзя указать в заказе дважды (API).
+    """
+    url = reverse('orders:api_order_create')
+    data = {
+        'table_number': 5,
+        'status': 'pending',
+        'items': [
+            {'dish': dish.id, 'quantity': 1, 'price_at_order': '10.50'},
+            {'dish': dish.id, 'quantity': 2, 'price_at_order': '10.50'},
+        ],
+    }
+    response = client.post(url, data, content_type='application/json')
+    assert response.status_code == 400
+    assert 'items' in response.json()
+    assert Order.objects.count() == 0
 
 
 @pytest.mark.django_db
@@ -22,6 +85,183 @@ def test_api_order_update(client, order):
     assert order.status == 'ready'
 
 
+@pytest.mark.django_db
+def test_api_order_update_rejects_invalid_status_transition(client, order_dish):
+    """
+    Тест: оплаченный заказ нельзя вернуть в ожидание, выручка не меняется (API).
+    """
+    order = order_dish.order
+    url = reverse('orders:api_order_update', args=[order.id])
+    assert client.patch(url, {'status': 'paid'}, content_type='application/json').status_code == 200
+    revenue = RevenueService.calculate_total_revenue()
+
+    response = client.patch(url, {'status': 'pending'}, content_type='application/json')
+    assert response.status_code == 400
+    assert 'status' in response.json()
+    order.refresh_from_db()
+    assert order.status == 'paid'
+    assert RevenueService.calculate_total_revenue() == revenue
+
+
+@pytest.mark.django_db
+def test_api_order_update_items_diff(client, orders_with_dishes):
+    """
+    Тест обновления позиций заказа: неизмененные позиции сохраняются, остальные
+    меняются пакетно, общая стоимость пересчитывается один раз (API).
+    """
+    order = orders_with_dishes[0]
+    kept, changed, removed = order.order_dishes.order_by('dish__name')
+    new_dish = Dish.objects.create(name="Суп", price=5)
+    url = reverse('orders:api_order_update', args=[order.id])
+    data = {
+        'table_number': 3,
+        'status': 'pending',
+        'items': [
+            {'dish': kept.dish_id, 'quantity': kept.quantity, 'price_at_order': str(kept.price_at_order)},
+            {'dish': changed.dish_id, 'quantity': 4, 'price_at_order': str(changed.price_at_order)},
+            {'dish': new_dish.id, 'quantity': 2, 'price_at_order': '5.00'},
+        ],
+    }
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.put(url, data, content_type='application/json')
+    assert response.status_code == 200
+
+    lines = {line.dish_id: line for line in order.order_dishes.all()}
+    assert set(lines) == {kept.dish_id, changed.dish_id, new_dish.id}
+    assert lines[kept.dish_id].pk == kept.pk
+    assert lines[changed.dish_id].pk == changed.pk
+    assert lines[changed.dish_id].quantity == 4
+    order.refresh_from_db()
+    assert order.total_price == 10 + 11 * 4 + 10
+
+    statements = [query['sql'].split(' ', 3)[:3] for query in context.captured_queries]
+    assert statements.count(['INSERT', 'INTO', '"order_orderdish"']) == 1
+    assert [statement[:2] for statement in statements].count(['DELETE', 'FROM']) == 1
+    order_dish_updates = [query for query in context.captured_queries if query['sql'].startswith('UPDATE "order_orderdish"')]
+    total_updates = [query for query in context.captured_queries if 'SET "total_price"' in query['sql']]
+    assert len(order_dish_updates) == 1
+    assert len(total_updates) == 1
+
+
+@pytest.mark.django_db
+def test_api_order_items_add_change_remove(client, order_dish):
+    """
+    Тест добавления, изменения количества и удаления блюда в заказе: в ответе новая общая стоимость (API).
+    """
+    order = order_dish.order
+    Order.objects.filter(pk=order.pk).update(total_price=21)
+    soup = Dish.objects.create(name="Суп", price=5)
+
+    response = client.post(reverse('orders:api_order_items', args=[order.id]), {'dish': soup.id, 'quantity': 2},
+                           content_type='application/json')
+    assert response.status_code == 201
+    assert response.json() == {'dish': soup.id, 'quantity': 2, 'price_at_order': '5.00', 'total_price': '31.00'}
+
+    # Повторное добавление того же блюда отклоняется
+    response = client.post(reverse('orders:api_order_items', args=[order.id]), {'dish': soup.id},
+                           content_type='application/json')
+    assert response.status_code == 400
+
+    url = reverse('orders:api_order_item_detail', args=[order.id, soup.id])
+    response = client.patch(url, {'quantity': 5}, content_type='application/json')
+    assert response.status_code == 200
+    assert response.json()['total_price'] == '46.00'
+
+    response = client.delete(url)
+    assert response.status_code == 200
+    assert response.json() == {'total_price': '21.00'}
+    order.refresh_from_db()
+    assert order.total_price == 21
+    assert client.delete(url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_api_order_items_cost_does_not_depend_on_order_size(client):
+    """
+    Тест: изменение позиции стоит одинаковое число запросов для заказа из 1 и из 30 блюд (API).
+    """
+    dishes = Dish.objects.bulk_create(Dish(name=f"Блюдо {i}", price=10) for i in range(30))
+    small = Order.objects.create(table_number=1, total_price=10)
+    large = Order.objects.create(table_number=2, total_price=300)
+    OrderDish.objects.bulk_create(
+        [OrderDish(order=small, dish=dishes[0], quantity=1, price_at_order=10)]
+        + [OrderDish(order=large, dish=dish, quantity=1, price_at_order=10) for dish in dishes]
+    )
+
+    query_counts = []
+    for order in (small, large):
+        with CaptureQueriesContext(connection) as context:
+            client.patch(reverse('orders:api_order_item_detail', args=[order.id, dishes[0].id]),
+                         {'quantity': 3}, content_type='application/json')
+            client.delete(reverse('orders:api_order_item_detail', args=[order.id, dishes[0].id]))
+            client.post(reverse('orders:api_order_items', args=[order.id]), {'dish': dishes[0].id},
+                        content_type='application/json')
+        query_counts.append(len(context.captured_queries))
+        assert not any('SUM(' in query['sql'] for query in context.captured_queries)
+
+    assert query_counts[0] == query_counts[1]
+    small.refresh_from_db()
+    large.refresh_from_db()
+    assert small.total_price == 10
+    assert large.total_price == 300
+
+
+@pytest.mark.django_db
+def test_api_order_bulk_status_by_ids(client, orders_with_dishes):
+    """
+    Тест массовой смены статуса по списку заказов: один UPDATE и результат по каждому заказу (API).
+    """
+    ready, paid, pending = orders_with_dishes[:3]
+    Order.objects.filter(pk=ready.pk).update(status='ready')
+    Order.objects.filter(pk=paid.pk).update(status='paid')
+    url = reverse('orders:api_order_bulk_status')
+    data = {'ids': [ready.id, paid.id, pending.id, 999999], 'status': 'ready'}
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(url, data, content_type='application/json')
+    assert response.status_code == 200
+    assert response.json() == {
+        'updated': 1,
+        'results': [
+            {'id': ready.id, 'result': 'unchanged', 'status': 'ready'},
+            {'id': paid.id, 'result': 'invalid_transition', 'status': 'paid'},
+            {'id': pending.id, 'result': 'updated', 'status': 'ready'},
+            {'id': 999999, 'result': 'not_found', 'status': None},
+        ],
+    }
+    updates = [query for query in context.captured_queries if query['sql'].startswith('UPDATE "order_order"')]
+    assert len(updates) == 1
+    assert Order.objects.get(pk=pending.pk).status == 'ready'
+    # Выручка учитывает заказ, ставший готовым
+    assert RevenueService.calculate_total_revenue() == 33
+
+
+@pytest.mark.django_db
+def test_api_order_bulk_status_by_table(client, orders_with_dishes):
+    """
+    Тест массовой смены статуса по номеру стола и текущему статусу (API).
+    """
+    Order.objects.filter(table_number=3).update(status='ready')
+    url = reverse('orders:api_order_bulk_status')
+    data = {'table_number': 3, 'current_status': 'ready', 'status': 'paid'}
+    response = client.post(url, data, content_type='application/json')
+    assert response.status_code == 200
+    assert response.json()['updated'] == 5
+    assert set(Order.objects.filter(table_number=3).values_list('status', flat=True)) == {'paid'}
+    assert not Order.objects.filter(status='paid').exclude(table_number=3).exists()
+
+
+@pytest.mark.django_db
+def test_api_order_bulk_status_requires_orders(client):
+    """
+    Тест: без ids и table_number запрос отклоняется (API).
+    """
+    url = reverse('orders:api_order_bulk_status')
+    response = client.post(url, {'status': 'paid'}, content_type='application/json')
+    assert response.status_code == 400
+
+
 @pytest.mark.django_db
 def test_api_order_delete(client, order):
     """
@@ -46,6 +286,209 @@ def test_api_remove_dish_from_order(client, order_dish):
     assert not OrderDish.objects.filter(order=order, dish=dish).exists()
 
 
+@pytest.mark.django_db
+def test_api_order_list_query_budget(client, orders_with_dishes, django_assert_num_queries):
+    """
+    Тест: страница из 50 заказов загружается фиксированным числом запросов (API).
+    """
+    url = reverse('orders:api_order_list')
+    # COUNT, заказы, позиции вместе с блюдами
+    with django_assert_num_queries(3):
+        response = client.get(url, {'page_size': 50})
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == 50
+    assert results[0]['total_price'] == '33.00'
+    assert len(results[0]['items']) == 3
+
+
+@pytest.mark.django_db
+def test_api_order_detail_query_budget(client, orders_with_dishes, django_assert_num_queries):
+    """
+    Тест: детали заказа загружаются тремя запросами (API): updated_at для ETag,
+    заказ и позиции с блюдами. Версия меню берется из кэша.
+    """
+    order = orders_with_dishes[0]
+    url = reverse('orders:api_order_detail', args=[order.id])
+    MenuCache.refresh()
+    with django_assert_num_queries(3):
+        response = client.get(url)
+    assert response.status_code == 200
+    data = response.json()
+    assert data['total_price'] == '33.00'
+    assert data['status'] == 'В ожидании'
+    assert {item['dish']['name'] for item in data['items']} == {'Блюдо 0', 'Блюдо 1', 'Блюдо 2'}
+
+
+@pytest.mark.django_db
+def test_api_order_detail_conditional_get(client, order_dish, dish, django_assert_num_queries):
+    """
+    Тест: условный запрос деталей заказа получает 304 за один запрос к БД,
+    а изменение позиций или меню меняет ETag (API).
+    """
+    url = reverse('orders:api_order_detail', args=[order_dish.order_id])
+    response = client.get(url)
+    etag = response['ETag']
+    assert response['Cache-Control'] == 'private, no-cache'
+
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    last_modified = client.get(url)['Last-Modified']
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+    # Изменение количества не меняет Order через save(), но меняет updated_at
+    OrderService.change_order_item_quantity(order_dish.order_id, dish.id, 5)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['items'][0]['quantity'] == 5
+    etag = response['ETag']
+
+    # Истечение копии версии меню в кэше ETag не меняет
+    cache.delete(MENU_VERSION_KEY)
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    # Блюда выводятся в позициях, поэтому изменение меню тоже меняет ETag
+    dish.name = 'Новое название'
+    dish.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['items'][0]['dish']['name'] == 'Новое название'
+
+    assert client.get(reverse('orders:api_order_detail', args=[0])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_api_responses_gzip(client, orders_with_dishes):
+    """Тест: JSON-ответы API сжимаются, HTML-страницы — нет."""
+    response = client.get(reverse('orders:api_order_list'), HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.content))['count'] == 50
+
+    response = client.get(reverse('orders:order_list'), HTTP_ACCEPT_ENCODING='gzip')
+    assert not response.has_header('Content-Encoding')
+
+
+@pytest.mark.django_db
+def test_order_values_serializer_parity(client, orders_with_dishes, django_assert_num_queries):
+    """
+    Тест: быстрый вывод заказов (ORDER_VALUES_SERIALIZER) дает тот же JSON байт в байт,
+    что и OrderSerializer, за то же число запросов (API).
+    """
+    dish = Dish.objects.create(name='Кофе "Лате"', price='3.05')
+    empty_order = Order.objects.create(table_number=7, status=Order.StatusChoices.PAID)
+    OrderService.add_order_item(orders_with_dishes[1].pk, dish, 4, price_at_order=Decimal('2.5'))
+    # Копия версии меню обновляется после фиксации транзакции, которой в тесте нет
+    MenuCache.refresh()
+    order_list = reverse('orders:api_order_list')
+    paths = [
+        order_list,
+        order_list + '?page=3&page_size=7',
+        order_list + '?table_number=2',
+        order_list + '?status=paid',
+        order_list + '?pagination=cursor&page_size=4',
+        reverse('orders:api_order_detail', args=[orders_with_dishes[1].pk]),
+        reverse('orders:api_order_detail', args=[empty_order.pk]),
+        reverse('orders:api_order_detail', args=[0]),
+    ]
+
+    def fetch_all():
+        responses = []
+        for path in paths:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(path)
+            responses.append((response.status_code, response.content, len(queries)))
+        next_link = json.loads(responses[4][1])['next']
+        responses.append((client.get(next_link).content, ))
+        return responses
+
+    with override_settings(ORDER_VALUES_SERIALIZER=False):
+        expected = fetch_all()
+    with override_settings(ORDER_VALUES_SERIALIZER=True):
+        assert fetch_all() == expected
+
+    # Позиция с ценой, отличной от цены блюда, и заказ без позиций
+    detail = json.loads(expected[5][1])
+    assert detail['items'][-1] == {
+        'dish': {'id': dish.pk, 'name': 'Кофе "Лате"', 'price': '3.05'}, 'quantity': 4, 'price_at_order': '2.50',
+    }
+    assert json.loads(expected[6][1])['items'] == []
+
+
+def collect_cursor_pages(client, url, params):
+    """Проходит все страницы курсорной пагинации и возвращает id заказов и ответы."""
+    ids, responses = [], []
+    response = client.get(url, {'pagination': 'cursor', **params})
+    while True:
+        assert response.status_code == 200
+        data = response.json()
+        responses.append(data)
+        ids.extend(order['id'] for order in data['results'])
+        if not data['next']:
+            return ids, responses
+        response = client.get(data['next'])
+
+
+@pytest.mark.django_db
+def test_api_order_list_cursor_pagination(client, orders_with_dishes):
+    """
+    Тест keyset-пагинации: все заказы проходятся без пропусков и повторов,
+    в том числе при одинаковом created_at (API).
+    """
+    # Половина заказов с одинаковым временем создания
+    Order.objects.filter(id__in=[order.id for order in orders_with_dishes[:25]]).update(
+        created_at=orders_with_dishes[0].created_at
+    )
+    url = reverse('orders:api_order_list')
+    ids, responses = collect_cursor_pages(client, url, {'page_size': 15})
+
+    expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+    assert ids == expected
+    assert len(responses) == 4
+    assert 'count' not in responses[0]
+    assert responses[0]['previous'] is None
+
+    # Переход назад возвращает предыдущую страницу целиком
+    previous = client.get(responses[2]['previous']).json()
+    assert [order['id'] for order in previous['results']] == ids[15:30]
+
+
+@pytest.mark.django_db
+def test_api_order_list_cursor_pagination_with_filters(client, orders_with_dishes):
+    """
+    Тест: курсорная пагинация сохраняет фильтры OrderFilter в ссылках (API).
+    """
+    url = reverse('orders:api_order_list')
+    ids, _ = collect_cursor_pages(client, url, {'page_size': 2, 'table_number': 3})
+    assert ids == list(
+        Order.objects.filter(table_number=3).order_by('-created_at', '-id').values_list('id', flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_api_order_list_cursor_deep_page_query_budget(client, orders_with_dishes, django_assert_num_queries):
+    """
+    Тест: глубокая страница стоит столько же запросов, сколько первая, и без COUNT (API).
+    """
+    url = reverse('orders:api_order_list')
+    _, responses = collect_cursor_pages(client, url, {'page_size': 10})
+    # заказы и позиции вместе с блюдами
+    with django_assert_num_queries(2) as context:
+        client.get(responses[-2]['next'])
+    assert not any('COUNT' in query['sql'] for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_api_order_list_invalid_cursor(client):
+    """
+    Тест: некорректный курсор возвращает 404 (API).
+    """
+    url = reverse('orders:api_order_list')
+    response = client.get(url, {'pagination': 'cursor', 'cursor': 'not-a-cursor'})
+    assert response.status_code == 404
+
+
 # Тесты для DishViewSet
 @pytest.mark.django_db
 def test_dish_viewset_list(client, dish):
@@ -59,6 +502,65 @@ def test_dish_viewset_list(client, dish):
     assert response.data['results'][0]['id'] == dish.id
 
 
+@pytest.mark.django_db
+def test_dish_viewset_list_conditional_get(client, dish, django_assert_num_queries):
+    """
+    Тест: список блюд отдается с ETag, повторно — из кэша, на условный запрос — 304
+    без обращения к БД; после изменения блюда ETag меняется (API).
+    """
+    url = reverse('orders:dish-list')
+    response = client.get(url)
+    etag = response['ETag']
+    assert response.has_header('Last-Modified')
+
+    with django_assert_num_queries(0):
+        cached_response = client.get(url)
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert cached_response.content == response.content
+    assert not_modified.status_code == 304
+
+    client.patch(reverse('orders:dish-detail', args=[dish.id]), {'name': 'Суп'}, content_type='application/json')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.json()['results'][0]['name'] == 'Суп'
+
+
+@pytest.mark.django_db
+def test_dish_list_version_survives_cache_expiry(client, dish):
+    """
+    Тест: истечение копии версии меню в кэше не меняет версию,
+    и условный запрос по-прежнему получает 304 (API).
+    """
+    url = reverse('orders:dish-list')
+    etag = client.get(url)['ETag']
+
+    cache.delete(MENU_VERSION_KEY)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+
+@pytest.mark.django_db
+def test_dish_list_version_changed_by_other_process(client, dish):
+    """
+    Тест: процесс, не видевший изменения блюда, после истечения копии версии
+    перечитывает версию из БД и перестает отдавать старое меню (API).
+    """
+    url = reverse('orders:dish-list')
+    etag = client.get(url)['ETag']
+    # Изменение, сделанное другим процессом: копия версии в этом процессе не обновилась
+    Dish.objects.filter(pk=dish.pk).update(name='Суп')
+    MenuVersion.objects.update(version=F('version') + 1)
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    cache.delete(MENU_VERSION_KEY)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.json()['results'][0]['name'] == 'Суп'
+
+
 @pytest.mark.django_db
 def test_dish_viewset_create(client):
     """
@@ -187,4 +689,256 @@ def test_dish_update_view(client, dish):
     """
     url = reverse('orders:update_dish', args=[dish.id])
     response = client.get(url)
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+@contextmanager
+def async_api_views():
+    """Включает асинхронные представления чтения (ASYNC_API_VIEWS) на время блока."""
+    try:
+        with override_settings(ASYNC_API_VIEWS=True):
+            reload_urlconf()
+            yield
+    finally:
+        reload_urlconf()
+
+
+@pytest.mark.django_db
+def test_async_api_views_parity(client, async_client, orders_with_dishes):
+    """
+    Тест: асинхронные представления чтения отвечают так же, как синхронные,
+    включая ошибки фильтров, пагинации и отсутствующие объекты.
+    """
+    dish = Dish.objects.first()
+    paths = [
+        reverse('orders:api_order_list'),
+        reverse('orders:api_order_list') + '?table_number=2&page=2&page_size=3',
+        reverse('orders:api_order_list') + '?pagination=cursor&page_size=5',
+        reverse('orders:api_order_list') + '?table_number=abc',
+        reverse('orders:api_order_list') + '?page=100',
+        reverse('orders:api_order_detail', args=[orders_with_dishes[0].pk]),
+        reverse('orders:api_order_detail', args=[0]),
+        reverse('orders:dish-list'),
+        reverse('orders:dish-detail', args=[dish.pk]),
+        reverse('orders:dish-detail', args=[0]),
+        reverse('finance:api_calculate_revenue'),
+    ]
+    expected = [(response.status_code, response.json()) for response in map(client.get, paths)]
+    detail_etag = client.get(paths[5])['ETag']
+
+    async def fetch_all():
+        responses = [await async_client.get(path) for path in paths]
+        return [(response.status_code, response.json()) for response in responses]
+
+    with async_api_views():
+        assert iscoroutinefunction(resolve(reverse('orders:api_order_list')).func)
+        assert async_to_sync(fetch_all)() == expected
+
+        response = async_to_sync(async_client.get)(paths[5], headers={'If-None-Match': detail_etag})
+        assert response.status_code == 304
+
+        # Запись блюд по-прежнему обслуживает DishViewSet
+        response = client.post(reverse('orders:dish-list'), {'name': 'Суп', 'price': '5.00'})
+        assert response.status_code == 201
+
+    assert not iscoroutinefunction(resolve(reverse('orders:api_order_list')).func)
+
+
+@pytest.fixture
+def export_orders(dish):
+    """Фикстура: два заказа за сегодня (с позицией и без) и один вчерашний."""
+    with_items = OrderService.create_order_with_items(
+        [{'dish': dish, 'quantity': 3, 'price_at_order': '10.50'}], table_number=2,
+    )
+    empty = Order.objects.create(table_number=3)
+    old = Order.objects.create(table_number=2)
+    Order.objects.filter(pk=old.pk).update(created_at=old.created_at - timedelta(days=1))
+    return with_items, empty
+
+
+def export_url(**params):
+    today = timezone.localdate().isoformat()
+    params = {'date_from': today, 'date_to': today, **params}
+    return reverse('orders:api_order_export') + '?' + urlencode(params)
+
+
+@pytest.mark.django_db
+def test_api_order_export_csv(client, export_orders, django_assert_num_queries):
+    """
+    Тест: CSV-выгрузка — по строке на позицию, заказ без позиций одной строкой,
+    заголовок отдается до первого запроса к базе.
+    """
+    with_items, empty = export_orders
+    with django_assert_num_queries(0):
+        response = client.get(export_url())
+        content = iter(response.streaming_content)
+        header = next(content)
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+    today = timezone.localdate()
+    assert response['Content-Disposition'] == f'attachment; filename="orders_{today}_{today}.csv"'
+    assert header.decode().startswith('order_id,created_at,table_number,')
+
+    rows = list(csv.DictReader(io.StringIO((header + b''.join(content)).decode())))
+    assert [row['order_id'] for row in rows] == [str(with_items.pk), str(empty.pk)]
+    assert rows[0]['dish_name'] == 'Пицца'
+    assert rows[0]['quantity'] == '3'
+    assert rows[0]['line_total'] == rows[0]['total_price'] == '31.50'
+    assert rows[1]['dish_id'] == rows[1]['line_total'] == ''
+
+    response = client.get(export_url(table_number=3, status='pending'))
+    rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+    assert [row['order_id'] for row in rows] == [str(empty.pk)]
+
+
+@pytest.mark.django_db
+def test_api_order_export_ndjson(client, async_client, export_orders):
+    """Тест: NDJSON-выгрузка; под ASGI поток отдается тем же содержимым."""
+    with_items, empty = export_orders
+    url = export_url(file_format='ndjson')
+    response = client.get(url)
+    assert response['Content-Type'] == 'application/x-ndjson; charset=utf-8'
+    content = b''.join(response.streaming_content)
+    lines = [json.loads(line) for line in content.decode().splitlines()]
+    assert [line['order_id'] for line in lines] == [with_items.pk, empty.pk]
+    assert lines[0]['price_at_order'] == '10.50'
+    assert lines[1]['dish_id'] is None
+
+    async def fetch():
+        response = await async_client.get(url)
+        return response.is_async, b''.join([block async for block in response.streaming_content])
+
+    assert async_to_sync(fetch)() == (True, content)
+
+
+@pytest.mark.django_db
+def test_api_order_export_invalid_params(client):
+    """Тест: неверные параметры выгрузки — ответ 400."""
+    url = reverse('orders:api_order_export')
+    assert client.get(url).status_code == 400
+    assert client.get(export_url(file_format='xlsx')).status_code == 400
+    response = client.get(url + '?date_from=2025-02-01&date_to=2025-01-01')
+    assert response.status_code == 400
+    assert 'non_field_errors' in response.json()
+
+
+@pytest.mark.django_db
+def test_api_table_balance(client, dish, django_assert_num_queries):
+    """
+    Тест: открытые счета столов обновляются при создании заказов, изменении позиций,
+    оплате и удалении и читаются одним запросом (API).
+    """
+    for table_number, quantity in ((7, 2), (7, 1), (3, 4)):
+        data = {
+            'table_number': table_number,
+            'items': [{'dish': dish.id, 'quantity': quantity, 'price_at_order': '10.50'}],
+        }
+        assert client.post(reverse('orders:api_order_create'), data, content_type='application/json').status_code == 201
+    first, second, third = Order.objects.order_by('pk')
+    url = reverse('orders:api_table_balance', args=[7])
+
+    with django_assert_num_queries(1):
+        response = client.get(url)
+    assert response.json() == {'table_number': 7, 'open_total': '31.50', 'open_orders': 2}
+
+    soup = Dish.objects.create(name='Суп', price=5)
+    client.post(reverse('orders:api_order_items', args=[second.id]), {'dish': soup.id, 'quantity': 2},
+                content_type='application/json')
+    client.post(reverse('orders:api_order_bulk_status'), {'ids': [first.id], 'status': 'paid'},
+                content_type='application/json')
+    assert client.get(url).json() == {'table_number': 7, 'open_total': '20.50', 'open_orders': 1}
+
+    client.delete(reverse('orders:api_order_delete_api', args=[third.id]))
+    with django_assert_num_queries(1):
+        response = client.get(reverse('orders:api_table_balance_list'))
+    assert response.json() == [{'table_number': 7, 'open_total': '20.50', 'open_orders': 1}]
+    assert client.get(reverse('orders:api_table_balance', args=[12])).json() == {
+        'table_number': 12, 'open_total': '0.00', 'open_orders': 0,
+    }
+    assert TableBalanceService.rebuild(fix=False) == []
+
+
+@pytest.mark.django_db
+def test_archived_order_detail_and_export(client, async_client, export_orders):
+    """
+    Тест: после переноса в архив заказ отдается деталями (синхронно и асинхронно)
+    в прежнем формате, а выгрузка сливает архив с рабочими заказами по дате создания.
+    """
+    with_items, empty = export_orders
+    url = reverse('orders:api_order_detail', args=[with_items.pk])
+    Order.objects.filter(pk=with_items.pk).update(status=Order.StatusChoices.PAID)
+    expected = client.get(url).json()
+    csv_before = b''.join(client.get(export_url()).streaming_content)
+
+    archived, _ = OrderArchiveService.archive_batch(timezone.now() + timedelta(days=1))
+    assert archived == 1
+    assert ArchivedOrder.objects.filter(pk=with_items.pk).exists()
+    assert not Order.objects.filter(pk=with_items.pk).exists()
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.json() == expected
+    assert client.get(url, headers={'If-None-Match': response['ETag']}).status_code == 304
+    assert b''.join(client.get(export_url()).streaming_content) == csv_before
+
+    # Архив содержит только оплаченные заказы и не читается для других статусов
+    response = client.get(export_url(status='pending'))
+    rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+    assert [row['order_id'] for row in rows] == [str(empty.pk)]
+
+    with async_api_views():
+        response = async_to_sync(async_client.get)(url)
+        assert response.status_code == 200
+        assert response.json() == expected
+
+
+@pytest.mark.django_db(databases=['default', 'replica'])
+def test_read_replica_routing(client, dish, settings):
+    """
+    Тест: отчетные чтения идут на реплику, запись — в основную базу, а клиент,
+    который только что писал, читает из основной базы.
+
+    Реплика в тестах — отдельная база без репликации, поэтому записанного в основную на ней нет.
+    """
+    settings.READ_REPLICA_ENABLED = True
+    list_url = reverse('orders:api_order_list')
+    data = {'table_number': 5, 'items': [{'dish': dish.id, 'quantity': 1, 'price_at_order': '10.50'}]}
+    response = client.post(reverse('orders:api_order_create'), data, content_type='application/json')
+    assert response.status_code == 201
+    assert response.cookies[PRIMARY_PIN_COOKIE]['max-age'] == settings.READ_REPLICA_PIN_SECONDS
+    assert not Order.objects.using('replica').exists()
+
+    # Официант видит свой заказ, другой клиент читает реплику
+    assert client.get(list_url).json()['count'] == 1
+    assert APIClient().get(list_url).json()['count'] == 0
+    # Чтение без записи не продлевает закрепление
+    assert PRIMARY_PIN_COOKIE not in client.get(list_url).cookies
+
+    # Неотчетные чтения всегда идут в основную базу
+    order = Order.objects.get()
+    assert APIClient().get(reverse('orders:api_order_detail', args=[order.pk])).status_code == 200
+
+    del client.cookies[PRIMARY_PIN_COOKIE]
+    assert client.get(list_url).json()['count'] == 0
+
+    with replica_reads():
+        assert router.db_for_read(Order) == 'replica'
+        with transaction.atomic():
+            assert router.db_for_read(Order) == 'default'
+    settings.READ_REPLICA_ENABLED = False
+    assert APIClient().get(list_url).json()['count'] == 1
+
+
+@pytest.mark.django_db(databases=['default', 'replica'])
+def test_read_replica_routing_async(async_client, orders_with_dishes, settings):
+    """Тест: асинхронные отчетные представления тоже читают реплику."""
+    settings.READ_REPLICA_ENABLED = True
+
+    async def fetch(path):
+        response = await async_client.get(path)
+        return response.json()
+
+    with async_api_views():
+        assert async_to_sync(fetch)(reverse('orders:api_order_list'))['count'] == 0
+        assert async_to_sync(fetch)(reverse('finance:api_calculate_revenue'))['total_revenue'] == 0
+    settings.READ_REPLICA_ENABLED = False
+    assert async_to_sync(fetch)(reverse('orders:api_order_list'))['count'] == 50
@@ -0,0 +1,412 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpRequest
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from finance.models import Revenue, RevenueLedger
+from finance.services import RevenueLedgerService, RevenueService
+from order.importer import iter_json_array
+from order.api.filters import OrderFilter
+from order.cache import MENU_VERSION_KEY, MenuCache
+from order.models import ArchivedOrder, ArchivedOrderDish, Dish, Order, OrderDish, TableBalance
+from order.partitions import (
+    LEGACY_PARTITION, OrderPartitionService, add_months, get_lines_table, get_month_bound, get_partition_name,
+)
+from order.services import OrderService, defer_total_recalculation
+from order.signals import order_state_changed
+
+
+def create_dishes(count):
+    """Создает указанное количество блюд."""
+    return Dish.objects.bulk_create(
+        Dish(name=f"Блюдо {i}", price=10 + i) for i in range(count)
+    )
+
+
+@pytest.mark.django_db
+def test_create_order_with_items():
+    """Тест создания заказа вместе с позициями и расчета общей стоимости."""
+    first, second = create_dishes(2)
+    order = OrderService.create_order_with_items(
+        [
+            {'dish': first, 'quantity': 2, 'price_at_order': 10.50},
+            {'dish': second, 'quantity': 1, 'price_at_order': 5.25},
+        ],
+        table_number=4,
+    )
+
+    order.refresh_from_db()
+    assert order.table_number == 4
+    assert order.total_price == 26.25
+    assert OrderDish.objects.filter(order=order).count() == 2
+
+
+@pytest.mark.django_db
+def test_create_order_with_items_query_count_is_constant():
+    """Тест: число запросов не зависит от количества позиций в заказе."""
+    dishes = create_dishes(20)
+    # Открытый счет стола уже есть: он обновляется одним UPDATE
+    TableBalance.objects.create(table_number=1)
+    query_counts = []
+    for line_count in (1, 20):
+        items_data = [
+            {'dish': dish, 'quantity': 1, 'price_at_order': dish.price}
+            for dish in dishes[:line_count]
+        ]
+        with CaptureQueriesContext(connection) as context:
+            OrderService.create_order_with_items(items_data, table_number=1)
+        query_counts.append(len(context.captured_queries))
+
+    assert query_counts[0] == query_counts[1]
+    # SAVEPOINT, INSERT заказа, INSERT позиций, UPDATE открытого счета стола, RELEASE
+    assert query_counts[1] <= 5
+    assert Order.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_defer_total_recalculation_updates_order_once(order):
+    """Тест: внутри блока стоимость заказа пересчитывается один раз при выходе."""
+    dishes = [Dish.objects.create(name=f"Блюдо {i}", price=10.50) for i in range(3)]
+    with CaptureQueriesContext(connection) as context:
+        with defer_total_recalculation() as dirty_orders:
+            for dish in dishes:
+                OrderDish.objects.create(order=order, dish=dish, quantity=1, price_at_order=10.50)
+            assert dirty_orders == {order.id}
+
+    order_updates = [
+        query for query in context.captured_queries
+        if query['sql'].startswith('UPDATE "order_order"')
+    ]
+    assert len(order_updates) == 1
+    order.refresh_from_db()
+    assert order.total_price == 31.50
+
+
+@pytest.mark.django_db
+def test_defer_total_recalculation_nested_blocks_share_scope(order, dish):
+    """Тест: вложенный блок не пересчитывает заказ раньше внешнего."""
+    with defer_total_recalculation() as outer:
+        with defer_total_recalculation() as inner:
+            OrderDish.objects.create(order=order, dish=dish, quantity=2, price_at_order=10.50)
+        assert inner is outer
+        order.refresh_from_db()
+        assert order.total_price == 0
+
+    order.refresh_from_db()
+    assert order.total_price == 21.00
+
+
+@pytest.mark.django_db
+def test_recalculate_totals_for_many_orders_in_one_update(dish):
+    """Тест: пересчет нескольких заказов выполняется одним UPDATE."""
+    orders = [Order.objects.create(table_number=i) for i in range(1, 4)]
+    OrderDish.objects.bulk_create(
+        OrderDish(order=order, dish=dish, quantity=index + 1, price_at_order=10)
+        for index, order in enumerate(orders)
+    )
+
+    with CaptureQueriesContext(connection) as context:
+        OrderService.recalculate_totals(order.id for order in orders)
+
+    updates = [query for query in context.captured_queries if query['sql'].startswith('UPDATE "order_order"')]
+    assert len(updates) == 1
+    assert [order.total_price for order in Order.objects.order_by('table_number')] == [10, 20, 30]
+
+
+@pytest.mark.django_db
+def test_benchmark_api_command(tmp_path):
+    """Тест: бенчмарк пишет результаты в JSON, откатывает тестовые данные и находит регрессии."""
+    output = tmp_path / 'results.json'
+    options = {'orders': 30, 'dishes': 5, 'requests': 2, 'warmup': 0, 'output': str(output), 'stdout': StringIO()}
+    cache.set('other:key', 'value')
+    menu_version = MenuCache.get_version(HttpRequest())
+    call_command('benchmark_api', baseline=str(tmp_path / 'missing.json'), **options)
+
+    # Общий кэш не очищается, меню с тестовыми блюдами и его версия в нем не остаются
+    assert cache.get('other:key') == 'value'
+    assert cache.get(MENU_VERSION_KEY) == menu_version
+    report = json.loads(output.read_text())
+    assert report['results']['order_list']['queries_max'] == 3
+    assert {'p50_ms', 'p95_ms', 'p99_ms', 'db_mean_ms'} <= report['results']['order_detail'].keys()
+    assert not Order.objects.exists()
+
+    # Базовая линия с меньшим числом запросов — регрессия
+    report['results']['order_list']['queries_max'] = 2
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(report))
+    with pytest.raises(CommandError, match='Найдено регрессий: 1'):
+        call_command('benchmark_api', baseline=str(baseline), tolerance=1000, **options)
+
+
+def test_benchmark_async_command(tmp_path, django_db_setup, django_db_blocker):
+    """Тест: сравнение sync/async пишет результаты по режимам и нагрузкам на временной базе."""
+    output = tmp_path / 'results.json'
+    with django_db_blocker.unblock():
+        call_command(
+            'benchmark_async', orders=20, dishes=5, requests=4, concurrency=[1, 2],
+            only=['order_list', 'dish_detail'], output=str(output), stdout=StringIO(),
+        )
+        assert not Order.objects.exists()
+
+    report = json.loads(output.read_text())
+    assert report['results'].keys() == {'order_list', 'dish_detail'}
+    stats = report['results']['order_list']['async']['2']
+    assert {'rps', 'p50_ms', 'p99_ms', 'threads_max'} <= stats.keys()
+
+
+@pytest.mark.django_db
+def test_export_orders_command(tmp_path):
+    """Тест: команда выгружает заказы в файл порциями заданного размера."""
+    dish, = create_dishes(1)
+    orders = [
+        OrderService.create_order_with_items([{'dish': dish, 'quantity': 1, 'price_at_order': 10}], table_number=1)
+        for _ in range(5)
+    ]
+    output = tmp_path / 'orders.csv'
+    today = str(timezone.localdate())
+    call_command('export_orders', '--from', today, '--chunk-size', '2', '--output', str(output), stderr=StringIO())
+
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines[0].startswith('order_id,')
+    assert [int(line.split(',')[0]) for line in lines[1:]] == [order.pk for order in orders]
+
+    out = StringIO()
+    call_command('export_orders', '--from', today, '--format', 'ndjson', '--status', 'paid', stdout=out)
+    assert out.getvalue() == ''
+
+    with pytest.raises(CommandError):
+        call_command('export_orders', '--from', today, '--to', '2000-01-01')
+
+
+def test_iter_json_array_reads_in_chunks():
+    """Тест: элементы JSON-массива читаются по порциям, в том числе разрезанные между ними."""
+    records = [{'model': 'order.dish', 'pk': i, 'fields': {'name': f'Блюдо, [{i}]', 'price': '1.00'}} for i in range(20)]
+    assert list(iter_json_array(StringIO(json.dumps(records, indent=2)), read_size=7)) == records
+    assert list(iter_json_array(StringIO(' [ ] '))) == []
+    with pytest.raises(ValueError):
+        list(iter_json_array(StringIO('[{"pk": 1}'), read_size=4))
+
+
+@pytest.mark.django_db
+def test_import_data_command(tmp_path):
+    """
+    Тест: загрузка фикстур без сигналов по позициям, пересчет стоимости заказов
+    и текущей выручки, продолжение последовательностей и повторная загрузка.
+    """
+    fixtures = [
+        'order/fixtures/dishes.json', 'order/fixtures/orders.json',
+        'order/fixtures/order_dishes.json', 'finance/fixtures/revenue.json',
+    ]
+    received = []
+    order_state_changed.connect(received.append)
+    try:
+        call_command('import_data', *fixtures, '--batch-size', '1', stdout=StringIO())
+    finally:
+        order_state_changed.disconnect(received.append)
+    assert received == []
+
+    order = Order.objects.get(pk=1)
+    # В фикстуре 22.50, по позициям 2 * 10.50 + 12.00
+    assert order.total_price == Decimal('33.00')
+    assert order.created_at.isoformat() == '2025-01-01T12:00:00+00:00'
+    assert OrderDish.objects.count() == 2
+    assert Revenue.objects.get().total_revenue == Decimal('1000.00')
+    assert Dish.objects.create(name='Суп', price=5).pk == 3
+
+    # Повторная загрузка обновляет записи, оплаченные заказы попадают в текущую выручку
+    lines = tmp_path / 'order.order.csv'
+    lines.write_text('id,table_number,status,created_at\n1,7,paid,2025-01-01T12:00:00Z\n', encoding='utf-8')
+    call_command('import_data', str(lines), stdout=StringIO())
+    order.refresh_from_db()
+    assert (order.table_number, order.status, order.total_price) == (7, 'paid', Decimal('33.00'))
+    assert RevenueLedger.objects.get(date='2025-01-01').total_revenue == Decimal('33.00')
+
+    with pytest.raises(CommandError, match='no field named'):
+        call_command('import_data', str(lines), '--model', 'order.dish', stdout=StringIO())
+    dishes = tmp_path / 'dishes.csv'
+    dishes.write_text('name,price\nСуп,5.00\n', encoding='utf-8')
+    with pytest.raises(CommandError, match='без первичного ключа'):
+        call_command('import_data', str(dishes), '--model', 'order.dish', stdout=StringIO())
+
+
+def test_benchmark_db_connections_command(tmp_path, django_db_setup, django_db_blocker):
+    """Тест: замер режимов соединений пишет результаты по серверам и режимам и восстанавливает настройки."""
+    output = tmp_path / 'results.json'
+    settings_dict = connection.settings_dict
+    options_before = dict(settings_dict['OPTIONS'])
+    with django_db_blocker.unblock():
+        call_command(
+            'benchmark_db_connections', orders=10, dishes=3, requests=4, concurrency=[2],
+            only=['dish_detail'], output=str(output), stdout=StringIO(),
+        )
+        assert not Dish.objects.exists()
+
+    assert settings_dict['OPTIONS'] == options_before
+    results = json.loads(output.read_text())['results']['dish_detail']
+    assert results['wsgi'].keys() == {'new', 'persistent', 'pool'}
+    assert results['asgi'].keys() == {'new', 'pool'}
+    assert {'rps', 'p50_ms', 'p99_ms'} <= results['asgi']['pool']['2'].keys()
+
+
+@pytest.mark.django_db
+def test_archive_orders_command():
+    """
+    Тест: старые оплаченные заказы переносятся в архив пакетами вместе с позициями,
+    без сигналов; выручка по дням с учетом архива не меняется.
+    """
+    dish, = create_dishes(1)
+    orders = [
+        OrderService.create_order_with_items([{'dish': dish, 'quantity': 2, 'price_at_order': 10}], table_number=i)
+        for i in range(4)
+    ]
+    old_date = timezone.now() - timedelta(days=100)
+    Order.objects.filter(pk__in=[order.pk for order in orders[:3]]).update(created_at=old_date)
+    # Старый, но не оплаченный заказ остается в рабочей таблице
+    Order.objects.filter(pk__in=[order.pk for order in orders[1:]]).update(status=Order.StatusChoices.PAID)
+    RevenueLedgerService.rebuild()
+    old_day = timezone.localdate(old_date)
+    report = RevenueService.calculate_revenue_report(old_day, old_day)
+
+    out = StringIO()
+    call_command('archive_orders', '--days', '30', '--dry-run', stdout=out)
+    assert 'Заказов для переноса в архив' in out.getvalue() and ': 2' in out.getvalue()
+    assert not ArchivedOrder.objects.exists()
+
+    received = []
+    order_state_changed.connect(received.append)
+    try:
+        out = StringIO()
+        call_command('archive_orders', '--days', '30', '--batch-size', '1', stdout=out)
+    finally:
+        order_state_changed.disconnect(received.append)
+    assert received == []
+    assert 'заказов: 2, позиций: 2' in out.getvalue()
+
+    assert set(Order.objects.values_list('pk', flat=True)) == {orders[0].pk, orders[3].pk}
+    archived = ArchivedOrder.objects.get(pk=orders[1].pk)
+    assert (archived.table_number, archived.total_price, archived.created_at) == (1, Decimal('20.00'), old_date)
+    assert set(ArchivedOrderDish.objects.values_list('order_id', flat=True)) == {orders[1].pk, orders[2].pk}
+    assert OrderDish.objects.count() == 2
+
+    assert RevenueService.calculate_revenue_report(old_day, old_day) == report
+    assert RevenueLedgerService.rebuild(fix=False) == []
+
+    with pytest.raises(CommandError):
+        call_command('archive_orders', '--batch-size', '0')
+
+
+@pytest.mark.django_db
+def test_partition_orders_command():
+    """
+    Тест: переход на секционирование без потери заказов и позиций, новые заказы
+    в месячных секциях, запросы по датам читают только нужные секции,
+    отсоединение старой секции вместе с позициями.
+    """
+    dish, = create_dishes(1)
+    order = OrderService.create_order_with_items([{'dish': dish, 'quantity': 2, 'price_at_order': 10}], table_number=1)
+    Order.objects.filter(pk=order.pk).update(status=Order.StatusChoices.PAID)
+    with pytest.raises(CommandError, match='не секционирована'):
+        call_command('partition_orders', 'create')
+    # Схема меняется вне миграций, поэтому при непримененных миграциях переход запрещен
+    assert OrderPartitionService.get_pending_migrations() == []
+    with patch.object(OrderPartitionService, 'get_pending_migrations', return_value=['order.0099_test']):
+        with pytest.raises(CommandError, match='order.0099_test'):
+            call_command('partition_orders', 'convert')
+    assert not OrderPartitionService.is_partitioned()
+
+    call_command('partition_orders', 'convert', '--months-ahead', '2', stdout=StringIO())
+    assert OrderPartitionService.is_partitioned()
+    next_month = add_months(timezone.localdate().replace(day=1), 1)
+    month_after = add_months(next_month, 1)
+    assert [partition.name for partition in OrderPartitionService.get_partitions()] == [
+        LEGACY_PARTITION, get_partition_name(next_month), get_partition_name(month_after),
+    ]
+    with connection.cursor() as cursor:
+        # Прежние индексы стали секциями индексов, а не копиями
+        cursor.execute('SELECT count(*) FROM pg_indexes WHERE tablename = %s', [LEGACY_PARTITION])
+        assert cursor.fetchone()[0] == len(Order._meta.indexes) + 1
+    with pytest.raises(CommandError, match='уже секционирована'):
+        call_command('partition_orders', 'convert')
+    out = StringIO()
+    call_command('partition_orders', 'create', '--months-ahead', '2', stdout=out)
+    assert 'Создано секций: 0' in out.getvalue()
+
+    later = Order.objects.create(table_number=2)
+    assert later.pk > order.pk
+    Order.objects.filter(pk=later.pk).update(created_at=get_month_bound(next_month))
+    assert Order.objects.get(pk=order.pk).order_dishes.count() == 1
+
+    # Отчет о выручке и фильтр по датам читают только секцию нужного месяца
+    with CaptureQueriesContext(connection) as queries:
+        RevenueService.calculate_revenue_report(next_month, next_month)
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + queries[0]['sql'])
+        plans = ['\n'.join(row[0] for row in cursor.fetchall())]
+    filterset = OrderFilter({'date_from': next_month, 'date_to': next_month}, queryset=Order.objects.all())
+    assert list(filterset.qs) == [later]
+    plans.append(filterset.qs.explain())
+    for plan in plans:
+        assert get_partition_name(next_month) in plan
+        assert LEGACY_PARTITION not in plan and get_partition_name(month_after) not in plan
+
+    with pytest.raises(CommandError, match='учтенные в выручке'):
+        call_command('partition_orders', 'detach', '--before', str(next_month))
+    call_command('partition_orders', 'detach', '--before', str(next_month), '--force', stdout=StringIO())
+    assert list(Order.objects.all()) == [later]
+    assert not OrderDish.objects.exists()
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT order_id FROM {get_lines_table(LEGACY_PARTITION)}')
+        assert cursor.fetchall() == [(order.pk,)]
+
+
+@pytest.mark.django_db
+def test_import_data_into_partitioned_orders(tmp_path):
+    """
+    Тест: загрузка в секционированную таблицу заказов (без уникального ограничения на id)
+    вставляет новые заказы и обновляет существующие по id, в том числе с переездом в другую секцию.
+    """
+    call_command('partition_orders', 'convert', '--months-ahead', '2', stdout=StringIO())
+    fixtures = ['order/fixtures/dishes.json', 'order/fixtures/orders.json', 'order/fixtures/order_dishes.json']
+    call_command('import_data', *fixtures, stdout=StringIO())
+    assert Order.objects.get(pk=1).total_price == Decimal('33.00')
+
+    next_month = add_months(timezone.localdate().replace(day=1), 1)
+    orders = tmp_path / 'order.order.csv'
+    orders.write_text(
+        f'id,table_number,status,created_at\n1,7,ready,{get_month_bound(next_month).isoformat()}\n',
+        encoding='utf-8',
+    )
+    call_command('import_data', str(orders), stdout=StringIO())
+
+    assert list(Order.objects.values_list('pk', 'table_number', 'total_price')) == [(1, 7, Decimal('33.00'))]
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT id FROM {get_partition_name(next_month)}')
+        assert cursor.fetchall() == [(1,)]
+    assert Order.objects.create(table_number=2).pk == 2
+
+
+@pytest.mark.django_db
+def test_reconcile_table_balances_command():
+    """Тест: сверка открытых счетов столов находит и исправляет расхождения с заказами."""
+    dish, = create_dishes(1)
+    OrderService.create_order_with_items([{'dish': dish, 'quantity': 3, 'price_at_order': 10}], table_number=4)
+    assert TableBalance.objects.get(table_number=4).open_total == Decimal('30.00')
+    TableBalance.objects.filter(table_number=4).update(open_total=5, open_orders=2)
+    TableBalance.objects.create(table_number=9, open_total=1, open_orders=1)
+
+    out = StringIO()
+    call_command('reconcile_table_balances', '--dry-run', stdout=out)
+    assert 'Найдено расхождений: 2' in out.getvalue()
+    call_command('reconcile_table_balances', stdout=StringIO())
+    assert list(TableBalance.objects.values_list('table_number', 'open_total', 'open_orders')) == [
+        (4, Decimal('30.00'), 1), (9, Decimal('0.00'), 0),
+    ]
@@ -1,5 +1,18 @@
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
 import pytest
-from order.models import Order, OrderDish, Dish
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from cafe_order_system.db_utils import increment_or_create
+from finance.models import RevenueLedger
+from finance.services import RevenueLedgerService
+from order.balances import TableBalanceService
+from order.events import get_broadcaster
+from order.models import Order, OrderDish, Dish, TableBalance
 from order.signals import update_order_total_price
 
 
@@ -17,4 +30,160 @@ def test_update_order_total_price_signal(order, dish):
 
     order_dish.delete()
     order.refresh_from_db()
-    assert order.total_price == 0.00
\ No newline at end of file
+    assert order.total_price == 0.00
+
+@pytest.mark.django_db
+def test_order_events_published_on_commit(dish, django_capture_on_commit_callbacks):
+    """Тест публикации событий заказа в поток SSE только после фиксации транзакции."""
+    published = []
+    with patch.object(get_broadcaster(), 'publish', side_effect=published.extend):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            order = Order.objects.create(table_number=3)
+            OrderDish.objects.create(order=order, dish=dish, quantity=2, price_at_order=10.50)
+            assert published == []
+        assert callbacks
+
+        with django_capture_on_commit_callbacks(execute=True):
+            order.status = Order.StatusChoices.READY
+            order.save()
+        order_id = order.pk
+        with django_capture_on_commit_callbacks(execute=True):
+            order.delete()
+
+    assert [event['event'] for event in published] == ['created', 'updated', 'status_changed', 'deleted']
+    assert published[1]['data']['total_price'] == Decimal('21.00')
+    assert published[2]['data']['status_display'] == 'Готово'
+    assert published[3]['data'] == {'id': order_id}
+
+
+def wait_for_lock(timeout=5):
+    """Ждет, пока какой-нибудь запрос в базе не встанет в ожидание блокировки строки."""
+    deadline = time.monotonic() + timeout
+    with connection.cursor() as cursor:
+        while time.monotonic() < deadline:
+            cursor.execute(
+                "SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database()"
+            )
+            if cursor.fetchone()[0]:
+                return True
+            time.sleep(0.02)
+    return False
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_saves_of_same_order_change_aggregates_once(dish):
+    """Тест: два параллельных сохранения «оплачено» одного заказа учитываются в агрегатах один раз."""
+    order = Order.objects.create(table_number=7)
+    OrderDish.objects.create(order=order, dish=dish, quantity=2, price_at_order=10.50)
+    first, second = Order.objects.get(pk=order.pk), Order.objects.get(pk=order.pk)
+    first_saved, release_first = threading.Event(), threading.Event()
+    errors = []
+
+    def pay_first():
+        try:
+            with transaction.atomic():
+                first.status = Order.StatusChoices.PAID
+                first.save()
+                first_saved.set()
+                release_first.wait(5)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    def pay_second():
+        try:
+            second.status = Order.StatusChoices.PAID
+            second.save()
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=pay_first), threading.Thread(target=pay_second)]
+    threads[0].start()
+    assert first_saved.wait(5)
+    threads[1].start()
+    # Второе сохранение ждет блокировку строки, взятую первым
+    assert wait_for_lock()
+    release_first.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == []
+    assert RevenueLedger.objects.get(date=timezone.localdate(order.created_at)).total_revenue == Decimal('21.00')
+    balance = TableBalance.objects.get(table_number=7)
+    assert (balance.open_total, balance.open_orders) == (0, 0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_increment_or_create_concurrent_insert():
+    """Тест: если запись одновременно создает другая транзакция, приращение не теряется."""
+    created, release = threading.Event(), threading.Event()
+
+    def create_first():
+        try:
+            with transaction.atomic():
+                increment_or_create(TableBalance, {'table_number': 5}, {'open_total': 10, 'open_orders': 1})
+                created.set()
+                release.wait(5)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=create_first)
+    thread.start()
+    assert created.wait(5)
+    second = threading.Thread(
+        target=lambda: (
+            increment_or_create(TableBalance, {'table_number': 5}, {'open_total': 5, 'open_orders': 1}),
+            connections.close_all(),
+        ),
+    )
+    second.start()
+    # Вставка второй транзакции ждет фиксации первой
+    assert wait_for_lock()
+    release.set()
+    thread.join(5)
+    second.join(5)
+
+    balance = TableBalance.objects.get(table_number=5)
+    assert (balance.open_total, balance.open_orders) == (15, 2)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('service', [TableBalanceService, RevenueLedgerService])
+def test_rebuild_waits_for_uncommitted_changes(service):
+    """Тест: сверка дожидается транзакции, уже изменившей итоги, и не теряет ее приращение."""
+    created, release = threading.Event(), threading.Event()
+    drift = []
+
+    def create_order():
+        try:
+            with transaction.atomic():
+                Order.objects.create(table_number=3, total_price=10, status=Order.StatusChoices.READY)
+                created.set()
+                release.wait(5)
+        finally:
+            connections.close_all()
+
+    def rebuild():
+        try:
+            drift.extend(service.rebuild())
+        finally:
+            connections.close_all()
+
+    writer = threading.Thread(target=create_order)
+    writer.start()
+    assert created.wait(5)
+    reconciler = threading.Thread(target=rebuild)
+    reconciler.start()
+    # Блокировка таблицы итогов ждет фиксации заказа
+    assert wait_for_lock()
+    release.set()
+    writer.join(5)
+    reconciler.join(5)
+
+    assert drift == []
+    assert service.rebuild(fix=False) == []
+    assert TableBalance.objects.get(table_number=3).open_total == 10
+    assert RevenueLedger.objects.get(date=timezone.localdate()).total_revenue == 10
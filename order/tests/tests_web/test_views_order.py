@@ -1,5 +1,12 @@
+from datetime import timedelta
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.test.utils import override_settings
 from django.urls import reverse
+from django.utils import timezone
+from order.events import OrderEventBroadcaster, get_broadcaster
 from order.models import Order, Dish
 
 
@@ -11,6 +18,51 @@ def test_order_list_view(client):
     assert response.status_code == 200
 
 
+@pytest.mark.django_db
+def test_order_list_view_query_budget(client, orders_with_dishes, django_assert_num_queries):
+    """Тест: число запросов списка заказов не зависит от количества заказов."""
+    url = reverse('orders:order_list')
+    # COUNT, заказы страницы, позиции вместе с блюдами
+    with django_assert_num_queries(3):
+        response = client.get(url)
+    assert response.status_code == 200
+    assert '33.00 руб.' in response.content.decode('utf-8')
+    assert len(response.context['orders']) == 20
+
+
+@pytest.mark.django_db
+def test_order_list_view_default_window(client):
+    """Тест: по умолчанию скрыты оплаченные заказы прошлых дней."""
+    yesterday = timezone.now() - timedelta(days=1)
+    old_paid = Order.objects.create(table_number=1, status='paid')
+    old_pending = Order.objects.create(table_number=2)
+    today_paid = Order.objects.create(table_number=3, status='paid')
+    Order.objects.filter(pk__in=[old_paid.pk, old_pending.pk]).update(created_at=yesterday)
+
+    url = reverse('orders:order_list')
+    response = client.get(url)
+    assert {order.pk for order in response.context['orders']} == {old_pending.pk, today_paid.pk}
+
+    response = client.get(url, {'period': 'all'})
+    assert {order.pk for order in response.context['orders']} == {old_paid.pk, old_pending.pk, today_paid.pk}
+
+
+@pytest.mark.django_db
+def test_order_list_view_ajax_chunk(client, orders_with_dishes):
+    """Тест: AJAX-запрос страницы возвращает строки таблицы и номер следующей страницы."""
+    url = reverse('orders:order_list')
+    response = client.get(url, {'page': 2}, headers={'X-Requested-With': 'XMLHttpRequest'})
+    assert response.status_code == 200
+    data = response.json()
+    assert data['html'].count('<tr id="order-') == 20
+    assert data['next_page'] == 3
+
+    response = client.get(url, {'page': 3}, headers={'X-Requested-With': 'XMLHttpRequest'})
+    data = response.json()
+    assert data['html'].count('<tr id="order-') == 10
+    assert data['next_page'] is None
+
+
 @pytest.mark.django_db
 def test_create_order_view(client):
     """Тест создания заказа."""
@@ -19,6 +71,46 @@ def test_create_order_view(client):
     assert response.status_code == 200
 
 
+@pytest.mark.django_db
+def test_create_order_view_post(client, dish):
+    """Тест сохранения заказа с блюдами через веб-форму."""
+    url = reverse('orders:create_order')
+    data = {
+        'table_number': 7,
+        'order_dishes-TOTAL_FORMS': 1,
+        'order_dishes-INITIAL_FORMS': 0,
+        'order_dishes-0-dish': dish.pk,
+        'order_dishes-0-quantity': 2,
+        'order_dishes-0-price_at_order': '10.50',
+    }
+    response = client.post(url, data)
+    assert response.status_code == 302
+    order = Order.objects.get(table_number=7)
+    assert order.total_price == 21.00
+    assert order.order_dishes.count() == 1
+
+
+@pytest.mark.django_db
+def test_create_order_view_post_duplicate_dish(client, dish):
+    """Тест: повтор блюда в позициях веб-формы показывает ошибку, а заказ не создается."""
+    url = reverse('orders:create_order')
+    data = {
+        'table_number': 7,
+        'order_dishes-TOTAL_FORMS': 2,
+        'order_dishes-INITIAL_FORMS': 0,
+    }
+    for index in range(2):
+        data.update({
+            f'order_dishes-{index}-dish': dish.pk,
+            f'order_dishes-{index}-quantity': 1,
+            f'order_dishes-{index}-price_at_order': '10.50',
+        })
+    response = client.post(url, data)
+    assert response.status_code == 200
+    assert "Блюдо указано в заказе несколько раз." in response.content.decode()
+    assert not Order.objects.exists()
+
+
 @pytest.mark.django_db
 def test_delete_order_view(client, order):
     """Тест удаления заказа."""
@@ -38,6 +130,19 @@ def test_update_order_status_view(client, order):
     assert order.status == 'ready'
 
 
+@pytest.mark.django_db
+def test_update_order_status_view_rejects_invalid_transition(client, order):
+    """Тест: недопустимый переход и неизвестный статус отклоняются, несуществующий заказ — 404."""
+    order.status = Order.StatusChoices.PAID
+    order.save()
+    url = reverse('orders:update_status', args=[order.pk])
+    assert client.post(url, {'status': 'pending'}).status_code == 400
+    assert client.post(url, {'status': 'unknown'}).status_code == 400
+    order.refresh_from_db()
+    assert order.status == 'paid'
+    assert client.post(reverse('orders:update_status', args=[order.pk + 1]), {'status': 'ready'}).status_code == 404
+
+
 @pytest.mark.django_db
 def test_menu_list_view(client, dish):
     """Тест отображения меню."""
@@ -45,3 +150,102 @@ def test_menu_list_view(client, dish):
     response = client.get(url)
     assert response.status_code == 200
     assert dish.name in response.content.decode('utf-8')
+
+
+@pytest.mark.django_db
+def test_menu_list_view_conditional_get(client, dish, django_assert_num_queries):
+    """Тест: меню отдается из кэша и отвечает 304, пока блюда не изменятся."""
+    url = reverse('orders:menu_list')
+    response = client.get(url)
+    etag = response['ETag']
+    assert 'csrftoken' in response.cookies
+
+    with django_assert_num_queries(0):
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert not_modified.status_code == 304
+
+    client.post(reverse('orders:update_dish', args=[dish.id]), {'name': 'Суп', 'price': '12.00'})
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert 'Суп' in response.content.decode('utf-8')
+
+    client.delete(reverse('orders:delete_dish', args=[dish.id]))
+    response = client.get(url)
+    assert 'Суп' not in response.content.decode('utf-8')
+
+
+@pytest.mark.django_db
+def test_order_row_view(client, order_dish):
+    """Тест получения строки таблицы для одного заказа."""
+    response = client.get(reverse('orders:order_row', args=[order_dish.order_id]))
+    assert response.status_code == 200
+    assert f'id="order-{order_dish.order_id}"' in response.json()['html']
+    assert client.get(reverse('orders:order_row', args=[order_dish.order_id + 1])).status_code == 404
+
+
+def test_order_events_stream():
+    """Тест потока событий заказов: retry, события подписчику и отписка при закрытии."""
+    broadcaster = get_broadcaster()
+
+    async def read_stream():
+        response = await AsyncClient().get(reverse('orders:order_events'))
+        assert response['Content-Type'] == 'text/event-stream'
+        assert response['Cache-Control'] == 'no-cache'
+        stream = response.streaming_content
+        chunks = [await anext(stream)]
+        broadcaster.publish([{'event': 'deleted', 'data': {'id': 7}}])
+        chunks.append(await anext(stream))
+        await stream.aclose()
+        return chunks
+
+    retry, event = async_to_sync(read_stream)()
+    assert retry == b'retry: 3000\n\n'
+    assert event.endswith(b'event: deleted\ndata: {"id": 7}\n\n')
+    assert not broadcaster._subscriptions
+
+
+def test_order_events_stream_replays_missed_events():
+    """Тест: поток, открытый с Last-Event-ID, начинается с пропущенных клиентом событий."""
+    broadcaster = get_broadcaster()
+    broadcaster.publish([{'event': 'deleted', 'data': {'id': 1}}])
+    last_event_id = broadcaster._make_id(broadcaster._last_number)
+    broadcaster.publish([{'event': 'deleted', 'data': {'id': 2}}])
+
+    async def read_stream():
+        response = await AsyncClient().get(reverse('orders:order_events'), headers={'Last-Event-ID': last_event_id})
+        stream = response.streaming_content
+        chunks = [await anext(stream), await anext(stream)]
+        await stream.aclose()
+        return chunks
+
+    _, event = async_to_sync(read_stream)()
+    assert event.endswith(b'event: deleted\ndata: {"id": 2}\n\n')
+
+
+@override_settings(ORDER_EVENTS_HISTORY_SIZE=2)
+def test_order_events_broadcaster_history():
+    """
+    Тест: переподключение получает пропущенные события из истории; если их там уже нет
+    или идентификатор чужой (другой процесс или перезапуск), — событие resync.
+    """
+    broadcaster = OrderEventBroadcaster()
+
+    async def reconnect(last_event_id):
+        subscription = broadcaster.subscribe(last_event_id)
+        broadcaster.unsubscribe(subscription)
+        return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+
+    broadcaster.publish([{'event': 'deleted', 'data': {'id': i}} for i in range(1, 4)])
+    first, second, third = (broadcaster._make_id(number) for number in range(1, 4))
+
+    assert async_to_sync(reconnect)(third) == []
+    assert [event['data'] for event in async_to_sync(reconnect)(second)] == [{'id': 3}]
+    assert [event['id'] for event in async_to_sync(reconnect)(first)] == [second, third]
+    for unknown in (broadcaster._make_id(0), 'other-2', 'garbage'):
+        resync, = async_to_sync(reconnect)(unknown)
+        assert (resync['id'], resync['event']) == (third, 'resync')
+
+
+def test_order_events_stream_requires_asgi(client):
+    """Тест: под WSGI поток событий не открывается."""
+    assert client.get(reverse('orders:order_events')).status_code == 501
@@ -1,12 +1,16 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from .api.async_endpoints import AsyncApiOrderList, AsyncApiOrderDetail, AsyncDishList, AsyncDishDetail
+from .api.async_views import read_view
 from .api.endpoints import (
     ApiOrderList, ApiOrderDetail, ApiOrderCreate,
-    ApiOrderUpdate, ApiOrderDelete, ApiRemoveDishFromOrder, DishViewSet,
+    ApiOrderUpdate, ApiOrderDelete, ApiOrderBulkStatus, ApiOrderExport, ApiRemoveDishFromOrder,
+    ApiOrderItems, ApiOrderItemDetail, ApiTableBalance, DishViewSet,
 )
 from .views import (OrderListView, CreateOrder,
-                    DeleteOrder, UpdateOrderStatus,
+                    DeleteOrder, UpdateOrderStatus, OrderRowView, OrderEventsView,
                     MenuListView, DishCreate, DishDelete, DishUpdate
                     )
 
@@ -22,6 +26,8 @@ web_urlpatterns = [
     path('create_order/', CreateOrder.as_view(), name='create_order'),  # Создание заказа
     path('delete_order/<int:pk>/', DeleteOrder.as_view(), name='delete_order'),  # Удаление заказа
     path('update-status/<int:order_id>/', UpdateOrderStatus.as_view(), name='update_status'),  # Обновление статуса заказа
+    path('row/<int:pk>/', OrderRowView.as_view(), name='order_row'),  # Строка таблицы заказов
+    path('events/', OrderEventsView.as_view(), name='order_events'),  # Поток событий заказов (SSE)
     path('menu/', MenuListView.as_view(),  name='menu_list'),  # маршрут для меню
     path('delete_dish/<int:pk>/', DishDelete.as_view(), name='delete_dish'),  # Маршрут для удаления блюда
     path('create_dish/', DishCreate.as_view(), name='create_dish'),  # маршрут для создания блюда
@@ -31,15 +37,40 @@ web_urlpatterns = [
 # URL-адреса для API
 
 api_urlpatterns = [
-    path('order_list/', ApiOrderList.as_view(), name='api_order_list'),  # Список заказов (API)
-    path('order/<int:id>/', ApiOrderDetail.as_view(), name='api_order_detail'),  # Детали заказа (API)
+    path('order_list/', read_view(ApiOrderList.as_view(), AsyncApiOrderList.as_view()),
+         name='api_order_list'),  # Список заказов (API)
+    path('order/<int:id>/', read_view(ApiOrderDetail.as_view(), AsyncApiOrderDetail.as_view()),
+         name='api_order_detail'),  # Детали заказа (API)
     path('order/create/', ApiOrderCreate.as_view(), name='api_order_create'),  # Создание заказа (API)
     path('order/update/<int:pk>/', ApiOrderUpdate.as_view(), name='api_order_update'),  # Обновление заказа (API)
     path('order/delete/<int:pk>/', ApiOrderDelete.as_view(), name='api_order_delete_api'),  # Удаление заказа (API)
+    path('order/bulk_status/', ApiOrderBulkStatus.as_view(),
+         name='api_order_bulk_status'),  # Массовая смена статуса заказов (API)
+    path('order/export/', ApiOrderExport.as_view(), name='api_order_export'),  # Выгрузка заказов в CSV/NDJSON (API)
     path('order/<int:order_id>/remove_dish/<int:dish_id>/', ApiRemoveDishFromOrder.as_view(),
          name='api_remove_dish_from_order'),  # Удаление блюда из заказа (API)
+    path('order/<int:order_id>/items/', ApiOrderItems.as_view(),
+         name='api_order_items'),  # Добавление блюда в заказ (API)
+    path('order/<int:order_id>/items/<int:dish_id>/', ApiOrderItemDetail.as_view(),
+         name='api_order_item_detail'),  # Изменение количества и удаление блюда в заказе (API)
+    path('table_balance/', ApiTableBalance.as_view(),
+         name='api_table_balance_list'),  # Открытые счета всех столов (API)
+    path('table_balance/<int:table_number>/', ApiTableBalance.as_view(),
+         name='api_table_balance'),  # Открытый счет стола (API)
 ]
 
+# При ASYNC_API_VIEWS чтение блюд обслуживают асинхронные представления,
+# запись — по-прежнему DishViewSet; маршруты стоят перед маршрутами роутера
+if settings.ASYNC_API_VIEWS:
+    api_urlpatterns += [
+        path('dish/', read_view(DishViewSet.as_view({'get': 'list', 'post': 'create'}), AsyncDishList.as_view()),
+             name='dish-list'),  # Список и создание блюд (API)
+        path('dish/<int:pk>/', read_view(
+            DishViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}),
+            AsyncDishDetail.as_view(),
+        ), name='dish-detail'),  # Блюдо: чтение, изменение и удаление (API)
+    ]
+
 # Объединение всех URL-адресов
 urlpatterns = web_urlpatterns + [
     path('api/', include(api_urlpatterns)),
@@ -2,24 +2,42 @@ import logging
 from typing import Dict, Union, Any
 
 from django.core.exceptions import ValidationError
-from django.db.models import Prefetch, QuerySet
-from django.http import JsonResponse, HttpResponse, HttpRequest
+from django.db.models import Q, QuerySet
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, HttpResponse, HttpRequest, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_POST
 from django.views.generic import ListView, CreateView, DeleteView, UpdateView
 
+from order.api.serializers import OrderSerializer
+from order.cache import cache_menu_response
+from order.events import get_broadcaster, stream_order_events
 from order.forms import OrderForm, OrderDishFormSet, DishForm
-from order.models import Order, OrderDish, Dish
+from order.models import Order, Dish
+from order.services import OrderService
 
 
 logger = logging.getLogger(__name__)
 
 class OrderListView(ListView):
+    """
+    Представление для отображения списка заказов.
+
+    По умолчанию показываются только сегодняшние и неоплаченные заказы
+    (`period=all` — вся история). Заказы выводятся страницами по `paginate_by`;
+    AJAX-запрос следующей страницы возвращает JSON с готовыми строками таблицы.
+    """
     template_name = 'orders/order_list.html'
+    rows_template_name = 'orders/order_rows.html'
     context_object_name = 'orders'
+    paginate_by = 20
 
     def get_filters(self) -> Dict[str, Union[str, str|None]]:
         """
@@ -27,6 +45,7 @@ class OrderListView(ListView):
         """
         table_number = self.request.GET.get('table_number')
         status = self.request.GET.get('status')
+        period = self.request.GET.get('period')
 
         # Логируем некорректный номер стола, но не прерываем выполнение
         if table_number and not table_number.isdigit():
@@ -36,6 +55,7 @@ class OrderListView(ListView):
         return {
             'table_number': table_number,
             'status': status,
+            'period': period,
         }
 
     def get_queryset(self) -> QuerySet[Order]:
@@ -44,15 +64,19 @@ class OrderListView(ListView):
         """
         try:
             filters = self.get_filters()
-            orders = Order.objects.prefetch_related(
-                Prefetch('order_dishes', queryset=OrderDish.objects.only('quantity', 'price_at_order', 'dish')),
-                Prefetch('order_dishes__dish', queryset=Dish.objects.only('name', 'price')),
-            ).only('id', 'table_number', 'status')
+            # Шаблон выводит те же поля, что и OrderSerializer
+            orders = OrderSerializer.setup_eager_loading(Order.objects.order_by('-created_at', '-id'))
 
             if filters['table_number']:
                 orders = orders.filter(table_number=int(filters['table_number']))
             if filters['status']:
                 orders = orders.filter(status=filters['status'])
+            if filters['period'] != 'all':
+                # Сегодняшние заказы и все еще не оплаченные
+                start_of_today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+                orders = orders.filter(
+                    Q(created_at__gte=start_of_today) | ~Q(status=Order.StatusChoices.PAID)
+                )
 
             return orders
 
@@ -60,6 +84,18 @@ class OrderListView(ListView):
             logger.error(f"Ошибка при получении списка заказов: {e}")
             return Order.objects.none()
 
+    def render_to_response(self, context: Dict[str, Any], **response_kwargs: Any) -> HttpResponse:
+        """
+        Для AJAX-запроса возвращает только строки следующей страницы.
+        """
+        if self.request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            page_obj = context['page_obj']
+            return JsonResponse({
+                'html': render_to_string(self.rows_template_name, context, request=self.request),
+                'next_page': page_obj.next_page_number() if page_obj.has_next() else None,
+            })
+        return super().render_to_response(context, **response_kwargs)
+
 
 class CreateOrder(CreateView):
     """
@@ -96,14 +132,14 @@ class CreateOrder(CreateView):
 
         try:
             if order_dish_formset.is_valid():
-                self.object = form.save()
-
-                # Связываем FormSet с созданным заказом
-                order_dish_formset.instance = self.object
-
-                # Сохраняем блюда
-                order_dish_formset.save()
-                return super().form_valid(form)
+                # Заказ и все блюда сохраняются одной пачкой, пустые формы пропускаются
+                items_data = [
+                    {field: dish_form.cleaned_data[field] for field in ('dish', 'quantity', 'price_at_order')}
+                    for dish_form in order_dish_formset.forms
+                    if dish_form.cleaned_data
+                ]
+                self.object = OrderService.create_order_with_items(items_data, **form.cleaned_data)
+                return HttpResponseRedirect(self.get_success_url())
             else:
                 # Если FormSet невалиден, логируем ошибки
                 logger.warning(f"Ошибки в OrderDishFormSet: {order_dish_formset.errors}")
@@ -154,7 +190,8 @@ class UpdateOrderStatus(View):
     Класс для обновления статуса заказа.
 
     Метод `post` принимает запрос и идентификатор заказа, обновляет статус заказа
-    на новый, если он предоставлен, и возвращает JSON-ответ с результатом операции.
+    на новый, если он предоставлен и переход допустим (Order.STATUS_TRANSITIONS),
+    и возвращает JSON-ответ с результатом операции.
     """
 
     def post(self, request: HttpRequest, order_id: int) -> JsonResponse:
@@ -166,31 +203,93 @@ class UpdateOrderStatus(View):
         :return: JsonResponse с результатом операции.
         """
         try:
-            # Получаем заказ по идентификатору или возвращаем 404, если заказ не найден
-            order = get_object_or_404(Order, id=order_id)
-
             # Получаем новый статус из POST-запроса
             new_status = request.POST.get('status')
 
-            if new_status:
-                # Обновляем статус заказа и сохраняем его
-                order.status = new_status
-                order.save()
-
-                logger.info(f"Статус заказа {order_id} успешно изменен на '{new_status}'.")
-
-                return JsonResponse({'status': 'success', 'message': 'Статус успешно изменен.'})
-            else:
+            if new_status not in Order.StatusChoices.values:
                 logger.error(f"Неверный статус для заказа {order_id}.")
                 return JsonResponse({'status': 'error', 'message': 'Неверный статус.'}, status=400)
 
+            # Заказ блокируется и меняется одним UPDATE, недопустимый переход пропускается
+            result, = OrderService.bulk_change_status(new_status, order_ids=[order_id])
+            if result['result'] == 'not_found':
+                raise Http404(f"Заказ {order_id} не найден.")
+            if result['result'] == 'invalid_transition':
+                logger.warning(f"Недопустимый переход заказа {order_id} в статус '{new_status}'.")
+                return JsonResponse({'status': 'error', 'message': 'Недопустимый переход статуса.'}, status=400)
+
+            logger.info(f"Статус заказа {order_id} успешно изменен на '{new_status}'.")
+
+            return JsonResponse({'status': 'success', 'message': 'Статус успешно изменен.'})
+
+        except Http404:
+            raise
+
         except Exception as e:
             logger.error(f"Ошибка при обновлении статуса заказа {order_id}: {str(e)}")
 
             return JsonResponse({'status': 'error', 'message': 'Внутренняя ошибка сервера.'}, status=500)
 
 
+class OrderRowView(View):
+    """
+    Возвращает строку таблицы заказов для одного заказа.
+
+    Нужна странице списка заказов, чтобы по событию из потока /order/events/
+    добавить или обновить строку, не перезагружая страницу.
+    """
+
+    def get(self, request: HttpRequest, pk: int) -> JsonResponse:
+        """
+        :param request: HTTP-запрос.
+        :param pk: Идентификатор заказа.
+        :return: JsonResponse с HTML строки таблицы.
+        """
+        order = get_object_or_404(OrderSerializer.setup_eager_loading(Order.objects.all()), pk=pk)
+        return JsonResponse({
+            'html': render_to_string(OrderListView.rows_template_name, {'orders': [order]}, request=request),
+        })
+
+
+class OrderEventsView(View):
+    """
+    Поток Server-Sent Events с изменениями заказов для табло и экранов кухни.
+
+    События: created, updated (изменилась сумма или стол), status_changed, deleted
+    и resync (клиент отстал и должен перечитать данные). Данные события — JSON
+    с полями заказа. При переподключении EventSource передает Last-Event-ID,
+    и поток начинается с пропущенных событий (или с resync, если их уже нет).
+    Соединение держится открытым, поэтому поток отдается только
+    под ASGI-сервером: под WSGI каждый клиент занимал бы поток сервера.
+
+    Пример использования:
+        URL: `order/events/`
+        Метод: GET
+    """
+
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse('Поток событий доступен только под ASGI-сервером.', status=501)
+        response = StreamingHttpResponse(
+            stream_order_events(
+                get_broadcaster(), settings.ORDER_EVENTS_HEARTBEAT, request.headers.get('Last-Event-ID'),
+            ),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Отключает буферизацию ответа в nginx
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+@method_decorator([ensure_csrf_cookie, cache_menu_response], name='get')
 class MenuListView(ListView):
+    """
+    Представление для отображения меню.
+
+    Страница кэшируется целиком по версии меню (ETag/Last-Modified), поэтому
+    CSRF-токен в нее не встраивается: скрипты берут его из cookie.
+    """
     model = Dish
     template_name = 'orders/menu_list.html'
     context_object_name = 'dishes'